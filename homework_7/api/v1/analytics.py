@@ -0,0 +1,72 @@
+from http import HTTPStatus
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from homework_7.services.analytics import analytics_service
+from homework_7.services.entities import Principal
+from homework_7.services.student import student_service
+from homework_7.services.token import token_service
+
+analytics_router = APIRouter()
+
+DEFAULT_PERCENTILES = [50, 90, 99]
+MAX_TOP_STUDENTS = 1000
+
+
+@analytics_router.get("/percentiles/", status_code=HTTPStatus.OK)
+async def get_percentiles(
+    q: List[float] = Query(default=DEFAULT_PERCENTILES),
+    faculty_id: Optional[int] = None,
+    course_id: Optional[int] = None,
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    percentiles = [min(max(percentile, 0.0), 100.0) for percentile in q]
+
+    return await analytics_service.get_percentiles(percentiles, faculty_id, course_id)
+
+
+@analytics_router.get("/histogram/", status_code=HTTPStatus.OK)
+async def get_histogram(
+    bins: int = Query(default=10, ge=1, le=101),
+    faculty_id: Optional[int] = None,
+    course_id: Optional[int] = None,
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    return await analytics_service.get_histogram(bins, faculty_id, course_id)
+
+
+@analytics_router.get("/distribution/", status_code=HTTPStatus.OK)
+async def get_distribution(
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    return {"items": await analytics_service.get_distribution()}
+
+
+@analytics_router.get("/top_students/", status_code=HTTPStatus.OK)
+async def get_top_students(
+    limit: int = Query(default=10, ge=1, le=MAX_TOP_STUDENTS),
+    faculty_id: Optional[int] = None,
+    course_id: Optional[int] = None,
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    top = await analytics_service.get_top_students(limit, faculty_id, course_id)
+    students = await student_service.get_students_by_ids(
+        [student["id"] for student in top]
+    )
+
+    # Студент мог быть удален после обновления снимка
+    return [
+        students[student["id"]].as_dict()
+        for student in top
+        if student["id"] in students
+    ]
+
+
+@analytics_router.get("/snapshot/", status_code=HTTPStatus.OK)
+async def get_snapshot_status(
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    snapshot = await analytics_service.get_snapshot()
+
+    return snapshot.as_dict()
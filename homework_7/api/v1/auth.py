@@ -1,12 +1,18 @@
+import math
 from datetime import UTC, datetime, timedelta
 from http import HTTPStatus
 
-from fastapi import APIRouter, HTTPException, Response
+from fastapi import APIRouter, HTTPException, Request, Response
 
 from homework_7.schemes.user import AuthUser, User
+from homework_7.services.cache import cache_service
+from homework_7.services.cache_keys import USER_CACHE
+from homework_7.services.entities import OperationStatus
 from homework_7.services.password import password_service
+from homework_7.services.principal import principal_service
 from homework_7.services.token import token_service
 from homework_7.services.user import user_service
+from homework_7.storages.rate_limit import login_rate_limiter
 
 auth_router = APIRouter()
 
@@ -15,7 +21,9 @@ ACCESS_TOKEN_COOKIE_NAME = "access_token"
 
 @auth_router.post("/register/", status_code=HTTPStatus.OK)
 async def register(input: User):
-    hashed_password = password_service.create_hashed_password(input.password)
+    hashed_password = await password_service.create_hashed_password_async(
+        input.password
+    )
 
     user = await user_service.create_user(
         last_name=input.last_name,
@@ -25,17 +33,42 @@ async def register(input: User):
         password=hashed_password,
     )
 
-    return user
+    if isinstance(user, OperationStatus):
+        return user.as_dict()
+
+    # Заменяем закешированный ранее 404 для нового id
+    await cache_service.write(USER_CACHE, user.id, user, created=True)
+    await principal_service.invalidate(user.login)
+
+    return user.as_dict()
 
 
 @auth_router.post("/login/", status_code=HTTPStatus.OK)
-async def login(input: AuthUser, resp: Response):
+async def login(input: AuthUser, request: Request, resp: Response):
+    # Лимит проверяется до поиска пользователя и pbkdf2: перебор паролей
+    # не превращается в нагрузку на CPU
+    rate_limit = await login_rate_limiter.hit(
+        {
+            "login": input.login,
+            "ip": request.client.host if request.client else "unknown",
+        }
+    )
+
+    if not rate_limit.allowed:
+        raise HTTPException(
+            status_code=HTTPStatus.TOO_MANY_REQUESTS,
+            detail="Слишком много попыток входа, повторите позже",
+            headers={"Retry-After": str(math.ceil(rate_limit.retry_after))},
+        )
+
     user = await user_service.get_user(user_login=input.login)
 
     if not user:
         raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Неверный логин")
 
-    is_valid = password_service.verify_password(input.password, user.password)
+    is_valid = await password_service.verify_password_async(
+        input.password, user.password
+    )
 
     if not is_valid:
         raise HTTPException(
@@ -45,6 +78,7 @@ async def login(input: AuthUser, resp: Response):
     exp_time = datetime.now(UTC) + timedelta(minutes=120)
     token_data = {"login": user.login, "exp": exp_time, "type": "access"}
     token = token_service.create_token(token_data)
+    await login_rate_limiter.reset("login", user.login)
 
     resp.set_cookie(key=ACCESS_TOKEN_COOKIE_NAME, value=token, expires=exp_time)
 
@@ -1,22 +1,45 @@
 import os
 from http import HTTPStatus
 from pathlib import Path
+from typing import List
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
 
 from homework_7.schemes.backend import ItemList
+from homework_7.services.cache import cache_service
+from homework_7.services.cache_keys import (
+    COURSE_CACHE,
+    FACULTY_CACHE,
+    STUDENT_AGGREGATE_CACHES,
+    STUDENT_CACHE,
+    CacheNamespace,
+)
 from homework_7.services.course import course_service
+from homework_7.services.csv_stream import iter_csv_rows
+from homework_7.services.entities import (
+    JOB_ERROR_SAMPLE_SIZE,
+    BulkDeleteResult,
+    Job,
+    LoadResult,
+    Principal,
+)
 from homework_7.services.faculty import faculty_service
-from homework_7.services.student import student_service
+from homework_7.services.grade_statistics import grade_statistics_service
+from homework_7.services.job import job_service
+from homework_7.services.main_service import main_service
+from homework_7.services.password import password_service
+from homework_7.services.student import DEFAULT_CHUNK_SIZE, student_service
 from homework_7.services.token import token_service
+from homework_7.storages.cache import cache_storage
+from homework_7.storages.rate_limit import login_rate_limiter
 
 backend_router = APIRouter()
 
 ACCESS_TOKEN_COOKIE_NAME = "access_token"
 DB_DELETE_FUNC_FOR_TABLE_NAMES = {
-    "faculties": faculty_service.delete_faculty,
-    "courses": course_service.delete_course,
-    "students": student_service.delete_student,
+    "faculties": (faculty_service.delete_faculties, FACULTY_CACHE),
+    "courses": (course_service.delete_courses, COURSE_CACHE),
+    "students": (student_service.delete_students, STUDENT_CACHE),
 }
 
 
@@ -24,7 +47,8 @@ DB_DELETE_FUNC_FOR_TABLE_NAMES = {
 async def fill_db(
     csv_file_path: str,
     background_tasks: BackgroundTasks,
-    current_user: str = Depends(token_service.get_auth_cookie),
+    chunk_size: int = Query(default=DEFAULT_CHUNK_SIZE, ge=1, le=100_000),
+    current_user: Principal = Depends(token_service.get_auth_cookie),
 ):
     file_path = Path(__file__).parent.parent.parent / csv_file_path
 
@@ -34,9 +58,40 @@ async def fill_db(
             detail=f"Файл {csv_file_path} не найден.",
         )
 
-    background_tasks.add_task(student_service.load_from_csv, csv_file_path)
+    job = job_service.create_job(kind="fill_db")
 
-    return {"result": "ok"}
+    background_tasks.add_task(
+        job_service.run_job,
+        job,
+        _load_students,
+        student_service.bulk_load_from_csv,
+        file_path,
+        chunk_size=chunk_size,
+    )
+
+    return {"result": "ok", "job_id": job.id}
+
+
+@backend_router.post("/upload_csv/", status_code=HTTPStatus.OK)
+async def upload_csv(
+    request: Request,
+    chunk_size: int = Query(default=DEFAULT_CHUNK_SIZE, ge=1, le=100_000),
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    job = job_service.create_job(kind="upload_csv")
+
+    await job_service.run_job(
+        job,
+        _load_students,
+        student_service.bulk_load_from_rows,
+        iter_csv_rows(request.stream()),
+        chunk_size=chunk_size,
+    )
+
+    if job.status == "error":
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=job.error)
+
+    return {"result": "ok", "job_id": job.id, **job.result}
 
 
 @backend_router.post("/remove_data_from_db/", status_code=HTTPStatus.OK)
@@ -44,9 +99,11 @@ async def remove_data_from_db(
     table_name: str,
     input: ItemList,
     background_tasks: BackgroundTasks,
-    current_user: str = Depends(token_service.get_auth_cookie),
+    current_user: Principal = Depends(token_service.get_auth_cookie),
 ):
-    delete_func = DB_DELETE_FUNC_FOR_TABLE_NAMES.get(table_name, None)
+    delete_func, cache_namespace = DB_DELETE_FUNC_FOR_TABLE_NAMES.get(
+        table_name, (None, None)
+    )
 
     if delete_func is None:
         raise HTTPException(
@@ -54,7 +111,113 @@ async def remove_data_from_db(
             detail=f"Таблица с именем {table_name} не найдена.",
         )
 
-    for item_id in input.item_ids:
-        background_tasks.add_task(delete_func, item_id)
+    job = job_service.create_job(kind="remove_data_from_db", total=len(input.item_ids))
+
+    background_tasks.add_task(
+        job_service.run_job,
+        job,
+        _delete_items,
+        delete_func,
+        cache_namespace,
+        input.item_ids,
+    )
+
+    return {"result": "ok", "job_id": job.id}
+
+
+@backend_router.get("/jobs/", status_code=HTTPStatus.OK)
+async def get_jobs(current_user: Principal = Depends(token_service.get_auth_cookie)):
+    return [job.as_dict() for job in job_service.get_jobs()]
+
+
+@backend_router.get("/jobs/{job_id}", status_code=HTTPStatus.OK)
+async def get_job(
+    job_id: str, current_user: Principal = Depends(token_service.get_auth_cookie)
+):
+    job = job_service.get_job(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job.as_dict()
+
+
+@backend_router.get("/db_pool/", status_code=HTTPStatus.OK)
+async def get_db_pool_status(
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    return main_service.get_pool_status()
+
+
+@backend_router.get("/cache_stats/", status_code=HTTPStatus.OK)
+async def get_cache_stats(
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    return {
+        **cache_storage.get_stats(),
+        "dimensions": {
+            "faculties": faculty_service.name_ids.as_dict(),
+            "courses": course_service.name_ids.as_dict(),
+        },
+    }
+
+
+@backend_router.get("/password_hashing_stats/", status_code=HTTPStatus.OK)
+async def get_password_hashing_stats(
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    return password_service.as_dict()
+
+
+@backend_router.get("/login_rate_limit_stats/", status_code=HTTPStatus.OK)
+async def get_login_rate_limit_stats(
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    return login_rate_limiter.as_dict()
+
+
+@backend_router.post("/rebuild_grade_statistics/", status_code=HTTPStatus.OK)
+async def rebuild_grade_statistics(
+    verify_only: bool = False,
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    result = await grade_statistics_service.rebuild(verify_only=verify_only)
+
+    if result["rebuilt"]:
+        for namespace in STUDENT_AGGREGATE_CACHES:
+            await cache_service.invalidate_namespace(namespace)
+
+    return result
+
+
+async def _load_students(load_func, source, chunk_size: int, job: Job) -> LoadResult:
+    try:
+        return await load_func(source, chunk_size=chunk_size, job=job)
+    finally:
+        # Новые id могли быть закешированы как отсутствующие; пачки,
+        # вставленные до ошибки в потоке, уже закоммичены
+        if job.processed:
+            for namespace in (STUDENT_CACHE, *STUDENT_AGGREGATE_CACHES):
+                await cache_service.invalidate_namespace(namespace)
+
+
+async def _delete_items(
+    delete_func, cache_namespace: CacheNamespace, item_ids: List[int], job: Job
+) -> BulkDeleteResult:
+    result = await delete_func(item_ids, job=job)
+
+    # Удаляем только ключи удаленных записей: остальные записи таблицы
+    # в кеше актуальны
+    if result.deleted_ids:
+        await cache_service.invalidate_many(cache_namespace, result.deleted_ids)
+
+    # Удаление студентов сбрасывает теги своих факультетов и курсов в сервисе;
+    # удаление факультета или курса каскадно меняет агрегаты целиком
+    if result.deleted_ids and cache_namespace is not STUDENT_CACHE:
+        for namespace in STUDENT_AGGREGATE_CACHES:
+            await cache_service.invalidate_namespace(namespace)
+
+    for item_id in result.missing_ids[:JOB_ERROR_SAMPLE_SIZE]:
+        job.add_error(f"{item_id=}: запись не найдена")
 
-    return {"result": "ok"}
+    return result
@@ -1,80 +1,96 @@
-import json
 from http import HTTPStatus
-from typing import List
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 
-from homework_7.schemes.course import Course, ResponseCourse
+from homework_7.schemes.course import Course, CoursesPage
+from homework_7.services.cache import cache_service
+from homework_7.services.cache_keys import COURSE_CACHE, STUDENT_AGGREGATE_CACHES
 from homework_7.services.course import course_service
+from homework_7.services.entities import OperationStatus, Principal
+from homework_7.services.main_service import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
 from homework_7.services.token import token_service
-from homework_7.storages.cache import cache_storage
 
 course_router = APIRouter()
-COURSE_CACHE_PREFIX_KEY = "course"
 
 
 @course_router.post("/create_course/", status_code=HTTPStatus.CREATED)
 async def create_course(
-    input: Course, current_user: str = Depends(token_service.get_auth_cookie)
+    input: Course, current_user: Principal = Depends(token_service.get_auth_cookie)
 ):
     course = await course_service.create_course(
         name=input.name,
     )
 
-    return course
+    if isinstance(course, OperationStatus):
+        return course.as_dict()
+
+    # Заменяем закешированный ранее 404 для нового id
+    await cache_service.write(COURSE_CACHE, course.id, course, created=True)
+
+    return course.as_dict()
 
 
 @course_router.get("/get_course/{id}", status_code=HTTPStatus.OK)
 async def get_course(
-    id: int, current_user: str = Depends(token_service.get_auth_cookie)
+    id: int, current_user: Principal = Depends(token_service.get_auth_cookie)
 ):
-    course = await cache_storage.get(f"{COURSE_CACHE_PREFIX_KEY}:{id}")
-
-    if course:
-        return json.loads(course)
-    else:
-        course = await course_service.get_course(id)
-
-        if course is None:
-            raise HTTPException(status_code=404, detail="Course not found")
+    course = await cache_service.get_or_load(
+        COURSE_CACHE, id, lambda: course_service.get_course(id)
+    )
 
-        await cache_storage.set(
-            f"{COURSE_CACHE_PREFIX_KEY}:{id}", json.dumps(course.as_dict())
-        )
+    if course is None:
+        raise HTTPException(status_code=404, detail="Course not found")
 
     return course
 
 
 @course_router.delete("/delete_course/{id}", status_code=HTTPStatus.NO_CONTENT)
 async def delete_course(
-    id: int, current_user: str = Depends(token_service.get_auth_cookie)
+    id: int, current_user: Principal = Depends(token_service.get_auth_cookie)
 ):
     result = await course_service.delete_course(id)
 
     if result.status == "error":
         raise HTTPException(status_code=404, detail=result.message)
 
-    await cache_storage.delete(f"{COURSE_CACHE_PREFIX_KEY}:{id}")
+    await cache_service.invalidate(COURSE_CACHE, id)
+
+    # Вместе с записью каскадно удалены ее студенты
+    for namespace in STUDENT_AGGREGATE_CACHES:
+        await cache_service.invalidate_namespace(namespace)
 
-    return result
+    return result.as_dict()
 
 
 @course_router.patch("/update_course/{id}", status_code=HTTPStatus.OK)
 async def update_course(
-    id: int, input: Course, current_user: str = Depends(token_service.get_auth_cookie)
+    id: int,
+    input: Course,
+    current_user: Principal = Depends(token_service.get_auth_cookie),
 ):
     result = await course_service.update_course(id, **input.model_dump())
 
     if result.status == "error":
         raise HTTPException(status_code=404, detail=result.message)
 
-    await cache_storage.delete(f"{COURSE_CACHE_PREFIX_KEY}:{id}")
+    if result.status == "conflict":
+        raise HTTPException(status_code=HTTPStatus.CONFLICT, detail=result.message)
+
+    await cache_service.write(COURSE_CACHE, id, result.entity)
 
-    return result
+    return result.as_dict()
 
 
 @course_router.get(
-    "/get_courses/", status_code=HTTPStatus.OK, response_model=List[ResponseCourse]
+    "/get_courses/", status_code=HTTPStatus.OK, response_model=CoursesPage
 )
-async def get_courses(current_user: str = Depends(token_service.get_auth_cookie)):
-    return await course_service.get_unique_courses()
+async def get_courses(
+    limit: int = Query(default=DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    after_id: Optional[int] = None,
+    name_prefix: Optional[str] = None,
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    return await course_service.get_unique_courses(
+        limit=limit, after_id=after_id, name_prefix=name_prefix
+    )
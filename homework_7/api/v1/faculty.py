@@ -1,80 +1,96 @@
-import json
 from http import HTTPStatus
-from typing import List
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 
-from homework_7.schemes.faculty import Faculty, ResponseFaculty
+from homework_7.schemes.faculty import FacultiesPage, Faculty
+from homework_7.services.cache import cache_service
+from homework_7.services.cache_keys import FACULTY_CACHE, STUDENT_AGGREGATE_CACHES
+from homework_7.services.entities import OperationStatus, Principal
 from homework_7.services.faculty import faculty_service
+from homework_7.services.main_service import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
 from homework_7.services.token import token_service
-from homework_7.storages.cache import cache_storage
 
 faculty_router = APIRouter()
-FACULTY_CACHE_PREFIX_KEY = "user"
 
 
 @faculty_router.post("/create_faculty/", status_code=HTTPStatus.CREATED)
 async def create_faculty(
-    input: Faculty, current_user: str = Depends(token_service.get_auth_cookie)
+    input: Faculty, current_user: Principal = Depends(token_service.get_auth_cookie)
 ):
     faculty = await faculty_service.create_faculty(
         name=input.name,
     )
 
-    return faculty
+    if isinstance(faculty, OperationStatus):
+        return faculty.as_dict()
+
+    # Заменяем закешированный ранее 404 для нового id
+    await cache_service.write(FACULTY_CACHE, faculty.id, faculty, created=True)
+
+    return faculty.as_dict()
 
 
 @faculty_router.get("/get_faculty/{id}", status_code=HTTPStatus.OK)
 async def get_faculty(
-    id: int, current_user: str = Depends(token_service.get_auth_cookie)
+    id: int, current_user: Principal = Depends(token_service.get_auth_cookie)
 ):
-    faculty = await cache_storage.get(f"{FACULTY_CACHE_PREFIX_KEY}:{id}")
-
-    if faculty:
-        return json.loads(faculty)
-    else:
-        faculty = await faculty_service.get_faculty(id)
-
-        if faculty is None:
-            raise HTTPException(status_code=404, detail="Faculty not found")
+    faculty = await cache_service.get_or_load(
+        FACULTY_CACHE, id, lambda: faculty_service.get_faculty(id)
+    )
 
-        await cache_storage.set(
-            f"{FACULTY_CACHE_PREFIX_KEY}:{id}", json.dumps(faculty.as_dict())
-        )
+    if faculty is None:
+        raise HTTPException(status_code=404, detail="Faculty not found")
 
     return faculty
 
 
 @faculty_router.delete("/delete_faculty/{id}", status_code=HTTPStatus.NO_CONTENT)
 async def delete_faculty(
-    id: int, current_user: str = Depends(token_service.get_auth_cookie)
+    id: int, current_user: Principal = Depends(token_service.get_auth_cookie)
 ):
     result = await faculty_service.delete_faculty(id)
 
     if result.status == "error":
         raise HTTPException(status_code=404, detail=result.message)
 
-    await cache_storage.delete(f"{FACULTY_CACHE_PREFIX_KEY}:{id}")
+    await cache_service.invalidate(FACULTY_CACHE, id)
+
+    # Вместе с записью каскадно удалены ее студенты
+    for namespace in STUDENT_AGGREGATE_CACHES:
+        await cache_service.invalidate_namespace(namespace)
 
-    return result
+    return result.as_dict()
 
 
 @faculty_router.patch("/update_faculty/{id}", status_code=HTTPStatus.OK)
 async def update_faculty(
-    id: int, input: Faculty, current_user: str = Depends(token_service.get_auth_cookie)
+    id: int,
+    input: Faculty,
+    current_user: Principal = Depends(token_service.get_auth_cookie),
 ):
     result = await faculty_service.update_faculty(id, **input.model_dump())
 
     if result.status == "error":
         raise HTTPException(status_code=404, detail=result.message)
 
-    await cache_storage.delete(f"{FACULTY_CACHE_PREFIX_KEY}:{id}")
+    if result.status == "conflict":
+        raise HTTPException(status_code=HTTPStatus.CONFLICT, detail=result.message)
+
+    await cache_service.write(FACULTY_CACHE, id, result.entity)
 
-    return result
+    return result.as_dict()
 
 
 @faculty_router.get(
-    "/get_faculties/", status_code=HTTPStatus.OK, response_model=List[ResponseFaculty]
+    "/get_faculties/", status_code=HTTPStatus.OK, response_model=FacultiesPage
 )
-async def get_faculties(current_user: str = Depends(token_service.get_auth_cookie)):
-    return await faculty_service.get_unique_faculties()
+async def get_faculties(
+    limit: int = Query(default=DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    after_id: Optional[int] = None,
+    name_prefix: Optional[str] = None,
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    return await faculty_service.get_unique_faculties(
+        limit=limit, after_id=after_id, name_prefix=name_prefix
+    )
@@ -1,20 +1,41 @@
-import json
 from http import HTTPStatus
-
-from fastapi import APIRouter, Depends, HTTPException
-
-from homework_7.schemes.student import Student
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from homework_7.schemes.backend import ItemList
+from homework_7.schemes.student import (
+    ResponseStudent,
+    Student,
+    StudentList,
+    StudentsBatch,
+    StudentsPage,
+)
+from homework_7.services.cache import cache_service
+from homework_7.services.cache_keys import (
+    COURSE_STUDENTS_BELOW_GRADE_CACHE,
+    FACULTY_AVERAGE_GRADE_CACHE,
+    STUDENT_CACHE,
+    course_tag,
+    faculty_tag,
+)
+from homework_7.services.entities import OperationStatus, Principal
+from homework_7.services.export import EXPORT_FORMATTERS, EXPORT_MEDIA_TYPES
+from homework_7.services.grade_statistics import (
+    GRADE_STATISTIC_SCOPES,
+    grade_statistics_service,
+)
+from homework_7.services.main_service import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
 from homework_7.services.student import student_service
 from homework_7.services.token import token_service
-from homework_7.storages.cache import cache_storage
 
 student_router = APIRouter()
-STUDENT_CACHE_PREFIX_KEY = "student"
 
 
 @student_router.post("/create_student/", status_code=HTTPStatus.CREATED)
 async def create_student(
-    input: Student, current_user: str = Depends(token_service.get_auth_cookie)
+    input: Student, current_user: Principal = Depends(token_service.get_auth_cookie)
 ):
     student = await student_service.create_student(
         last_name=input.last_name,
@@ -24,58 +45,206 @@ async def create_student(
         grade=input.grade,
     )
 
-    return student
+    if isinstance(student, OperationStatus):
+        return student.as_dict()
+
+    # Заменяем закешированный ранее 404 для нового id
+    await cache_service.write(STUDENT_CACHE, student.id, student, created=True)
+
+    return student.as_dict()
+
+
+@student_router.post("/create_students/", status_code=HTTPStatus.CREATED)
+async def create_students(
+    input: StudentList,
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    result = await student_service.create_students(
+        [item.model_dump() for item in input.items]
+    )
+
+    # Заменяем закешированные ранее 404 для новых id
+    await cache_service.invalidate_many(STUDENT_CACHE, result.created_ids.values())
+
+    return result.as_dict()
 
 
 @student_router.get("/get_student/{id}", status_code=HTTPStatus.OK)
 async def get_student(
-    id: int, current_user: str = Depends(token_service.get_auth_cookie)
+    id: int, current_user: Principal = Depends(token_service.get_auth_cookie)
 ):
-    student = await cache_storage.get(f"{STUDENT_CACHE_PREFIX_KEY}:{id}")
+    student = await cache_service.get_or_load(
+        STUDENT_CACHE, id, lambda: student_service.get_student(id)
+    )
 
-    if student:
-        return json.loads(student)
-    else:
-        student = await student_service.get_student(id)
+    if student is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    return student
 
-        if student is None:
-            raise HTTPException(status_code=404, detail="Student not found")
 
-        await cache_storage.set(
-            f"{STUDENT_CACHE_PREFIX_KEY}:{id}", json.dumps(student.as_dict())
+@student_router.post(
+    "/get_students_by_ids/", status_code=HTTPStatus.OK, response_model=StudentsBatch
+)
+async def get_students_by_ids(
+    input: ItemList, current_user: Principal = Depends(token_service.get_auth_cookie)
+):
+    if len(input.item_ids) > MAX_PAGE_LIMIT:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Можно запросить не более {MAX_PAGE_LIMIT} студентов.",
         )
 
-    return student
+    student_ids = list(dict.fromkeys(input.item_ids))
+    students = await cache_service.get_many_or_load(
+        STUDENT_CACHE,
+        student_ids,
+        student_service.get_students_by_ids,
+    )
+
+    return {
+        "items": [students[id] for id in student_ids if students[id] is not None],
+        "missing_ids": [id for id in student_ids if students[id] is None],
+    }
 
 
 @student_router.delete("/delete_student/{id}", status_code=HTTPStatus.NO_CONTENT)
 async def delete_student(
-    id: int, current_user: str = Depends(token_service.get_auth_cookie)
+    id: int, current_user: Principal = Depends(token_service.get_auth_cookie)
 ):
     result = await student_service.delete_student(id)
 
     if result.status == "error":
         raise HTTPException(status_code=404, detail=result.message)
 
-    await cache_storage.delete(f"{STUDENT_CACHE_PREFIX_KEY}:{id}")
+    await cache_service.invalidate(STUDENT_CACHE, id)
 
-    return result
+    return result.as_dict()
 
 
 @student_router.patch("/update_student/{id}", status_code=HTTPStatus.OK)
 async def update_student(
-    id: int, input: Student, current_user: str = Depends(token_service.get_auth_cookie)
+    id: int,
+    input: Student,
+    current_user: Principal = Depends(token_service.get_auth_cookie),
 ):
     result = await student_service.update_student(id, **input.model_dump())
 
     if result.status == "error":
         raise HTTPException(status_code=404, detail=result.message)
 
-    await cache_storage.delete(f"{STUDENT_CACHE_PREFIX_KEY}:{id}")
+    if result.status == "conflict":
+        raise HTTPException(status_code=HTTPStatus.CONFLICT, detail=result.message)
+
+    await cache_service.write(STUDENT_CACHE, id, result.entity)
+
+    return result.as_dict()
+
+
+@student_router.get(
+    "/get_students/", status_code=HTTPStatus.OK, response_model=StudentsPage
+)
+async def get_students(
+    limit: int = Query(default=DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    after_id: Optional[int] = None,
+    faculty_id: Optional[int] = None,
+    course_id: Optional[int] = None,
+    min_grade: Optional[int] = Query(default=None, ge=0, le=100),
+    max_grade: Optional[int] = Query(default=None, ge=0, le=100),
+    name_prefix: Optional[str] = None,
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    return await student_service.get_students(
+        limit=limit,
+        after_id=after_id,
+        faculty_id=faculty_id,
+        course_id=course_id,
+        min_grade=min_grade,
+        max_grade=max_grade,
+        name_prefix=name_prefix,
+    )
+
+
+@student_router.get("/average_grade_by_faculty/{faculty_id}", status_code=HTTPStatus.OK)
+async def get_average_grade_by_faculty(
+    faculty_id: int, current_user: Principal = Depends(token_service.get_auth_cookie)
+):
+    average_grade = await cache_service.get_or_load(
+        FACULTY_AVERAGE_GRADE_CACHE,
+        faculty_id,
+        lambda: student_service.get_average_students_grade_by_faculty(
+            faculty_id=faculty_id
+        ),
+        tags=[faculty_tag(faculty_id)],
+    )
+
+    return {"faculty_id": faculty_id, "average_grade": average_grade}
+
+
+@student_router.get(
+    "/below_grade_by_course/{course_id}",
+    status_code=HTTPStatus.OK,
+    response_model=List[ResponseStudent],
+)
+async def get_students_below_grade_by_course(
+    course_id: int,
+    max_grade: int = Query(default=30, ge=0, le=100),
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    async def load_students():
+        students = await student_service.get_students_below_grade_by_course(
+            course_id=course_id, max_grade=max_grade
+        )
+
+        return [student.as_dict() for student in students]
+
+    return await cache_service.get_or_load(
+        COURSE_STUDENTS_BELOW_GRADE_CACHE,
+        f"{course_id}:{max_grade}",
+        load_students,
+        tags=[course_tag(course_id)],
+    )
+
+
+@student_router.get("/grade_statistics/{scope}/{entity_id}", status_code=HTTPStatus.OK)
+async def get_grade_statistics(
+    scope: str,
+    entity_id: int,
+    max_grade: Optional[int] = Query(default=None, ge=0, le=100),
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    if scope not in GRADE_STATISTIC_SCOPES:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Статистика по {scope} не поддерживается.",
+        )
+
+    statistics = await grade_statistics_service.get_statistics(scope, entity_id)
+    result = statistics.as_dict()
+
+    if max_grade is not None:
+        result["students_below_grade"] = statistics.count_below(max_grade)
 
     return result
 
 
-@student_router.get("/get_students/", status_code=HTTPStatus.OK)
-async def get_students(current_user: str = Depends(token_service.get_auth_cookie)):
-    return await student_service.get_students()
+@student_router.get("/export/", status_code=HTTPStatus.OK)
+async def export_students(
+    export_format: str = Query(default="ndjson", alias="format"),
+    current_user: Principal = Depends(token_service.get_auth_cookie),
+):
+    formatter = EXPORT_FORMATTERS.get(export_format, None)
+
+    if formatter is None:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Формат {export_format} не поддерживается.",
+        )
+
+    return StreamingResponse(
+        formatter(student_service.iter_students()),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f"attachment; filename=students.{export_format}"
+        },
+    )
@@ -0,0 +1,182 @@
+# Аналитика по колоночному снимку в сравнении с SQL-запросами к students
+# Запуск: python -m homework_7.benchmarks.analytics --rows 500000 [--repeat 20]
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("DB_URL", "sqlite+aiosqlite:///./benchmark_analytics.db")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from homework_7.db.models.models import Course, Faculty, Student  # noqa: E402
+from homework_7.services.analytics import analytics_service  # noqa: E402
+from homework_7.services.student import student_service  # noqa: E402
+
+DIMENSION_SIZE = 10
+PERCENTILES = [50, 90, 99]
+TOP_LIMIT = 10
+HISTOGRAM_BINS = 10
+
+
+async def seed(rows: int) -> None:
+    await student_service.init_db()
+    session = student_service._get_async_session()
+
+    async with session() as db:
+        count = (await db.execute(select(func.count(Student.id)))).scalar_one()
+
+        if count >= rows:
+            return
+
+        if not (await db.execute(select(Faculty.id))).first():
+            await db.execute(
+                insert(Faculty),
+                [{"name": f"Факультет {index}"} for index in range(DIMENSION_SIZE)],
+            )
+            await db.execute(
+                insert(Course),
+                [{"name": f"Курс {index}"} for index in range(DIMENSION_SIZE)],
+            )
+
+        for start in range(count, rows, 10_000):
+            await db.execute(
+                insert(Student),
+                [
+                    {
+                        "last_name": "Фамилия",
+                        "first_name": "Имя",
+                        "grade": (index * 37) % 101,
+                        "faculty": index % DIMENSION_SIZE + 1,
+                        "course": index // DIMENSION_SIZE % DIMENSION_SIZE + 1,
+                    }
+                    for index in range(start, min(start + 10_000, rows))
+                ],
+            )
+
+        await db.commit()
+
+
+async def sql_percentiles():
+    # В SQLite нет percentile_cont: сортируем оценки в БД и выбираем по рангу
+    session = student_service._get_async_session()
+
+    async with session() as db:
+        grades = (
+            (
+                await db.execute(
+                    select(Student.grade)
+                    .where(Student.grade.is_not(None))
+                    .order_by(Student.grade)
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+    return [grades[round(q / 100 * (len(grades) - 1))] for q in PERCENTILES]
+
+
+async def sql_distribution():
+    session = student_service._get_async_session()
+
+    async with session() as db:
+        rows = await db.execute(
+            select(
+                Student.faculty,
+                Student.course,
+                func.count(),
+                func.avg(Student.grade),
+                func.min(Student.grade),
+                func.max(Student.grade),
+            ).group_by(Student.faculty, Student.course)
+        )
+
+        return rows.all()
+
+
+async def sql_top_students():
+    session = student_service._get_async_session()
+
+    async with session() as db:
+        rows = await db.execute(
+            select(Student.id, Student.grade)
+            .order_by(Student.grade.desc(), Student.id)
+            .limit(TOP_LIMIT)
+        )
+
+        return rows.all()
+
+
+async def sql_histogram():
+    session = student_service._get_async_session()
+    bucket = func.min(Student.grade * HISTOGRAM_BINS / 100, HISTOGRAM_BINS - 1)
+
+    async with session() as db:
+        rows = await db.execute(
+            select(bucket, func.count()).group_by(bucket).order_by(bucket)
+        )
+
+        return rows.all()
+
+
+async def measure(name: str, func, repeat: int) -> float:
+    started_at = time.perf_counter()
+
+    for _ in range(repeat):
+        await func()
+
+    elapsed = (time.perf_counter() - started_at) / repeat * 1000
+
+    print(f"{name}: {elapsed:.2f} мс/запрос")
+
+    return elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    await seed(args.rows)
+
+    started_at = time.perf_counter()
+    snapshot = await analytics_service.get_snapshot()
+    print(
+        f"снимок: {len(snapshot)} студентов, "
+        f"{snapshot.as_dict()['memory_bytes'] / 2**20:.1f} МБ, "
+        f"построен за {time.perf_counter() - started_at:.2f} сек."
+    )
+
+    # Снимок не устаревает во время замеров
+    analytics_service._refresh_interval = float("inf")
+
+    queries = [
+        (
+            "percentiles",
+            sql_percentiles,
+            lambda: analytics_service.get_percentiles(PERCENTILES),
+        ),
+        ("distribution", sql_distribution, analytics_service.get_distribution),
+        (
+            "top_students",
+            sql_top_students,
+            lambda: analytics_service.get_top_students(TOP_LIMIT),
+        ),
+        (
+            "histogram",
+            sql_histogram,
+            lambda: analytics_service.get_histogram(HISTOGRAM_BINS),
+        ),
+    ]
+
+    for name, sql_func, snapshot_func in queries:
+        sql_ms = await measure(f"{name} (SQL)", sql_func, args.repeat)
+        snapshot_ms = await measure(f"{name} (снимок)", snapshot_func, args.repeat)
+
+        print(f"{name}: ускорение x{sql_ms / snapshot_ms:.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
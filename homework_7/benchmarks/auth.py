@@ -0,0 +1,45 @@
+# Стоимость проверки access-токена на запрос: jwt.decode в сравнении с кэшем
+# Запуск: python -m homework_7.benchmarks.auth [--requests 100000] [--users 100]
+import argparse
+import time
+from datetime import UTC, datetime, timedelta
+
+from homework_7.services.token import TokenService
+
+
+def measure(name: str, func, tokens, requests: int) -> float:
+    started_at = time.perf_counter()
+
+    for index in range(requests):
+        func(tokens[index % len(tokens)])
+
+    elapsed = (time.perf_counter() - started_at) / requests * 1_000_000
+
+    print(f"{name}: {elapsed:.2f} мкс/запрос")
+
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    token_service = TokenService()
+    exp_time = datetime.now(UTC) + timedelta(minutes=120)
+    tokens = [
+        token_service.create_token(
+            {"login": f"login_{index}", "exp": exp_time, "type": "access"}
+        )
+        for index in range(args.users)
+    ]
+
+    decode_us = measure("jwt.decode", token_service.verify_token, tokens, args.requests)
+    cached_us = measure("кэш токенов", token_service.get_claims, tokens, args.requests)
+
+    print(f"ускорение x{decode_us / cached_us:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Пропускная способность и потребление памяти потоковой выгрузки студентов
+# Запуск: python -m homework_7.benchmarks.export --rows 200000 [--trace-memory]
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault("DB_URL", "sqlite+aiosqlite:///./benchmark.db")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from homework_7.db.models.models import Course, Faculty, Student  # noqa: E402
+from homework_7.services.export import EXPORT_FORMATTERS  # noqa: E402
+from homework_7.services.student import student_service  # noqa: E402
+
+
+async def seed(rows: int) -> None:
+    await student_service.init_db()
+    session = student_service._get_async_session()
+
+    async with session() as db:
+        count = (await db.execute(select(func.count(Student.id)))).scalar_one()
+
+        if count >= rows:
+            return
+
+        if not (await db.execute(select(Faculty.id))).first():
+            await db.execute(insert(Faculty), [{"name": "Факультет"}])
+            await db.execute(insert(Course), [{"name": "Курс"}])
+
+        for start in range(count, rows, 10_000):
+            await db.execute(
+                insert(Student),
+                [
+                    {
+                        "last_name": "Фамилия",
+                        "first_name": "Имя",
+                        "grade": index % 101,
+                        "faculty": 1,
+                        "course": 1,
+                    }
+                    for index in range(start, min(start + 10_000, rows))
+                ],
+            )
+
+        await db.commit()
+
+
+async def run(export_format: str, batch_size: int, trace_memory: bool) -> None:
+    formatter = EXPORT_FORMATTERS[export_format]
+    rows = 0
+    size = 0
+
+    if trace_memory:
+        # tracemalloc заметно замедляет выгрузку, поэтому включается отдельно
+        tracemalloc.start()
+
+    started_at = time.perf_counter()
+
+    async for chunk in formatter(student_service.iter_students(batch_size)):
+        rows += chunk.count("\n")
+        size += len(chunk)
+
+    elapsed = time.perf_counter() - started_at
+
+    print(
+        f"{export_format}: {rows} строк, {size / 2**20:.1f} МБ за {elapsed:.2f} сек. "
+        f"({rows / elapsed:,.0f} строк/сек)"
+    )
+
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"{export_format}: пик памяти {peak / 2**20:.1f} МБ")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--trace-memory", action="store_true")
+    args = parser.parse_args()
+
+    await seed(args.rows)
+
+    for export_format in EXPORT_FORMATTERS:
+        await run(export_format, args.batch_size, args.trace_memory)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
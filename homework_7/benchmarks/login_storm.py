@@ -0,0 +1,110 @@
+# Задержка несвязанного эндпоинта во время шторма логинов: pbkdf2 в цикле
+# событий в сравнении с пулом потоков/процессов
+# Запуск: python -m homework_7.benchmarks.login_storm [--logins 200] [--concurrency 20]
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("DB_URL", "sqlite+aiosqlite:///./benchmark_login.db")
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+
+from homework_7 import settings  # noqa: E402
+from homework_7.main import app  # noqa: E402
+from homework_7.services.main_service import main_service  # noqa: E402
+from homework_7.services.password import password_service  # noqa: E402
+
+BASE_URL = "http://benchmark"
+USER = {
+    "last_name": "Фамилия",
+    "first_name": "Имя",
+    "login": "benchmark_login",
+    "email": "benchmark@gmail.com",
+    "password": "benchmark_pass",
+}
+CREDENTIALS = {"login": USER["login"], "password": USER["password"]}
+PROBE_URL = "/api/v1/backend/db_pool/"
+PROBE_INTERVAL = 0.005
+
+
+async def storm(client: httpx.AsyncClient, logins: int, concurrency: int) -> None:
+    remaining = iter(range(logins))
+
+    async def worker():
+        for _ in remaining:
+            response = await client.post("/api/v1/auth/login/", json=CREDENTIALS)
+            response.raise_for_status()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event) -> list:
+    # Задержка считается от запланированного времени отправки: пока цикл событий
+    # заблокирован, запрос не может уйти, и это время тоже входит в задержку
+    latencies = []
+    scheduled_at = time.perf_counter()
+
+    while not stop.is_set():
+        response = await client.get(PROBE_URL)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - scheduled_at) * 1000)
+
+        scheduled_at += PROBE_INTERVAL
+        await asyncio.sleep(max(scheduled_at - time.perf_counter(), 0))
+
+    return latencies
+
+
+async def run(mode: str, workers: int, logins: int, concurrency: int) -> None:
+    password_service.shutdown()
+    password_service._workers = workers
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        response = await client.post("/api/v1/auth/login/", json=CREDENTIALS)
+        client.cookies = response.cookies
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, stop))
+        started_at = time.perf_counter()
+
+        await storm(client, logins, concurrency)
+
+        elapsed = time.perf_counter() - started_at
+        stop.set()
+        latencies = np.array(await probe_task)
+
+    print(
+        f"{mode}: {logins / elapsed:.0f} логинов/сек, {PROBE_URL} "
+        f"p50={np.percentile(latencies, 50):.1f} мс, "
+        f"p99={np.percentile(latencies, 99):.1f} мс, "
+        f"max={latencies.max():.1f} мс ({len(latencies)} запросов)"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASH_WORKERS)
+    args = parser.parse_args()
+
+    await main_service.init_db()
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        await client.post("/api/v1/auth/register/", json=USER)
+
+    await run("в цикле событий", 0, args.logins, args.concurrency)
+    await run(
+        f"пул {settings.PASSWORD_HASH_EXECUTOR} x{args.workers}",
+        args.workers,
+        args.logins,
+        args.concurrency,
+    )
+    print(password_service.as_dict())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
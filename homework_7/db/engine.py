@@ -0,0 +1,160 @@
+import time
+from typing import Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from homework_7 import settings
+from homework_7.db.writer import WriteQueue
+
+# Один движок и одна фабрика сессий на процесс для каждого адреса БД
+_engines: Dict[str, AsyncEngine] = {}
+_session_factories: Dict[str, async_sessionmaker] = {}
+_write_session_factories: Dict[str, async_sessionmaker] = {}
+_write_queues: Dict[str, WriteQueue] = {}
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_checkout(self, wait: float) -> None:
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def as_dict(self):
+        avg_wait = self.total_wait / self.checkouts if self.checkouts else 0.0
+
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(avg_wait * 1000, 3),
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        started_at = time.perf_counter()
+
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.record_checkout(time.perf_counter() - started_at)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+
+        return pool
+
+
+def get_engine(db_url: str = settings.DB_URL) -> AsyncEngine:
+    if db_url not in _engines:
+        _engines[db_url] = create_async_engine(
+            db_url,
+            poolclass=InstrumentedAsyncPool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+
+        if db_url.startswith("sqlite") and (
+            settings.DB_SQLITE_TUNING or settings.DB_WRITE_QUEUE
+        ):
+            _setup_sqlite(_engines[db_url])
+
+    return _engines[db_url]
+
+
+def get_session_factory(db_url: str = settings.DB_URL) -> async_sessionmaker:
+    if db_url not in _session_factories:
+        _session_factories[db_url] = async_sessionmaker(
+            get_engine(db_url),
+            class_=AsyncSession,
+            expire_on_commit=False,
+        )
+
+    return _session_factories[db_url]
+
+
+def get_write_session_factory(db_url: str = settings.DB_URL) -> async_sessionmaker:
+    # Сессии, которые пишут: в SQLite транзакция начинается с BEGIN IMMEDIATE
+    if db_url not in _write_session_factories:
+        _write_session_factories[db_url] = async_sessionmaker(
+            get_engine(db_url).execution_options(sqlite_begin_mode="IMMEDIATE"),
+            class_=AsyncSession,
+            expire_on_commit=False,
+        )
+
+    return _write_session_factories[db_url]
+
+
+def get_write_queue(db_url: str = settings.DB_URL) -> WriteQueue:
+    if db_url not in _write_queues:
+        _write_queues[db_url] = WriteQueue(
+            get_write_session_factory(db_url),
+            max_batch_size=settings.DB_WRITE_QUEUE_MAX_BATCH,
+            max_delay=settings.DB_WRITE_QUEUE_MAX_DELAY,
+        )
+
+    return _write_queues[db_url]
+
+
+def get_pool_status(db_url: str = settings.DB_URL) -> dict:
+    pool = get_engine(db_url).pool
+
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        **pool.metrics.as_dict(),
+    }
+
+
+def _setup_sqlite(engine: AsyncEngine) -> None:
+    # Транзакциями управляем сами: драйвер sqlite3 иначе ломает SAVEPOINT,
+    # на которых построена групповая запись в WriteQueue
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+        if not settings.DB_SQLITE_TUNING:
+            return
+
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={settings.DB_SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size={settings.DB_SQLITE_CACHE_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute(f"PRAGMA busy_timeout={settings.DB_SQLITE_BUSY_TIMEOUT}")
+        cursor.close()
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def on_begin(conn):
+        # Отложенная транзакция, начавшаяся с чтения, не получит блокировку
+        # записи после commit другого писателя (busy_timeout не поможет),
+        # поэтому пишущие сессии берут ее сразу
+        mode = conn.get_execution_options().get("sqlite_begin_mode", "DEFERRED")
+        conn.exec_driver_sql(f"BEGIN {mode}")
@@ -0,0 +1,20 @@
+from sqlalchemy.exc import IntegrityError
+
+# SQLITE_CONSTRAINT_UNIQUE ERROR
+SQLITE_UNIQUE_VIOLATION_CODE = 2067
+# PostgreSQL unique_violation
+POSTGRES_UNIQUE_VIOLATION_CODE = "23505"
+
+
+def is_unique_violation(error: Exception) -> bool:
+    if not isinstance(error, IntegrityError):
+        return False
+
+    orig = error.orig
+
+    if getattr(orig, "sqlite_errorcode", None) == SQLITE_UNIQUE_VIOLATION_CODE:
+        return True
+
+    sqlstate = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+
+    return sqlstate == POSTGRES_UNIQUE_VIOLATION_CODE
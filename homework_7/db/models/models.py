@@ -1,8 +1,12 @@
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Column, ForeignKey, Index, Integer, String
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
 # Модели базы данных
+# Связи по умолчанию не загружаются (lazy="raise"): запросы, которым они нужны,
+# явно указывают selectinload(...)
+# Колонка version увеличивается при каждом UPDATE через ORM: конкурентное
+# обновление устаревшей версии завершается StaleDataError
 Base = declarative_base()
 
 
@@ -11,8 +15,11 @@ class Faculty(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True)
+    version = Column(Integer, nullable=False, server_default="1")
 
-    students = relationship("Student", back_populates="faculties", lazy="subquery")
+    students = relationship("Student", back_populates="faculties", lazy="raise")
+
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return f"{self.id} - {self.name}"
@@ -29,8 +36,11 @@ class Course(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True)
+    version = Column(Integer, nullable=False, server_default="1")
+
+    students = relationship("Student", back_populates="courses", lazy="raise")
 
-    students = relationship("Student", back_populates="courses", lazy="subquery")
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return f"{self.id} - {self.name}"
@@ -44,6 +54,18 @@ class Course(Base):
 
 class Student(Base):
     __tablename__ = "students"
+    # Составные индексы под фильтры и пагинацию по id в get_students
+    __table_args__ = (
+        Index("ix_students_faculty_id", "faculty", "id"),
+        Index("ix_students_course_id", "course", "id"),
+        Index("ix_students_grade_id", "grade", "id"),
+        Index(
+            "ix_students_last_name_id",
+            "last_name",
+            "id",
+            postgresql_ops={"last_name": "text_pattern_ops"},
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     last_name = Column(String(128))
@@ -51,9 +73,12 @@ class Student(Base):
     grade = Column(Integer)
     faculty = Column(Integer, ForeignKey("faculties.id", ondelete="CASCADE"))
     course = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"))
+    version = Column(Integer, nullable=False, server_default="1")
 
-    faculties = relationship("Faculty", back_populates="students", lazy="subquery")
-    courses = relationship("Course", back_populates="students", lazy="subquery")
+    faculties = relationship("Faculty", back_populates="students", lazy="raise")
+    courses = relationship("Course", back_populates="students", lazy="raise")
+
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return (
@@ -81,6 +106,9 @@ class User(Base):
     last_name = Column(String(128), default="noname")
     email = Column(String(255), default="admin@admin.ru")
     password = Column(String(128))
+    version = Column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return f"{self.id} - {self.login} - {self.password}"
@@ -94,3 +122,16 @@ class User(Base):
             "email": self.email,
             "password": self.password,
         }
+
+
+class GradeStatistic(Base):
+    __tablename__ = "grade_statistics"
+    # Гистограмма оценок по факультету/курсу: одна строка на оценку.
+    # Количество, сумма, min/max и т.д. считаются по ней без обхода students
+    scope = Column(String(16), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+    grade = Column(Integer, primary_key=True)
+    students_count = Column(Integer, nullable=False, server_default="0")
+
+    def __repr__(self):
+        return f"{self.scope} - {self.entity_id} - {self.grade} - {self.students_count}"
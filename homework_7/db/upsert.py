@@ -0,0 +1,46 @@
+from typing import Any, Dict, Iterable, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+# INSERT ... ON CONFLICT есть только в диалектных конструкциях insert
+DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+NAMES_CHUNK_SIZE = 500
+
+
+def dialect_insert(db, model):
+    return DIALECT_INSERTS[db.get_bind().dialect.name](model)
+
+
+async def get_or_create_by_name(
+    db, model, names: Iterable[str]
+) -> Tuple[Dict[str, Any], int]:
+    # INSERT ... ON CONFLICT DO NOTHING RETURNING возвращает только новые строки.
+    # Существующие, в том числе вставленные конкурентно, дочитываются SELECT:
+    # для новых имен это один запрос, и гонки SELECT-then-INSERT нет
+    names = sorted(set(names))
+    entities: Dict[str, Any] = {}
+
+    # Одинаковый порядок вставки в конкурентных транзакциях исключает deadlock
+    for start in range(0, len(names), NAMES_CHUNK_SIZE):
+        end = start + NAMES_CHUNK_SIZE
+        query = (
+            dialect_insert(db, model)
+            .values([{"name": name} for name in names[start:end]])
+            .on_conflict_do_nothing(index_elements=["name"])
+            .returning(model)
+        )
+        entities.update((entity.name, entity) for entity in await db.scalars(query))
+
+    created = len(entities)
+    existing = [name for name in names if name not in entities]
+
+    for start in range(0, len(existing), NAMES_CHUNK_SIZE):
+        end = start + NAMES_CHUNK_SIZE
+        query = select(model).where(model.name.in_(existing[start:end]))
+        entities.update((entity.name, entity) for entity in await db.scalars(query))
+
+    return entities, created
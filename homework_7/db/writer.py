@@ -0,0 +1,108 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+WriteOperation = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class WriteQueue:
+    # Единственный писатель: операции из всех сервисов собираются в пачку
+    # и фиксируются одним commit, каждая в своей точке сохранения
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        max_batch_size: int,
+        max_delay: float,
+    ):
+        self._session_factory = session_factory
+        self._max_batch_size = max_batch_size
+        self._max_delay = max_delay
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.operations = 0
+
+    async def submit(self, operation: WriteOperation) -> Any:
+        self._ensure_worker()
+
+        future = self._loop.create_future()
+        await self._queue.put((operation, future))
+
+        return await future
+
+    async def close(self) -> None:
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    def as_dict(self):
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "operations": self.operations,
+            "avg_batch_size": (
+                round(self.operations / self.batches, 2) if self.batches else 0.0
+            ),
+        }
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self._max_delay
+
+            while len(batch) < self._max_batch_size:
+                timeout = deadline - self._loop.time()
+
+                if timeout <= 0:
+                    break
+
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._commit_batch(batch)
+
+    async def _commit_batch(
+        self, batch: List[Tuple[WriteOperation, asyncio.Future]]
+    ) -> None:
+        results = []
+
+        try:
+            async with self._session_factory() as db:
+                for operation, future in batch:
+                    try:
+                        async with db.begin_nested():
+                            results.append((future, await operation(db), None))
+                    except Exception as e:
+                        results.append((future, None, e))
+
+                await db.commit()
+        except Exception as e:
+            results = [(future, None, e) for _, future in batch]
+
+        self.batches += 1
+        self.operations += len(batch)
+
+        for future, result, error in results:
+            if future.done():
+                continue
+
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
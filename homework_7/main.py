@@ -3,6 +3,7 @@ import asyncio
 import uvicorn
 from fastapi import FastAPI
 
+from homework_7.api.v1.analytics import analytics_router
 from homework_7.api.v1.auth import auth_router
 from homework_7.api.v1.backend import backend_router
 from homework_7.api.v1.course import course_router
@@ -19,6 +20,7 @@ app.include_router(faculty_router, prefix="/api/v1/faculties")
 app.include_router(user_router, prefix="/api/v1/users")
 app.include_router(auth_router, prefix="/api/v1/auth")
 app.include_router(backend_router, prefix="/api/v1/backend")
+app.include_router(analytics_router, prefix="/api/v1/analytics")
 
 
 if __name__ == "__main__":
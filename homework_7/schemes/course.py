@@ -1,4 +1,5 @@
 import re
+from typing import List, Optional
 
 from pydantic import BaseModel, Field, field_validator
 
@@ -21,3 +22,8 @@ class Course(BaseModel):
 class ResponseCourse(BaseModel):
     id: int = Field(description="Id курса")
     name: str = Field(description="Название курса")
+
+
+class CoursesPage(BaseModel):
+    items: List[ResponseCourse] = Field(description="Курсы")
+    next_cursor: Optional[int] = Field(description="after_id следующей страницы")
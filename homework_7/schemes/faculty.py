@@ -1,4 +1,5 @@
 import re
+from typing import List, Optional
 
 from pydantic import BaseModel, Field, field_validator
 
@@ -21,3 +22,8 @@ class Faculty(BaseModel):
 class ResponseFaculty(BaseModel):
     id: int = Field(description="Id факультета")
     name: str = Field(description="Название факультета")
+
+
+class FacultiesPage(BaseModel):
+    items: List[ResponseFaculty] = Field(description="Факультеты")
+    next_cursor: Optional[int] = Field(description="after_id следующей страницы")
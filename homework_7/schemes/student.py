@@ -1,7 +1,11 @@
 import re
+from typing import List, Optional
 
 from pydantic import BaseModel, Field, field_validator
 
+# Размер пачки проверяется при разборе тела, до валидации каждого студента
+MAX_CREATE_BATCH_SIZE = 5000
+
 
 class Student(BaseModel):
     last_name: str = Field(description="Фамилия")
@@ -39,3 +43,28 @@ class Student(BaseModel):
             )
 
         return value
+
+
+class StudentList(BaseModel):
+    items: List[Student] = Field(
+        description="Студенты", max_length=MAX_CREATE_BATCH_SIZE
+    )
+
+
+class ResponseStudent(BaseModel):
+    id: int = Field(description="Id студента")
+    last_name: str = Field(description="Фамилия")
+    first_name: str = Field(description="Имя")
+    grade: Optional[int] = Field(description="Оценка")
+    faculty: Optional[int] = Field(description="Id факультета")
+    course: Optional[int] = Field(description="Id курса")
+
+
+class StudentsPage(BaseModel):
+    items: List[ResponseStudent] = Field(description="Студенты")
+    next_cursor: Optional[int] = Field(description="after_id следующей страницы")
+
+
+class StudentsBatch(BaseModel):
+    items: List[ResponseStudent] = Field(description="Найденные студенты")
+    missing_ids: List[int] = Field(description="Id, для которых студент не найден")
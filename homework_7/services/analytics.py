@@ -0,0 +1,325 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+from sqlalchemy import func, select
+
+from homework_7 import settings
+from homework_7.db.models.models import Student
+from homework_7.services.main_service import MainService
+
+SNAPSHOT_BATCH_SIZE = 10_000
+# Отсутствующий факультет/курс в колоночном снимке
+MISSING_CODE = -1
+
+
+@dataclass
+class StudentSnapshot:
+    # Колонки отсортированы по id; студенты без оценки в снимок не попадают
+    ids: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    grades: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int16))
+    faculties: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    courses: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    # Максимальный прочитанный id: новые строки догружаются по id > watermark
+    watermark: int = 0
+    built_at: float = 0.0
+    refreshed_at: float = 0.0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def mask(
+        self, faculty_id: Optional[int] = None, course_id: Optional[int] = None
+    ) -> np.ndarray:
+        mask = np.ones(len(self), dtype=bool)
+
+        if faculty_id is not None:
+            mask &= self.faculties == faculty_id
+
+        if course_id is not None:
+            mask &= self.courses == course_id
+
+        return mask
+
+    def without(self, ids: np.ndarray) -> "StudentSnapshot":
+        keep = ~np.isin(self.ids, ids)
+
+        return StudentSnapshot(
+            ids=self.ids[keep],
+            grades=self.grades[keep],
+            faculties=self.faculties[keep],
+            courses=self.courses[keep],
+            watermark=self.watermark,
+            built_at=self.built_at,
+            refreshed_at=self.refreshed_at,
+        )
+
+    def merge(self, rows: "StudentSnapshot") -> "StudentSnapshot":
+        ids = np.concatenate((self.ids, rows.ids))
+        order = np.argsort(ids, kind="stable")
+
+        return StudentSnapshot(
+            ids=ids[order],
+            grades=np.concatenate((self.grades, rows.grades))[order],
+            faculties=np.concatenate((self.faculties, rows.faculties))[order],
+            courses=np.concatenate((self.courses, rows.courses))[order],
+            watermark=max(self.watermark, rows.watermark),
+            built_at=self.built_at,
+            refreshed_at=self.refreshed_at,
+        )
+
+    def as_dict(self):
+        return {
+            "students": len(self),
+            "watermark": self.watermark,
+            "memory_bytes": sum(
+                column.nbytes
+                for column in (self.ids, self.grades, self.faculties, self.courses)
+            ),
+            "age_seconds": round(time.monotonic() - self.built_at, 3),
+            "seconds_since_refresh": round(time.monotonic() - self.refreshed_at, 3),
+        }
+
+
+class AnalyticsService(MainService):
+    def __init__(
+        self,
+        db_url: str = settings.DB_URL,
+        refresh_interval: float = settings.ANALYTICS_REFRESH_INTERVAL,
+        max_age: float = settings.ANALYTICS_SNAPSHOT_MAX_AGE,
+    ):
+        super().__init__(db_url)
+        self._refresh_interval = refresh_interval
+        self._max_age = max_age
+        self._snapshot: Optional[StudentSnapshot] = None
+        # Журнал изменений этого процесса: id обновленных/удаленных студентов
+        self._changed_ids: Set[int] = set()
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+
+    def record_changes(self, student_ids: Iterable[int]) -> None:
+        self._changed_ids.update(student_ids)
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+
+    async def get_snapshot(self) -> StudentSnapshot:
+        snapshot = self._snapshot
+
+        if snapshot is not None and not self._is_stale(snapshot):
+            return snapshot
+
+        async with self._get_lock():
+            snapshot = self._snapshot
+
+            if snapshot is None or time.monotonic() - snapshot.built_at > self._max_age:
+                # Полная перестройка догоняет изменения других процессов
+                self._changed_ids.clear()
+                snapshot = await self._load(StudentSnapshot(built_at=time.monotonic()))
+            elif self._is_stale(snapshot):
+                snapshot = await self._refresh(snapshot)
+
+            snapshot.refreshed_at = time.monotonic()
+            self._snapshot = snapshot
+
+        return snapshot
+
+    async def get_percentiles(
+        self,
+        percentiles: Sequence[float],
+        faculty_id: Optional[int] = None,
+        course_id: Optional[int] = None,
+    ) -> dict:
+        snapshot = await self.get_snapshot()
+        grades = snapshot.grades[snapshot.mask(faculty_id, course_id)]
+        values = (
+            np.percentile(grades, percentiles).tolist()
+            if len(grades)
+            else [None] * len(percentiles)
+        )
+
+        return {
+            "count": len(grades),
+            "percentiles": {
+                f"{percentile:g}": value
+                for percentile, value in zip(percentiles, values)
+            },
+        }
+
+    async def get_histogram(
+        self,
+        bins: int,
+        faculty_id: Optional[int] = None,
+        course_id: Optional[int] = None,
+    ) -> dict:
+        snapshot = await self.get_snapshot()
+        grades = snapshot.grades[snapshot.mask(faculty_id, course_id)]
+        counts, edges = np.histogram(grades, bins=bins, range=(0, 100))
+
+        return {
+            "count": len(grades),
+            "edges": edges.tolist(),
+            "counts": counts.tolist(),
+        }
+
+    async def get_distribution(self) -> List[dict]:
+        # Группировка по паре (факультет, курс) без обхода строк в Python
+        snapshot = await self.get_snapshot()
+
+        if not len(snapshot):
+            return []
+
+        # Сортировка по (пара, оценка): группы идут подряд, min/max - их края
+        courses = snapshot.courses.astype(np.int64) - MISSING_CODE
+        keys = (snapshot.faculties.astype(np.int64) - MISSING_CODE) * (
+            courses.max() + 1
+        ) + courses
+        order = np.lexsort((snapshot.grades, keys))
+        keys = keys[order]
+        grades = snapshot.grades[order].astype(np.float64)
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        counts = np.diff(np.r_[starts, len(keys)])
+        totals = np.add.reduceat(grades, starts)
+        squares = np.add.reduceat(grades**2, starts)
+        minimums = grades[starts]
+        maximums = grades[starts + counts - 1]
+        averages = totals / counts
+        stddevs = np.sqrt(np.maximum(squares / counts - averages**2, 0.0))
+
+        return [
+            {
+                "faculty_id": _code_to_id(faculty),
+                "course_id": _code_to_id(course),
+                "count": int(count),
+                "average": float(average),
+                "stddev": float(stddev),
+                "min_grade": int(minimum),
+                "max_grade": int(maximum),
+            }
+            for faculty, course, count, average, stddev, minimum, maximum in zip(
+                snapshot.faculties[order][starts].tolist(),
+                snapshot.courses[order][starts].tolist(),
+                counts,
+                averages,
+                stddevs,
+                minimums,
+                maximums,
+            )
+        ]
+
+    async def get_top_students(
+        self,
+        limit: int,
+        faculty_id: Optional[int] = None,
+        course_id: Optional[int] = None,
+    ) -> List[dict]:
+        snapshot = await self.get_snapshot()
+        mask = snapshot.mask(faculty_id, course_id)
+        ids = snapshot.ids[mask]
+        grades = snapshot.grades[mask]
+
+        if limit < len(grades):
+            # argpartition: O(n) вместо полной сортировки
+            top = np.argpartition(-grades, limit - 1)[:limit]
+        else:
+            top = np.arange(len(grades))
+
+        # По убыванию оценки, при равенстве - по id
+        top = top[np.lexsort((ids[top], -grades[top]))]
+
+        return [
+            {"id": int(id), "grade": int(grade)}
+            for id, grade in zip(ids[top], grades[top])
+        ]
+
+    def _is_stale(self, snapshot: StudentSnapshot) -> bool:
+        now = time.monotonic()
+
+        return (
+            now - snapshot.built_at > self._max_age
+            or now - snapshot.refreshed_at > self._refresh_interval
+        )
+
+    async def _refresh(self, snapshot: StudentSnapshot) -> StudentSnapshot:
+        # Новые строки - по watermark, измененные и удаленные - по журналу
+        changed_ids = self._changed_ids
+        self._changed_ids = set()
+
+        try:
+            snapshot = await self._load(snapshot)
+
+            if not changed_ids:
+                return snapshot
+
+            reloaded = await self._load(
+                StudentSnapshot(watermark=snapshot.watermark),
+                Student.id.in_(changed_ids),
+            )
+        except Exception:
+            # Без журнала изменения не попадут в снимок до полной перестройки
+            self._changed_ids |= changed_ids
+            raise
+
+        changed = np.fromiter(changed_ids, dtype=np.int64, count=len(changed_ids))
+
+        return snapshot.without(changed).merge(reloaded)
+
+    async def _load(self, snapshot: StudentSnapshot, condition=None) -> StudentSnapshot:
+        session = self._get_async_session()
+        query = select(
+            Student.id,
+            func.coalesce(Student.grade, MISSING_CODE),
+            func.coalesce(Student.faculty, MISSING_CODE),
+            func.coalesce(Student.course, MISSING_CODE),
+        )
+
+        if condition is None:
+            query = query.where(Student.id > snapshot.watermark)
+        else:
+            query = query.where(condition)
+
+        partitions = []
+
+        async with session() as db:
+            result = await db.stream(
+                query.order_by(Student.id).execution_options(
+                    yield_per=SNAPSHOT_BATCH_SIZE
+                )
+            )
+
+            async for partition in result.partitions():
+                partitions.append(np.array(list(map(tuple, partition)), dtype=np.int64))
+
+        if not partitions:
+            return snapshot
+
+        columns = np.concatenate(partitions)
+        graded = columns[:, 1] != MISSING_CODE
+        new_rows = StudentSnapshot(
+            ids=columns[graded, 0],
+            grades=columns[graded, 1].astype(np.int16),
+            faculties=columns[graded, 2].astype(np.int32),
+            courses=columns[graded, 3].astype(np.int32),
+            watermark=int(columns[:, 0].max()),
+        )
+
+        return snapshot.merge(new_rows)
+
+    def _get_lock(self) -> asyncio.Lock:
+        # Lock привязан к циклу событий, в котором используется
+        loop = asyncio.get_running_loop()
+
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+
+        return self._lock
+
+
+def _code_to_id(code: int) -> Optional[int]:
+    return None if code == MISSING_CODE else code
+
+
+analytics_service = AnalyticsService()
@@ -0,0 +1,297 @@
+import asyncio
+import json
+import math
+import random
+import time
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from redis.exceptions import RedisError
+
+from homework_7 import settings
+from homework_7.services.cache_keys import CacheNamespace
+from homework_7.storages.cache import CacheStorage, cache_storage
+
+CACHE_TTL = 60
+CACHE_TTL_JITTER = 0.1
+NEGATIVE_CACHE_TTL = 5
+EARLY_REFRESH_BETA = 1.0
+# Как долго процесс использует прочитанное поколение namespace без запроса в Redis
+GENERATION_TTL = 1.0
+# Ошибки недоступного Redis: кеш пропускается, данные читаются из БД
+CACHE_ERRORS = (RedisError, OSError)
+
+Loader = Callable[[], Awaitable[Any]]
+ManyLoader = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+
+class CacheService:
+    def __init__(
+        self,
+        storage: CacheStorage,
+        ttl: int = CACHE_TTL,
+        ttl_jitter: float = CACHE_TTL_JITTER,
+        negative_ttl: int = NEGATIVE_CACHE_TTL,
+        early_refresh_beta: float = EARLY_REFRESH_BETA,
+        write_through: bool = False,
+    ):
+        self._storage = storage
+        self._ttl = ttl
+        self._ttl_jitter = ttl_jitter
+        self._negative_ttl = negative_ttl
+        self._early_refresh_beta = early_refresh_beta
+        self._write_through = write_through
+        self._loads: Dict[str, asyncio.Task] = {}
+        self._generations: Dict[CacheNamespace, Tuple[float, int]] = {}
+
+    async def get_or_load(
+        self,
+        namespace: CacheNamespace,
+        id: Hashable,
+        loader: Loader,
+        ttl: Optional[int] = None,
+        tags: Sequence[str] = (),
+    ) -> Optional[Any]:
+        try:
+            key = namespace.key(id, await self._get_generation(namespace))
+
+            if tags:
+                # Версии тегов входят в ключ: invalidate_tags делает старые
+                # записи недостижимыми
+                versions = await self._storage.get_counters(
+                    self._tag_key(tag) for tag in tags
+                )
+                key = f"{key}:t{'.'.join(map(str, versions))}"
+            cached = await self._storage.get(key)
+        except CACHE_ERRORS as error:
+            print(f"Кеш {namespace.name} недоступен, данные читаются из БД: {error}")
+            return _as_value(await loader())
+
+        if cached is not None:
+            entry = json.loads(cached)
+
+            if not self._should_refresh_early(entry):
+                return entry["value"]
+
+        return await self._load(key, loader, ttl or self._ttl)
+
+    async def get_many_or_load(
+        self,
+        namespace: CacheNamespace,
+        ids: Iterable[Hashable],
+        loader: ManyLoader,
+        ttl: Optional[int] = None,
+    ) -> Dict[Hashable, Optional[Any]]:
+        # Промахи загружаются одним вызовом loader
+        ids = list(ids)
+
+        try:
+            generation = await self._get_generation(namespace)
+            keys = {id: namespace.key(id, generation) for id in ids}
+            cached = await self._storage.get_many(keys.values())
+        except CACHE_ERRORS as error:
+            print(f"Кеш {namespace.name} недоступен, данные читаются из БД: {error}")
+            loaded = await loader(ids)
+
+            return {id: _as_value(loaded.get(id)) for id in ids}
+
+        values = {}
+        missing = []
+
+        for id, entry in zip(keys, cached):
+            if entry is not None:
+                entry = json.loads(entry)
+
+                if not self._should_refresh_early(entry):
+                    values[id] = entry["value"]
+                    continue
+
+            missing.append(id)
+
+        if not missing:
+            return values
+
+        started_at = time.perf_counter()
+        loaded = await loader(missing)
+        delta = time.perf_counter() - started_at
+        items = []
+
+        for id in missing:
+            value, entry, entry_ttl = self._make_entry(
+                loaded.get(id), delta, ttl or self._ttl
+            )
+            values[id] = value
+            items.append((keys[id], json.dumps(entry), entry_ttl, entry.get("version")))
+
+        try:
+            await self._storage.set_many(items)
+        except CACHE_ERRORS as error:
+            print(f"Не удалось записать в кеш {namespace.name}: {error}")
+
+        return values
+
+    async def write(
+        self,
+        namespace: CacheNamespace,
+        id: Hashable,
+        value: Any,
+        created: bool = False,
+    ) -> None:
+        # Вызывается после коммита: в режиме write-through кладем свежую запись,
+        # иначе только сбрасываем ключ
+        if not self._write_through or value is None:
+            await self.invalidate(namespace, id)
+            return
+
+        _, entry, ttl = self._make_entry(value, 0.0, self._ttl)
+
+        try:
+            generation = await self._get_generation(namespace, fresh=True)
+            key = namespace.key(id, generation)
+
+            if created:
+                # Новая строка могла получить id удаленной: запись с ее версией
+                # устарела, даже если номер версии больше
+                await self._storage.set(key, json.dumps(entry), expire_time=ttl)
+            else:
+                await self._store(key, entry, ttl)
+        except CACHE_ERRORS as error:
+            # Запись в БД уже закоммичена: ошибка кеша не должна ломать запрос
+            print(f"Не удалось записать в кеш {namespace.name}:{id}: {error}")
+            await self.invalidate(namespace, id)
+
+    async def invalidate(self, namespace: CacheNamespace, id: Hashable) -> None:
+        try:
+            generation = await self._get_generation(namespace, fresh=True)
+
+            await self._storage.delete(namespace.key(id, generation))
+        except CACHE_ERRORS as error:
+            print(f"Не удалось сбросить кеш {namespace.name}:{id}: {error}")
+
+    async def invalidate_many(
+        self, namespace: CacheNamespace, ids: Iterable[Hashable]
+    ) -> None:
+        try:
+            generation = await self._get_generation(namespace, fresh=True)
+
+            await self._storage.delete_many(namespace.key(id, generation) for id in ids)
+        except CACHE_ERRORS as error:
+            print(f"Не удалось сбросить кеш {namespace.name}: {error}")
+
+    async def invalidate_namespace(self, namespace: CacheNamespace) -> None:
+        # Записи прошлых поколений больше не читаются и истекают по TTL
+        try:
+            generation = await self._storage.incr(namespace.generation_key)
+        except CACHE_ERRORS as error:
+            print(f"Не удалось сбросить кеш {namespace.name}: {error}")
+            return
+
+        self._generations[namespace] = (time.monotonic() + GENERATION_TTL, generation)
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        tags = set(tags)
+
+        if not tags:
+            return
+
+        try:
+            await self._storage.incr_many(self._tag_key(tag) for tag in tags)
+        except CACHE_ERRORS as error:
+            print(f"Не удалось сбросить теги кеша {', '.join(sorted(tags))}: {error}")
+
+    async def _get_generation(
+        self, namespace: CacheNamespace, fresh: bool = False
+    ) -> int:
+        cached = self._generations.get(namespace)
+
+        if not fresh and cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        generation = await self._storage.get_counter(namespace.generation_key)
+        self._generations[namespace] = (time.monotonic() + GENERATION_TTL, generation)
+
+        return generation
+
+    async def _load(self, key: str, loader: Loader, ttl: int) -> Optional[Any]:
+        # Один запрос в БД на ключ: остальные ждут результат первого
+        task = self._loads.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(self._load_and_store(key, loader, ttl))
+            self._loads[key] = task
+            task.add_done_callback(lambda _: self._loads.pop(key, None))
+
+        return await asyncio.shield(task)
+
+    async def _load_and_store(self, key: str, loader: Loader, ttl: int):
+        started_at = time.perf_counter()
+        value = await loader()
+        delta = time.perf_counter() - started_at
+        value, entry, ttl = self._make_entry(value, delta, ttl)
+
+        try:
+            await self._store(key, entry, ttl)
+        except CACHE_ERRORS as error:
+            print(f"Не удалось записать в кеш {key}: {error}")
+
+        return value
+
+    async def _store(self, key: str, entry: dict, ttl: int) -> None:
+        if entry.get("version") is None:
+            await self._storage.set(key, json.dumps(entry), expire_time=ttl)
+            return
+
+        # Загрузка или запись старой версии не перетирает более новую
+        await self._storage.set_if_newer(
+            key, json.dumps(entry), entry["version"], expire_time=ttl
+        )
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"tag:{tag}"
+
+    def _make_entry(self, value: Any, delta: float, ttl: int) -> Tuple[Any, dict, int]:
+        version = getattr(value, "version", None)
+        value = _as_value(value)
+
+        # Отсутствующие записи кешируем ненадолго, чтобы 404 не били в БД
+        ttl = self._jitter(ttl if value is not None else self._negative_ttl)
+        entry = {"value": value, "delta": delta, "expiry": time.time() + ttl}
+
+        if version is not None:
+            entry["version"] = version
+
+        return value, entry, ttl
+
+    def _jitter(self, ttl: int) -> int:
+        spread = ttl * self._ttl_jitter
+
+        return max(1, round(ttl + random.uniform(-spread, spread)))
+
+    def _should_refresh_early(self, entry: dict) -> bool:
+        # Вероятностное обновление до истечения TTL (XFetch): чем ближе
+        # expiry и дольше загрузка, тем выше шанс обновить запись заранее
+        if "value" not in entry:
+            return True
+
+        delta = entry.get("delta", 0) * self._early_refresh_beta
+        early = -delta * math.log(1.0 - random.random())
+
+        return time.time() + early >= entry.get("expiry", 0)
+
+
+def _as_value(value: Any) -> Any:
+    return value.as_dict() if hasattr(value, "as_dict") else value
+
+
+cache_service = CacheService(cache_storage, write_through=settings.CACHE_WRITE_THROUGH)
@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+from typing import Dict, Hashable
+
+
+@dataclass(frozen=True)
+class CacheNamespace:
+    name: str
+    # Увеличивается при изменении формата as_dict: старые записи перестают читаться
+    schema_version: int
+
+    @property
+    def generation_key(self) -> str:
+        return f"generation:{self.name}:v{self.schema_version}"
+
+    def key(self, id: Hashable, generation: int) -> str:
+        return f"{self.name}:v{self.schema_version}:g{generation}:{id}"
+
+
+STUDENT_CACHE = CacheNamespace(name="student", schema_version=1)
+COURSE_CACHE = CacheNamespace(name="course", schema_version=1)
+FACULTY_CACHE = CacheNamespace(name="faculty", schema_version=1)
+USER_CACHE = CacheNamespace(name="user", schema_version=1)
+# Ключ - логин из access-токена
+PRINCIPAL_CACHE = CacheNamespace(name="principal", schema_version=1)
+FACULTY_AVERAGE_GRADE_CACHE = CacheNamespace(
+    name="faculty_average_grade", schema_version=1
+)
+COURSE_STUDENTS_BELOW_GRADE_CACHE = CacheNamespace(
+    name="course_students_below_grade", schema_version=1
+)
+# Агрегаты по студентам: сбрасываются тегами факультета/курса
+STUDENT_AGGREGATE_CACHES = (
+    FACULTY_AVERAGE_GRADE_CACHE,
+    COURSE_STUDENTS_BELOW_GRADE_CACHE,
+)
+
+CACHE_NAMESPACES: Dict[str, CacheNamespace] = {
+    namespace.name: namespace
+    for namespace in (
+        STUDENT_CACHE,
+        COURSE_CACHE,
+        FACULTY_CACHE,
+        USER_CACHE,
+        PRINCIPAL_CACHE,
+        *STUDENT_AGGREGATE_CACHES,
+    )
+}
+
+
+def faculty_tag(faculty_id: int) -> str:
+    return f"faculty:{faculty_id}"
+
+
+def course_tag(course_id: int) -> str:
+    return f"course:{course_id}"
@@ -1,38 +1,76 @@
-from typing import Optional
+from typing import Dict, Iterable, List, Optional
 
 from sqlalchemy import delete, select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 
+from homework_7 import settings
 from homework_7.db.models.models import Course
-from homework_7.services.entities import OperationStatus
-from homework_7.services.main_service import MainService
+from homework_7.db.upsert import dialect_insert, get_or_create_by_name
+from homework_7.services.analytics import analytics_service
+from homework_7.services.dimension_cache import DimensionCache
+from homework_7.services.entities import BulkDeleteResult, Job, OperationStatus
+from homework_7.services.grade_statistics import rebuild_grade_statistics
+from homework_7.services.main_service import UPDATE_CONFLICT_MESSAGE, MainService
 
 
 class CourseService(MainService):
+    def __init__(self, db_url: str = settings.DB_URL):
+        super().__init__(db_url)
+        # Общий для загрузки csv и API справочник name -> id
+        self.name_ids = DimensionCache(
+            self._load_name_ids, ttl=settings.DIMENSION_CACHE_TTL
+        )
+
     async def create_course(self, name):
-        session = self._get_async_session()
+        async def operation(db):
+            query = (
+                dialect_insert(db, Course)
+                .values(name=name)
+                .on_conflict_do_nothing(index_elements=["name"])
+                .returning(Course)
+            )
 
-        course = Course(name=name)
+            return (await db.scalars(query)).one_or_none()
 
         try:
-            async with session() as db:
-                db.add(course)
-                await db.commit()
-
-            return course
+            course = await self._execute_write(operation)
         except Exception as e:
-            await db.rollback()
-            if isinstance(e, IntegrityError):
-                # SQLITE_CONSTRAINT_UNIQUE ERROR
-                if e.orig.sqlite_errorcode == 2067:
-                    return OperationStatus(
-                        status="error", message="Курс с таким названием уже создан"
-                    )
-
             return OperationStatus(
                 status="error", message=f"Ошибка при создании курса: {e}"
             )
 
+        if course is None:
+            return OperationStatus(
+                status="error", message="Курс с таким названием уже создан"
+            )
+
+        self.name_ids.update({course.name: course.id})
+
+        return course
+
+    async def get_or_create(self, name: str) -> Course:
+        async def operation(db):
+            courses, _ = await get_or_create_by_name(db, Course, [name])
+
+            return courses[name]
+
+        course = await self._execute_write(operation)
+        self.name_ids.update({course.name: course.id})
+
+        return course
+
+    async def upsert_many(self, names: Iterable[str]) -> Dict[str, int]:
+        # name -> id для всех имен: недостающие создаются в той же транзакции
+        async def operation(db):
+            courses, _ = await get_or_create_by_name(db, Course, names)
+
+            return {name: course.id for name, course in courses.items()}
+
+        name_ids = await self._execute_write(operation)
+        self.name_ids.update(name_ids)
+
+        return name_ids
+
     async def get_course(
         self, course_id: Optional[int] = None, course_name: Optional[str] = None
     ) -> Optional[Course]:
@@ -51,26 +89,44 @@ class CourseService(MainService):
             return course.scalars().one_or_none()
 
     async def delete_course(self, course_id: int) -> OperationStatus:
-        session = self._get_async_session()
-
-        async with session() as db:
+        async def operation(db):
             result = await db.execute(delete(Course).where(Course.id == course_id))
 
-            await db.commit()
+            # Студенты удаляются каскадно: пересчитываем статистику оценок
+            if result.rowcount:
+                await rebuild_grade_statistics(db)
 
-            if result.rowcount > 0:
-                print(f"success: Course {course_id=} deleted successfully")
-                return OperationStatus(
-                    status="success", message="Course deleted successfully"
-                )
-            else:
-                print(f"error: Course {course_id=} not found")
-                return OperationStatus(status="error", message="Course not found")
+            return result.rowcount
 
-    async def update_course(self, course_id: int, **kwargs) -> OperationStatus:
-        session = self._get_async_session()
+        if await self._execute_write(operation) > 0:
+            analytics_service.invalidate()
+            self.name_ids.invalidate()
+            print(f"success: Course {course_id=} deleted successfully")
+            return OperationStatus(
+                status="success", message="Course deleted successfully"
+            )
+        else:
+            print(f"error: Course {course_id=} not found")
+            return OperationStatus(status="error", message="Course not found")
+
+    async def delete_courses(
+        self, course_ids: List[int], job: Optional[Job] = None
+    ) -> BulkDeleteResult:
+        result = await self._delete_many(
+            Course,
+            course_ids,
+            job=job,
+            on_finished=rebuild_grade_statistics,
+        )
+
+        if result.deleted_ids:
+            analytics_service.invalidate()
+            self.name_ids.invalidate()
+
+        return result
 
-        async with session() as db:
+    async def update_course(self, course_id: int, **kwargs) -> OperationStatus:
+        async def operation(db):
             course = await db.execute(select(Course).where(Course.id == course_id))
 
             course = course.scalars().one_or_none()
@@ -82,19 +138,49 @@ class CourseService(MainService):
                 if value:
                     setattr(course, key, value)
 
-            await db.commit()
+            await db.flush()
 
             return OperationStatus(
-                status="success", message="Course updated successfully"
+                status="success",
+                message="Course updated successfully",
+                entity=course,
             )
 
-    async def get_unique_courses(self):
+        try:
+            result = await self._execute_write(operation)
+        except StaleDataError:
+            return OperationStatus(status="conflict", message=UPDATE_CONFLICT_MESSAGE)
+
+        if result.status == "success":
+            # Старое название больше не должно находиться
+            self.name_ids.invalidate()
+
+        return result
+
+    async def get_unique_courses(
+        self,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+    ):
+        session = self._get_async_session()
+        query = self._paginate_query(select(Course), Course, limit, after_id)
+
+        if name_prefix:
+            query = query.where(self._name_prefix_filter(Course.name, name_prefix))
+
+        async with session() as db:
+            courses = await db.execute(query)
+
+            return self._page(courses.scalars().all(), limit)
+
+    async def _load_name_ids(self) -> Dict[str, int]:
         session = self._get_async_session()
 
         async with session() as db:
-            courses = await db.execute(select(Course))
+            rows = await db.execute(select(Course.name, Course.id))
 
-            return courses.scalars().all()
+            return dict(rows.all())
 
 
 course_service = CourseService()
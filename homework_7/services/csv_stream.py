@@ -0,0 +1,47 @@
+import codecs
+import csv
+from typing import AsyncIterable, AsyncIterator, List, Optional
+
+CSV_REQUIRED_COLUMNS = ("Фамилия", "Имя", "Факультет", "Курс", "Оценка")
+MAX_LINE_LENGTH = 64 * 1024
+
+
+async def iter_csv_rows(chunks: AsyncIterable[bytes]) -> AsyncIterator[dict]:
+    # Разбираем поток по мере поступления: в памяти хранится только
+    # недочитанный хвост последней строки
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    header: Optional[List[str]] = None
+    tail = ""
+
+    async for chunk in chunks:
+        lines = (tail + decoder.decode(chunk)).split("\n")
+        tail = lines.pop()
+
+        if len(tail) > MAX_LINE_LENGTH:
+            raise ValueError(f"Строка csv файла длиннее {MAX_LINE_LENGTH} символов")
+
+        for values in csv.reader(line.rstrip("\r") for line in lines):
+            if header is None:
+                header = _validate_header(values)
+            elif values:
+                yield dict(zip(header, values))
+
+    tail += decoder.decode(b"", final=True)
+
+    for values in csv.reader([tail.rstrip("\r")] if tail else []):
+        if header is None:
+            header = _validate_header(values)
+        elif values:
+            yield dict(zip(header, values))
+
+    if header is None:
+        raise ValueError("Пустой csv файл")
+
+
+def _validate_header(values: List[str]) -> List[str]:
+    missing = [column for column in CSV_REQUIRED_COLUMNS if column not in values]
+
+    if missing:
+        raise ValueError(f"В csv файле отсутствуют колонки: {', '.join(missing)}")
+
+    return values
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+NameIdsLoader = Callable[[], Awaitable[Dict[str, int]]]
+
+
+class DimensionCache:
+    # name -> id небольшого справочника (факультеты, курсы) в памяти процесса.
+    # Загружается целиком при первом обращении и после invalidate/ttl: изменения
+    # в этом процессе сбрасывают его сразу, в других - не позже чем через ttl
+    def __init__(self, loader: NameIdsLoader, ttl: float):
+        self._loader = loader
+        self._ttl = ttl
+        self._name_ids: Optional[Dict[str, int]] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    async def get_id(self, name: str) -> Optional[int]:
+        return (await self.get_ids([name])).get(name)
+
+    async def get_ids(self, names: Iterable[str]) -> Dict[str, int]:
+        # Неизвестные имена в результат не попадают
+        name_ids = await self._get_name_ids()
+        found = {}
+
+        for name in names:
+            id = name_ids.get(name)
+
+            if id is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                found[name] = id
+
+        return found
+
+    def update(self, name_ids: Dict[str, int]) -> None:
+        # Вызывается после commit: в кеш попадают только сохраненные записи
+        if self._name_ids is not None:
+            self._name_ids.update(name_ids)
+
+    def invalidate(self) -> None:
+        self._name_ids = None
+        self._generation += 1
+
+    def as_dict(self):
+        return {
+            "size": None if self._name_ids is None else len(self._name_ids),
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+        }
+
+    async def _get_name_ids(self) -> Dict[str, int]:
+        name_ids = self._name_ids
+
+        if name_ids is not None and self._expires_at > time.monotonic():
+            return name_ids
+
+        async with self._get_lock():
+            if self._name_ids is not None and self._expires_at > time.monotonic():
+                return self._name_ids
+
+            # invalidate во время загрузки не должен потеряться: такой результат
+            # отдаем вызывающему, но не сохраняем
+            generation = self._generation
+            name_ids = await self._loader()
+            self.loads += 1
+
+            if generation == self._generation:
+                self._name_ids = name_ids
+                self._expires_at = time.monotonic() + self._ttl
+
+            return name_ids
+
+    def _get_lock(self) -> asyncio.Lock:
+        # Lock привязан к циклу событий, в котором используется
+        loop = asyncio.get_running_loop()
+
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+
+        return self._lock
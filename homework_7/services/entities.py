@@ -1,10 +1,263 @@
-from dataclasses import dataclass
+import math
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+JOB_ERROR_SAMPLE_SIZE = 10
 
 
 @dataclass
 class OperationStatus:
     status: str
     message: str
+    # Обновленная запись для кеша, в ответ API не попадает
+    entity: Any = field(default=None, compare=False, repr=False)
 
     def as_dict(self):
         return {"status": self.status, "message": self.message}
+
+
+@dataclass(frozen=True)
+class TokenClaims:
+    login: str
+    token_type: str
+    # Время истечения токена (unix time)
+    expires_at: float
+
+
+@dataclass(frozen=True)
+class Principal:
+    # Пользователь, от имени которого выполняется запрос
+    id: int
+    login: str
+    email: str
+    last_name: str
+    first_name: str
+
+    def as_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class LoadResult:
+    rows_total: int = 0
+    rows_inserted: int = 0
+    rows_failed: int = 0
+    faculties_created: int = 0
+    courses_created: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        if not self.elapsed_seconds:
+            return 0.0
+
+        return self.rows_inserted / self.elapsed_seconds
+
+    def as_dict(self):
+        return {
+            "rows_total": self.rows_total,
+            "rows_inserted": self.rows_inserted,
+            "rows_failed": self.rows_failed,
+            "faculties_created": self.faculties_created,
+            "courses_created": self.courses_created,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str = "pending"
+    total: Optional[int] = None
+    processed: int = 0
+    failed: int = 0
+    errors: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    result: Optional[dict] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    updated_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def start(self) -> None:
+        self.status = "running"
+        self.started_at = self.updated_at = time.time()
+
+    def advance(self, processed: int = 0, failed: int = 0) -> None:
+        self.processed += processed
+        self.failed += failed
+        self.updated_at = time.time()
+
+    def add_error(self, message: str) -> None:
+        if len(self.errors) < JOB_ERROR_SAMPLE_SIZE:
+            self.errors.append(message)
+
+    def finish(self, result: Optional[dict] = None) -> None:
+        self.status = "success"
+        self.result = result
+        self.finished_at = self.updated_at = time.time()
+
+    def fail(self, message: str) -> None:
+        self.status = "error"
+        # Выборка errors может быть уже заполнена ошибками строк
+        self.error = message
+        self.add_error(message)
+        self.finished_at = self.updated_at = time.time()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        if not self.elapsed_seconds:
+            return 0.0
+
+        return (self.processed + self.failed) / self.elapsed_seconds
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        if self.is_finished:
+            return 0.0
+
+        if self.total is None or not self.rows_per_second:
+            return None
+
+        remaining = max(self.total - self.processed - self.failed, 0)
+
+        return remaining / self.rows_per_second
+
+    def as_dict(self):
+        eta_seconds = self.eta_seconds
+
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rows_per_second": round(self.rows_per_second, 1),
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "eta_seconds": None if eta_seconds is None else round(eta_seconds, 1),
+            "seconds_since_update": (
+                None
+                if self.updated_at is None
+                else round(time.time() - self.updated_at, 1)
+            ),
+            "errors": self.errors,
+            "error": self.error,
+            "result": self.result,
+        }
+
+
+@dataclass
+class BulkDeleteResult:
+    deleted_ids: List[int] = field(default_factory=list)
+    missing_ids: List[int] = field(default_factory=list)
+
+    def as_dict(self):
+        return {
+            "deleted": len(self.deleted_ids),
+            "missing": len(self.missing_ids),
+            "deleted_ids": self.deleted_ids,
+            "missing_ids": self.missing_ids,
+        }
+
+
+@dataclass
+class BulkCreateResult:
+    # Индекс элемента во входном списке -> id созданной записи или ошибка
+    created_ids: Dict[int, int] = field(default_factory=dict)
+    errors: Dict[int, str] = field(default_factory=dict)
+
+    def as_dict(self):
+        items = [
+            {"index": index, "status": "success", "id": id}
+            for index, id in self.created_ids.items()
+        ]
+        items.extend(
+            {"index": index, "status": "error", "message": message}
+            for index, message in self.errors.items()
+        )
+
+        return {
+            "created": len(self.created_ids),
+            "failed": len(self.errors),
+            "items": sorted(items, key=lambda item: item["index"]),
+        }
+
+
+@dataclass
+class GradeStatistics:
+    scope: str
+    entity_id: int
+    # оценка -> количество студентов
+    histogram: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def count(self) -> int:
+        return sum(self.histogram.values())
+
+    @property
+    def total(self) -> int:
+        return sum(grade * count for grade, count in self.histogram.items())
+
+    @property
+    def total_squares(self) -> int:
+        return sum(grade * grade * count for grade, count in self.histogram.items())
+
+    @property
+    def min_grade(self) -> Optional[int]:
+        return min(self.histogram, default=None)
+
+    @property
+    def max_grade(self) -> Optional[int]:
+        return max(self.histogram, default=None)
+
+    @property
+    def average(self) -> Optional[float]:
+        if not self.count:
+            return None
+
+        return self.total / self.count
+
+    @property
+    def stddev(self) -> Optional[float]:
+        if not self.count:
+            return None
+
+        variance = self.total_squares / self.count - self.average**2
+
+        return math.sqrt(max(variance, 0.0))
+
+    def count_below(self, max_grade: int) -> int:
+        return sum(
+            count for grade, count in self.histogram.items() if grade < max_grade
+        )
+
+    def as_dict(self):
+        return {
+            "scope": self.scope,
+            "entity_id": self.entity_id,
+            "count": self.count,
+            "total": self.total,
+            "total_squares": self.total_squares,
+            "min_grade": self.min_grade,
+            "max_grade": self.max_grade,
+            "average": self.average,
+            "stddev": self.stddev,
+            "histogram": {
+                str(grade): count for grade, count in sorted(self.histogram.items())
+            },
+        }
@@ -0,0 +1,40 @@
+import csv
+import io
+import json
+from typing import AsyncIterable, AsyncIterator, Sequence
+
+EXPORT_COLUMNS = ("id", "last_name", "first_name", "grade", "faculty", "course")
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+async def iter_ndjson(partitions: AsyncIterable[Sequence]) -> AsyncIterator[str]:
+    async for rows in partitions:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+
+async def iter_csv(partitions: AsyncIterable[Sequence]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+
+    async for rows in partitions:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+EXPORT_FORMATTERS = {
+    "ndjson": iter_ndjson,
+    "csv": iter_csv,
+}
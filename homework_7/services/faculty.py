@@ -1,40 +1,76 @@
-from typing import Optional
+from typing import Dict, Iterable, List, Optional
 
 from sqlalchemy import delete, select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 
+from homework_7 import settings
 from homework_7.db.models.models import Faculty
-from homework_7.services.entities import OperationStatus
-from homework_7.services.main_service import MainService
+from homework_7.db.upsert import dialect_insert, get_or_create_by_name
+from homework_7.services.analytics import analytics_service
+from homework_7.services.dimension_cache import DimensionCache
+from homework_7.services.entities import BulkDeleteResult, Job, OperationStatus
+from homework_7.services.grade_statistics import rebuild_grade_statistics
+from homework_7.services.main_service import UPDATE_CONFLICT_MESSAGE, MainService
 
 
 class FacultyService(MainService):
+    def __init__(self, db_url: str = settings.DB_URL):
+        super().__init__(db_url)
+        # Общий для загрузки csv и API справочник name -> id
+        self.name_ids = DimensionCache(
+            self._load_name_ids, ttl=settings.DIMENSION_CACHE_TTL
+        )
+
     async def create_faculty(self, name):
-        session = self._get_async_session()
+        async def operation(db):
+            query = (
+                dialect_insert(db, Faculty)
+                .values(name=name)
+                .on_conflict_do_nothing(index_elements=["name"])
+                .returning(Faculty)
+            )
 
-        faculty = Faculty(name=name)
+            return (await db.scalars(query)).one_or_none()
 
         try:
-            async with session() as db:
-                db.add(faculty)
-                await db.commit()
-
-            return faculty
+            faculty = await self._execute_write(operation)
         except Exception as e:
-            await db.rollback()
-
-            if isinstance(e, IntegrityError):
-                # SQLITE_CONSTRAINT_UNIQUE ERROR
-                if e.orig.sqlite_errorcode == 2067:
-                    return OperationStatus(
-                        status="error",
-                        message="Факультет с таким названием уже создан",
-                    )
-
             return OperationStatus(
                 status="error", message=f"Ошибка при создании факультета: {e}"
             )
 
+        if faculty is None:
+            return OperationStatus(
+                status="error", message="Факультет с таким названием уже создан"
+            )
+
+        self.name_ids.update({faculty.name: faculty.id})
+
+        return faculty
+
+    async def get_or_create(self, name: str) -> Faculty:
+        async def operation(db):
+            faculties, _ = await get_or_create_by_name(db, Faculty, [name])
+
+            return faculties[name]
+
+        faculty = await self._execute_write(operation)
+        self.name_ids.update({faculty.name: faculty.id})
+
+        return faculty
+
+    async def upsert_many(self, names: Iterable[str]) -> Dict[str, int]:
+        # name -> id для всех имен: недостающие создаются в той же транзакции
+        async def operation(db):
+            faculties, _ = await get_or_create_by_name(db, Faculty, names)
+
+            return {name: faculty.id for name, faculty in faculties.items()}
+
+        name_ids = await self._execute_write(operation)
+        self.name_ids.update(name_ids)
+
+        return name_ids
+
     async def get_faculty(
         self, faculty_id: Optional[int] = None, faculty_name: Optional[str] = None
     ) -> Optional[Faculty]:
@@ -55,26 +91,44 @@ class FacultyService(MainService):
             return faculty.scalars().one_or_none()
 
     async def delete_faculty(self, faculty_id: int) -> OperationStatus:
-        session = self._get_async_session()
-
-        async with session() as db:
+        async def operation(db):
             result = await db.execute(delete(Faculty).where(Faculty.id == faculty_id))
 
-            await db.commit()
+            # Студенты удаляются каскадно: пересчитываем статистику оценок
+            if result.rowcount:
+                await rebuild_grade_statistics(db)
 
-            if result.rowcount > 0:
-                print(f"success: Faculty {faculty_id=} deleted successfully")
-                return OperationStatus(
-                    status="success", message="Faculty deleted successfully"
-                )
-            else:
-                print(f"error: Faculty {faculty_id=} not found")
-                return OperationStatus(status="error", message="Faculty not found")
+            return result.rowcount
 
-    async def update_faculty(self, faculty_id: int, **kwargs) -> OperationStatus:
-        session = self._get_async_session()
+        if await self._execute_write(operation) > 0:
+            analytics_service.invalidate()
+            self.name_ids.invalidate()
+            print(f"success: Faculty {faculty_id=} deleted successfully")
+            return OperationStatus(
+                status="success", message="Faculty deleted successfully"
+            )
+        else:
+            print(f"error: Faculty {faculty_id=} not found")
+            return OperationStatus(status="error", message="Faculty not found")
+
+    async def delete_faculties(
+        self, faculty_ids: List[int], job: Optional[Job] = None
+    ) -> BulkDeleteResult:
+        result = await self._delete_many(
+            Faculty,
+            faculty_ids,
+            job=job,
+            on_finished=rebuild_grade_statistics,
+        )
+
+        if result.deleted_ids:
+            analytics_service.invalidate()
+            self.name_ids.invalidate()
+
+        return result
 
-        async with session() as db:
+    async def update_faculty(self, faculty_id: int, **kwargs) -> OperationStatus:
+        async def operation(db):
             faculty = await db.execute(select(Faculty).where(Faculty.id == faculty_id))
 
             faculty = faculty.scalars().one_or_none()
@@ -86,19 +140,49 @@ class FacultyService(MainService):
                 if value:
                     setattr(faculty, key, value)
 
-            await db.commit()
+            await db.flush()
 
             return OperationStatus(
-                status="success", message="Faculty updated successfully"
+                status="success",
+                message="Faculty updated successfully",
+                entity=faculty,
             )
 
-    async def get_unique_faculties(self):
+        try:
+            result = await self._execute_write(operation)
+        except StaleDataError:
+            return OperationStatus(status="conflict", message=UPDATE_CONFLICT_MESSAGE)
+
+        if result.status == "success":
+            # Старое название больше не должно находиться
+            self.name_ids.invalidate()
+
+        return result
+
+    async def get_unique_faculties(
+        self,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+    ):
+        session = self._get_async_session()
+        query = self._paginate_query(select(Faculty), Faculty, limit, after_id)
+
+        if name_prefix:
+            query = query.where(self._name_prefix_filter(Faculty.name, name_prefix))
+
+        async with session() as db:
+            faculties = await db.execute(query)
+
+            return self._page(faculties.scalars().all(), limit)
+
+    async def _load_name_ids(self) -> Dict[str, int]:
         session = self._get_async_session()
 
         async with session() as db:
-            faculty = await db.execute(select(Faculty))
+            rows = await db.execute(select(Faculty.name, Faculty.id))
 
-            return faculty.scalars().all()
+            return dict(rows.all())
 
 
 faculty_service = FacultyService()
@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, literal, select
+
+from homework_7.db.models.models import GradeStatistic, Student
+from homework_7.db.upsert import dialect_insert
+from homework_7.services.entities import GradeStatistics
+from homework_7.services.main_service import MainService
+
+GRADE_STATISTIC_SCOPES = {"faculty": Student.faculty, "course": Student.course}
+UPSERT_CHUNK_SIZE = 500
+VERIFY_SAMPLE_SIZE = 10
+
+# (scope, entity_id, grade) -> изменение количества студентов
+GradeDeltas = Counter
+
+
+def student_grade_deltas(
+    rows: Iterable[Sequence], sign: int = 1, deltas: Optional[GradeDeltas] = None
+) -> GradeDeltas:
+    # rows: (grade, faculty, course) добавленных (sign=1) или удаленных (-1) студентов
+    deltas = GradeDeltas() if deltas is None else deltas
+
+    for grade, faculty_id, course_id in rows:
+        if grade is None:
+            continue
+
+        if faculty_id is not None:
+            deltas[("faculty", faculty_id, grade)] += sign
+
+        if course_id is not None:
+            deltas[("course", course_id, grade)] += sign
+
+    return deltas
+
+
+async def apply_grade_deltas(db, deltas: GradeDeltas) -> None:
+    # Вызывается в транзакции записи студентов. Атомарное count = count + delta
+    # не теряет обновления при конкурентных записях
+    rows = [
+        {"scope": scope, "entity_id": entity_id, "grade": grade, "students_count": n}
+        for (scope, entity_id, grade), n in deltas.items()
+        if n
+    ]
+
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        end = start + UPSERT_CHUNK_SIZE
+        query = dialect_insert(db, GradeStatistic).values(rows[start:end])
+        query = query.on_conflict_do_update(
+            index_elements=["scope", "entity_id", "grade"],
+            set_={
+                "students_count": GradeStatistic.students_count
+                + query.excluded.students_count
+            },
+        )
+
+        await db.execute(query)
+
+
+async def rebuild_grade_statistics(db) -> None:
+    await db.execute(delete(GradeStatistic))
+
+    for scope, column in GRADE_STATISTIC_SCOPES.items():
+        await db.execute(
+            insert(GradeStatistic).from_select(
+                ["scope", "entity_id", "grade", "students_count"],
+                _scan_query(scope, column),
+            )
+        )
+
+
+def _scan_query(scope: str, column):
+    return (
+        select(literal(scope), column, Student.grade, func.count())
+        .where(column.is_not(None), Student.grade.is_not(None))
+        .group_by(column, Student.grade)
+    )
+
+
+class GradeStatisticsService(MainService):
+    async def get_statistics(self, scope: str, entity_id: int) -> GradeStatistics:
+        session = self._get_async_session()
+
+        async with session() as db:
+            rows = await db.execute(
+                select(GradeStatistic.grade, GradeStatistic.students_count).where(
+                    GradeStatistic.scope == scope,
+                    GradeStatistic.entity_id == entity_id,
+                    GradeStatistic.students_count > 0,
+                )
+            )
+
+            return GradeStatistics(
+                scope=scope, entity_id=entity_id, histogram=dict(rows.all())
+            )
+
+    async def verify(self) -> List[str]:
+        session = self._get_async_session()
+
+        async with session() as db:
+            stored = await db.execute(
+                select(
+                    GradeStatistic.scope,
+                    GradeStatistic.entity_id,
+                    GradeStatistic.grade,
+                    GradeStatistic.students_count,
+                ).where(GradeStatistic.students_count != 0)
+            )
+            expected: Dict[Tuple, int] = {}
+
+            for scope, column in GRADE_STATISTIC_SCOPES.items():
+                scanned = await db.execute(_scan_query(scope, column))
+                expected.update(
+                    ((scope, entity_id, grade), count)
+                    for scope, entity_id, grade, count in scanned.all()
+                )
+
+        actual = {tuple(row[:3]): row[3] for row in stored.all()}
+        mismatches = []
+
+        for key in sorted(expected.keys() | actual.keys()):
+            if actual.get(key, 0) != expected.get(key, 0):
+                scope, entity_id, grade = key
+                mismatches.append(
+                    f"{scope}={entity_id}, оценка {grade}: в статистике "
+                    f"{actual.get(key, 0)}, в students {expected.get(key, 0)}"
+                )
+
+        return mismatches
+
+    async def rebuild(self, verify_only: bool = False) -> dict:
+        mismatches = await self.verify()
+
+        if mismatches and not verify_only:
+            session = self._get_write_session()
+
+            async with session() as db:
+                await rebuild_grade_statistics(db)
+                await db.commit()
+
+        return {
+            "mismatches": len(mismatches),
+            "sample": mismatches[:VERIFY_SAMPLE_SIZE],
+            "rebuilt": bool(mismatches) and not verify_only,
+        }
+
+
+grade_statistics_service = GradeStatisticsService()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Сверка статистики оценок с полным обходом students и ее пересчет"
+    )
+    parser.add_argument("--verify-only", action="store_true")
+    args = parser.parse_args()
+
+    print(asyncio.run(grade_statistics_service.rebuild(verify_only=args.verify_only)))
@@ -0,0 +1,52 @@
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from homework_7.services.entities import Job
+
+MAX_JOBS = 1000
+
+
+class JobService:
+    def __init__(self, max_jobs: int = MAX_JOBS):
+        self._max_jobs = max_jobs
+        self._jobs: Dict[str, Job] = OrderedDict()
+
+    def create_job(self, kind: str, total: Optional[int] = None) -> Job:
+        job = Job(id=str(uuid.uuid4()), kind=kind, total=total)
+
+        self._jobs[job.id] = job
+        self._evict_finished_jobs()
+
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def get_jobs(self) -> List[Job]:
+        return list(self._jobs.values())
+
+    async def run_job(self, job: Job, func, *args, **kwargs) -> Job:
+        job.start()
+
+        try:
+            result = await func(*args, job=job, **kwargs)
+        except Exception as e:
+            print(f"error: Задача {job.kind} {job.id} завершилась с ошибкой: {e}")
+            job.fail(str(e))
+        else:
+            job.finish(result.as_dict() if hasattr(result, "as_dict") else result)
+
+        return job
+
+    def _evict_finished_jobs(self) -> None:
+        # Удаляем самые старые завершенные задачи, выполняющиеся не трогаем
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self._max_jobs:
+                break
+
+            if self._jobs[job_id].is_finished:
+                del self._jobs[job_id]
+
+
+job_service = JobService()
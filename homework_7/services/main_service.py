@@ -1,13 +1,31 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
 
+from sqlalchemy import Row, and_, delete, select
+
+from homework_7 import settings
+from homework_7.db.engine import (
+    get_engine,
+    get_pool_status,
+    get_session_factory,
+    get_write_queue,
+    get_write_session_factory,
+)
 from homework_7.db.models.models import Base
+from homework_7.db.writer import WriteOperation
+from homework_7.services.entities import BulkDeleteResult, Job
+
+DELETE_CHUNK_SIZE = 1000
+SELECT_CHUNK_SIZE = 1000
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+UPDATE_CONFLICT_MESSAGE = "Запись была изменена другим запросом, повторите обновление"
+DATABASE_BUSY_MESSAGE = "База данных занята другой записью, повторите обновление"
 
 
 class MainService:
-    def __init__(self, db_url: str = "sqlite+aiosqlite:///./student.db"):
+    def __init__(self, db_url: str = settings.DB_URL):
         self._db_url = db_url
-        self._engine = create_async_engine(self._db_url)
+        self._engine = get_engine(self._db_url)
 
     async def init_db(self):
         async with self._engine.begin() as conn:
@@ -17,12 +35,125 @@ class MainService:
         async with self._engine.begin() as conn:
             await conn.run_sync(Base.metadata.drop_all)
 
+    def get_pool_status(self) -> dict:
+        status = get_pool_status(self._db_url)
+
+        if settings.DB_WRITE_QUEUE:
+            status["write_queue"] = get_write_queue(self._db_url).as_dict()
+
+        return status
+
     def _get_async_session(self):
-        return sessionmaker(
-            self._engine,
-            class_=AsyncSession,
-            expire_on_commit=False,
-        )
+        return get_session_factory(self._db_url)
+
+    def _get_write_session(self):
+        return get_write_session_factory(self._db_url)
+
+    def _name_prefix_filter(self, column, prefix: str):
+        if self._engine.dialect.name == "sqlite":
+            # В SQLite LIKE регистронезависим и не использует индекс,
+            # а сравнение диапазона по BINARY-сортировке использует
+            return and_(column >= prefix, column < prefix + "\U0010ffff")
+
+        return column.startswith(prefix, autoescape=True)
+
+    @staticmethod
+    def _paginate_query(query, model, limit: Optional[int], after_id: Optional[int]):
+        query = query.order_by(model.id)
+
+        if after_id is not None:
+            query = query.where(model.id > after_id)
+
+        if limit is not None:
+            # Лишняя запись показывает, есть ли следующая страница
+            query = query.limit(limit + 1)
+
+        return query
+
+    @staticmethod
+    def _page(items: list, limit: Optional[int]) -> dict:
+        if limit is None or len(items) <= limit:
+            return {"items": items, "next_cursor": None}
+
+        items = items[:limit]
+
+        return {"items": items, "next_cursor": items[-1].id}
+
+    async def _execute_write(self, operation: WriteOperation) -> Any:
+        if settings.DB_WRITE_QUEUE:
+            return await get_write_queue(self._db_url).submit(operation)
+
+        session = self._get_write_session()
+
+        async with session() as db:
+            result = await operation(db)
+            await db.commit()
+
+        return result
+
+    async def _delete_many(
+        self,
+        model,
+        ids: Iterable[int],
+        job: Optional[Job] = None,
+        chunk_size: int = DELETE_CHUNK_SIZE,
+        returning: Sequence = (),
+        on_deleted: Optional[Callable[[Any, List[Row]], Awaitable[None]]] = None,
+        on_finished: Optional[Callable[[Any], Awaitable[None]]] = None,
+    ) -> BulkDeleteResult:
+        ids = list(dict.fromkeys(ids))
+        result = BulkDeleteResult()
+        session = self._get_write_session()
+
+        async with session() as db:
+            for start in range(0, len(ids), chunk_size):
+                end = start + chunk_size
+                chunk = ids[start:end]
+                deleted = await db.execute(
+                    delete(model)
+                    .where(model.id.in_(chunk))
+                    .returning(model.id, *returning)
+                )
+                rows = deleted.all()
+                deleted_ids = {row[0] for row in rows}
+
+                # Хук для изменений в той же транзакции, что и удаление
+                if on_deleted is not None:
+                    await on_deleted(db, rows)
+
+                result.deleted_ids.extend(id for id in chunk if id in deleted_ids)
+                result.missing_ids.extend(id for id in chunk if id not in deleted_ids)
+
+                if job is not None:
+                    job.advance(
+                        processed=len(deleted_ids),
+                        failed=len(chunk) - len(deleted_ids),
+                    )
+
+            # Хук для пересчетов, которые не нужно повторять на каждую пачку
+            if on_finished is not None and result.deleted_ids:
+                await on_finished(db)
+
+            await db.commit()
+
+        return result
+
+    async def _get_many(
+        self, model, ids: Iterable[int], chunk_size: int = SELECT_CHUNK_SIZE
+    ) -> Dict[int, Any]:
+        ids = list(dict.fromkeys(ids))
+        items = {}
+        session = self._get_async_session()
+
+        async with session() as db:
+            for start in range(0, len(ids), chunk_size):
+                end = start + chunk_size
+                found = await db.execute(
+                    select(model).where(model.id.in_(ids[start:end]))
+                )
+                items.update((item.id, item) for item in found.scalars())
+
+        return items
 
 
 main_service = MainService()
@@ -1,14 +1,125 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
 from passlib.hash import pbkdf2_sha256
 
+from homework_7 import settings
+
+PASSWORD_HASH_EXECUTORS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+
+
+def _hash_password(password: str) -> str:
+    return pbkdf2_sha256.hash(password)
+
+
+def _verify_password(password: str, hash: str) -> bool:
+    return pbkdf2_sha256.verify(password, hash)
+
 
 class PasswordService:
     _salt = "my_salt"  # В реальном приложении должен быть в переменных окружения
 
+    def __init__(
+        self,
+        executor: str = settings.PASSWORD_HASH_EXECUTOR,
+        workers: int = settings.PASSWORD_HASH_WORKERS,
+    ):
+        if executor not in PASSWORD_HASH_EXECUTORS:
+            raise ValueError(f"Неизвестный пул для хеширования паролей: {executor}")
+
+        self._executor_type = executor
+        self._workers = workers
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+        # Ожидающие свободного воркера и выполняемые сейчас вызовы
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.wait_seconds = 0.0
+
     def create_hashed_password(self, password: str) -> str:
-        return pbkdf2_sha256.hash(password + self._salt)
+        return _hash_password(password + self._salt)
 
     def verify_password(self, password: str, hash: str) -> bool:
-        return pbkdf2_sha256.verify(password + self._salt, hash)
+        return _verify_password(password + self._salt, hash)
+
+    async def create_hashed_password_async(self, password: str) -> str:
+        return await self._run(_hash_password, password + self._salt)
+
+    async def verify_password_async(self, password: str, hash: str) -> bool:
+        return await self._run(_verify_password, password + self._salt, hash)
+
+    def as_dict(self):
+        return {
+            "executor": self._executor_type if self._workers > 0 else "inline",
+            "workers": self._workers,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "avg_wait_ms": (
+                round(self.wait_seconds / self.completed * 1000, 2)
+                if self.completed
+                else 0.0
+            ),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, func: Callable, *args):
+        if self._workers <= 0:
+            # pbkdf2 блокирует цикл событий на время вычисления
+            self.completed += 1
+            return func(*args)
+
+        # Не больше workers вызовов в пуле: остальные ждут здесь, и глубину
+        # очереди видно в метриках
+        semaphore = self._get_semaphore()
+        started_at = time.perf_counter()
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+        try:
+            await semaphore.acquire()
+        finally:
+            self.queue_depth -= 1
+
+        self.wait_seconds += time.perf_counter() - started_at
+        self.in_flight += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            semaphore.release()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = PASSWORD_HASH_EXECUTORS[self._executor_type](
+                max_workers=self._workers
+            )
+
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphore привязан к циклу событий, в котором используется
+        loop = asyncio.get_running_loop()
+
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self._workers)
+            self._semaphore_loop = loop
+
+        return self._semaphore
 
 
 password_service = PasswordService()
@@ -0,0 +1,51 @@
+from typing import Optional
+
+from homework_7 import settings
+from homework_7.services.cache import CacheService, cache_service
+from homework_7.services.cache_keys import PRINCIPAL_CACHE
+from homework_7.services.entities import Principal
+from homework_7.services.user import UserService, user_service
+
+
+class PrincipalService:
+    # Пользователь по логину из токена: запросы с авторизацией читают его
+    # из кеша, а не из БД
+    def __init__(self, users: UserService, cache: CacheService, ttl: int):
+        self._users = users
+        self._cache = cache
+        self._ttl = ttl
+
+    async def get_principal(self, login: str) -> Optional[Principal]:
+        value = await self._cache.get_or_load(
+            PRINCIPAL_CACHE, login, lambda: self._load(login), ttl=self._ttl
+        )
+
+        return None if value is None else Principal(**value)
+
+    async def invalidate(self, login: str) -> None:
+        # Новый пользователь мог попасть в кеш как отсутствующий
+        await self._cache.invalidate(PRINCIPAL_CACHE, login)
+
+    async def invalidate_all(self) -> None:
+        # Изменение или удаление пользователя может сменить логин, а старый
+        # логин в маршрутах неизвестен: сбрасываем namespace целиком
+        await self._cache.invalidate_namespace(PRINCIPAL_CACHE)
+
+    async def _load(self, login: str) -> Optional[Principal]:
+        user = await self._users.get_user(user_login=login)
+
+        if user is None:
+            return None
+
+        return Principal(
+            id=user.id,
+            login=user.login,
+            email=user.email,
+            last_name=user.last_name,
+            first_name=user.first_name,
+        )
+
+
+principal_service = PrincipalService(
+    user_service, cache_service, ttl=settings.AUTH_PRINCIPAL_CACHE_TTL
+)
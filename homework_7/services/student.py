@@ -1,16 +1,55 @@
 import csv
+import time
+from itertools import islice
 from pathlib import Path
-from typing import Optional, Union
-
-from sqlalchemy import delete, func, select
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Union,
+)
+
+from sqlalchemy import Row, delete, func, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
 
 from homework_7.db.models.models import Course, Faculty, Student
+from homework_7.db.upsert import get_or_create_by_name
+from homework_7.services.analytics import analytics_service
+from homework_7.services.cache import cache_service
+from homework_7.services.cache_keys import course_tag, faculty_tag
 from homework_7.services.course import course_service
-from homework_7.services.entities import OperationStatus
+from homework_7.services.entities import (
+    BulkCreateResult,
+    BulkDeleteResult,
+    Job,
+    LoadResult,
+    OperationStatus,
+)
+from homework_7.services.export import EXPORT_COLUMNS
 from homework_7.services.faculty import faculty_service
-from homework_7.services.main_service import MainService
+from homework_7.services.grade_statistics import (
+    apply_grade_deltas,
+    grade_statistics_service,
+    student_grade_deltas,
+)
+from homework_7.services.main_service import (
+    DATABASE_BUSY_MESSAGE,
+    SELECT_CHUNK_SIZE,
+    UPDATE_CONFLICT_MESSAGE,
+    MainService,
+)
 
 DEFAULT_CSV_FILE_PATH = Path(__file__).parent.parent / "db/init_data/students.csv"
+DEFAULT_CHUNK_SIZE = 5000
+EXPORT_BATCH_SIZE = 1000
+STUDENT_COPY_COLUMNS = ["last_name", "first_name", "grade", "faculty", "course"]
 
 
 class StudentService(MainService):
@@ -20,20 +59,115 @@ class StudentService(MainService):
 
             for row in reader:
                 try:
-                    grade = int(row["Оценка"])
-                except ValueError:
-                    grade = 0
-
-                await self._create_student_from_csv(
-                    last_name=row["Фамилия"],
-                    first_name=row["Имя"],
-                    faculty_name=row["Факультет"],
-                    course_name=row["Курс"],
-                    grade=grade,
-                )
+                    student = _parse_csv_row(row)
+                except (KeyError, TypeError):
+                    print(f"Некорректная строка csv файла: {row}")
+                    continue
+
+                await self._create_student_from_csv(**student)
 
         print(f"Данные успешно загружены из csv файла {csv_file_path}")
 
+    async def bulk_load_from_csv(
+        self,
+        csv_file_path: str = DEFAULT_CSV_FILE_PATH,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        job: Optional[Job] = None,
+    ) -> LoadResult:
+        started_at = time.perf_counter()
+        result = LoadResult()
+        faculty_ids: Dict[str, int] = {}
+        course_ids: Dict[str, int] = {}
+
+        # Первый проход: собираем все уникальные факультеты и курсы
+        with open(csv_file_path, "r", encoding="utf-8") as csvfile:
+            faculty_names = set()
+            course_names = set()
+            rows_count = 0
+
+            for row in csv.DictReader(csvfile):
+                rows_count += 1
+
+                try:
+                    student = _parse_csv_row(row)
+                except (KeyError, TypeError):
+                    continue
+
+                faculty_names.add(student["faculty_name"])
+                course_names.add(student["course_name"])
+
+        if job is not None:
+            job.total = rows_count
+
+        session = self._get_write_session()
+
+        async with session() as db:
+            await self._upsert_dimensions(
+                db, faculty_names, course_names, faculty_ids, course_ids, result
+            )
+            await db.commit()
+
+        _remember_dimensions(faculty_ids, course_ids)
+
+        # Второй проход: вставляем студентов пачками
+        with open(csv_file_path, "r", encoding="utf-8") as csvfile:
+            rows = _parse_csv_rows(csv.DictReader(csvfile), result, job)
+
+            for chunk in _chunked(rows, chunk_size):
+                await self._insert_students_chunk(
+                    chunk, faculty_ids, course_ids, result, job
+                )
+
+        result.elapsed_seconds = time.perf_counter() - started_at
+
+        print(
+            f"Данные загружены из csv файла {csv_file_path}: "
+            f"{result.rows_inserted}/{result.rows_total} строк "
+            f"за {result.elapsed_seconds:.2f} сек."
+        )
+
+        return result
+
+    async def bulk_load_from_rows(
+        self,
+        rows: AsyncIterable[dict],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        job: Optional[Job] = None,
+    ) -> LoadResult:
+        started_at = time.perf_counter()
+        result = LoadResult()
+        faculty_ids: Dict[str, int] = {}
+        course_ids: Dict[str, int] = {}
+        chunk = []
+
+        async for row in rows:
+            try:
+                chunk.append(_parse_csv_row(row))
+            except (KeyError, TypeError):
+                _skip_csv_row(row, result, job)
+                continue
+
+            if len(chunk) >= chunk_size:
+                await self._insert_students_chunk(
+                    chunk, faculty_ids, course_ids, result, job
+                )
+                chunk = []
+
+        if chunk:
+            await self._insert_students_chunk(
+                chunk, faculty_ids, course_ids, result, job
+            )
+
+        result.elapsed_seconds = time.perf_counter() - started_at
+
+        print(
+            f"Данные загружены из потока: "
+            f"{result.rows_inserted}/{result.rows_total} строк "
+            f"за {result.elapsed_seconds:.2f} сек."
+        )
+
+        return result
+
     async def create_student(
         self,
         last_name: str,
@@ -42,39 +176,110 @@ class StudentService(MainService):
         faculty_id: int,
         course_id: int,
     ):
-        session = self._get_async_session()
-
         try:
-            async with session() as db:
-                faculty = await faculty_service.get_faculty(faculty_id=faculty_id)
+            faculty = await faculty_service.get_faculty(faculty_id=faculty_id)
 
-                if faculty is None:
-                    raise ValueError(f"Факультет с таким {faculty_id=} не найден")
+            if faculty is None:
+                raise ValueError(f"Факультет с таким {faculty_id=} не найден")
 
-                course = await course_service.get_course(course_id=course_id)
+            course = await course_service.get_course(course_id=course_id)
 
-                if course is None:
-                    raise ValueError(f"Курс с таким {course_id=} не найден")
+            if course is None:
+                raise ValueError(f"Курс с таким {course_id=} не найден")
 
-                if faculty and course:
-                    student = Student(
-                        last_name=last_name,
-                        first_name=first_name,
-                        faculty=faculty.id,
-                        course=course.id,
-                        grade=grade,
-                    )
-                    db.add(student)
-                    await db.commit()
+            student = Student(
+                last_name=last_name,
+                first_name=first_name,
+                faculty=faculty.id,
+                course=course.id,
+                grade=grade,
+            )
+
+            async def operation(db):
+                db.add(student)
+                await db.flush()
+                await apply_grade_deltas(
+                    db, student_grade_deltas([_grade_key(student)])
+                )
 
                 return student
-        except Exception as e:
-            await db.rollback()
 
+            student = await self._execute_write(operation)
+        except Exception as e:
             return OperationStatus(
                 status="error", message=f"Ошибка при создании студента: {e}"
             )
 
+        await self._invalidate_aggregates([_grade_key(student)])
+        analytics_service.record_changes([student.id])
+
+        return student
+
+    async def create_students(self, students: Sequence[dict]) -> BulkCreateResult:
+        # students: last_name, first_name, grade, faculty_id, course_id
+        async def operation(db):
+            # Проверка ссылок одним запросом на таблицу, а не два запроса на студента
+            faculty_ids = await _existing_ids(
+                db, Faculty, {student["faculty_id"] for student in students}
+            )
+            course_ids = await _existing_ids(
+                db, Course, {student["course_id"] for student in students}
+            )
+            errors = {}
+            indexes = []
+            rows = []
+
+            for index, student in enumerate(students):
+                faculty_id = student["faculty_id"]
+                course_id = student["course_id"]
+
+                if faculty_id not in faculty_ids:
+                    errors[index] = f"Факультет с таким {faculty_id=} не найден"
+                elif course_id not in course_ids:
+                    errors[index] = f"Курс с таким {course_id=} не найден"
+                else:
+                    indexes.append(index)
+                    rows.append(
+                        {
+                            "last_name": student["last_name"],
+                            "first_name": student["first_name"],
+                            "grade": student["grade"],
+                            "faculty": faculty_id,
+                            "course": course_id,
+                        }
+                    )
+
+            if not rows:
+                return BulkCreateResult(errors=errors), []
+
+            # INSERT ... RETURNING пачкой, id в порядке входных строк (SQLite ради
+            # порядка вставляет построчно, но в той же транзакции)
+            ids = await db.scalars(
+                insert(Student).returning(Student.id, sort_by_parameter_order=True),
+                rows,
+            )
+            ids = ids.all()
+            keys = [(row["grade"], row["faculty"], row["course"]) for row in rows]
+            await apply_grade_deltas(db, student_grade_deltas(keys))
+
+            return (
+                BulkCreateResult(created_ids=dict(zip(indexes, ids)), errors=errors),
+                keys,
+            )
+
+        try:
+            result, keys = await self._execute_write(operation)
+        except Exception as e:
+            # Пачка пишется одной транзакцией: при ошибке не создан ни один студент
+            message = f"Ошибка при создании студентов: {e}"
+
+            return BulkCreateResult(errors=dict.fromkeys(range(len(students)), message))
+
+        await self._invalidate_aggregates(keys)
+        analytics_service.record_changes(result.created_ids.values())
+
+        return result
+
     async def get_student(self, student_id: int):
         session = self._get_async_session()
 
@@ -83,109 +288,249 @@ class StudentService(MainService):
 
             return student.scalars().one_or_none()
 
-    async def get_students(self):
+    async def get_students_by_ids(self, student_ids: Iterable[int]):
+        return await self._get_many(Student, student_ids)
+
+    async def get_students(
+        self,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        faculty_id: Optional[int] = None,
+        course_id: Optional[int] = None,
+        min_grade: Optional[int] = None,
+        max_grade: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+    ):
         session = self._get_async_session()
+        query = self._paginate_query(select(Student), Student, limit, after_id)
+
+        if faculty_id is not None:
+            query = query.where(Student.faculty == faculty_id)
+
+        if course_id is not None:
+            query = query.where(Student.course == course_id)
+
+        if min_grade is not None:
+            query = query.where(Student.grade >= min_grade)
+
+        if max_grade is not None:
+            query = query.where(Student.grade <= max_grade)
+
+        if name_prefix:
+            query = query.where(
+                self._name_prefix_filter(Student.last_name, name_prefix)
+            )
 
         async with session() as db:
-            students = await db.execute(select(Student))
+            students = await db.execute(query)
 
-            return students.scalars().all()
+            return self._page(students.scalars().all(), limit)
 
-    async def delete_student(self, student_id: int) -> OperationStatus:
+    async def iter_students(
+        self, batch_size: int = EXPORT_BATCH_SIZE
+    ) -> AsyncIterator[Sequence[Row]]:
         session = self._get_async_session()
+        query = (
+            select(*(getattr(Student, column) for column in EXPORT_COLUMNS))
+            .order_by(Student.id)
+            .execution_options(yield_per=batch_size)
+        )
 
         async with session() as db:
-            result = await db.execute(delete(Student).where(Student.id == student_id))
+            students = await db.stream(query)
 
-            await db.commit()
+            async for partition in students.partitions():
+                yield partition
 
-            if result.rowcount > 0:
-                print(f"success: Student {student_id=} deleted successfully")
-                return OperationStatus(
-                    status="success", message="Student deleted successfully"
-                )
-            else:
-                print(f"error: Student {student_id=} not found")
-                return OperationStatus(status="error", message="Student not found")
+    async def delete_student(self, student_id: int) -> OperationStatus:
+        async def operation(db):
+            result = await db.execute(
+                delete(Student)
+                .where(Student.id == student_id)
+                .returning(Student.grade, Student.faculty, Student.course)
+            )
+            deleted = result.all()
+            await apply_grade_deltas(db, student_grade_deltas(deleted, sign=-1))
+
+            return deleted
+
+        deleted = await self._execute_write(operation)
+
+        if deleted:
+            await self._invalidate_aggregates(deleted)
+            analytics_service.record_changes([student_id])
+            print(f"success: Student {student_id=} deleted successfully")
+            return OperationStatus(
+                status="success", message="Student deleted successfully"
+            )
+        else:
+            print(f"error: Student {student_id=} not found")
+            return OperationStatus(status="error", message="Student not found")
+
+    async def delete_students(
+        self, student_ids: List[int], job: Optional[Job] = None
+    ) -> BulkDeleteResult:
+        deleted = []
+
+        async def on_deleted(db, rows):
+            keys = [row[1:] for row in rows]
+            await apply_grade_deltas(db, student_grade_deltas(keys, sign=-1))
+            deleted.extend(keys)
+
+        result = await self._delete_many(
+            Student,
+            student_ids,
+            job=job,
+            returning=(Student.grade, Student.faculty, Student.course),
+            on_deleted=on_deleted,
+        )
+        await self._invalidate_aggregates(deleted)
+        analytics_service.record_changes(result.deleted_ids)
+
+        return result
 
     async def update_student(self, student_id: int, **kwargs) -> OperationStatus:
-        session = self._get_async_session()
+        faculty_id = kwargs.get("faculty_id", None)
 
-        async with session() as db:
-            student = await db.execute(select(Student).where(Student.id == student_id))
+        if faculty_id:
+            faculty = await faculty_service.get_faculty(faculty_id=faculty_id)
 
-            student = student.scalars().one_or_none()
+            if faculty is None:
+                return OperationStatus(
+                    status="error",
+                    message=f"Факультет с таким {faculty_id=} не найден",
+                )
 
-            if student is None:
-                return OperationStatus(status="error", message="Student not found")
+        course_id = kwargs.get("course_id", None)
 
-            faculty_id = kwargs.get("faculty_id", None)
+        if course_id:
+            course = await course_service.get_course(course_id=course_id)
 
-            if faculty_id:
-                faculty = await faculty_service.get_faculty(faculty_id=faculty_id)
+            if course is None:
+                return OperationStatus(
+                    status="error", message=f"Курс с таким {course_id=} не найден"
+                )
 
-                if faculty is None:
-                    return OperationStatus(
-                        status="error",
-                        message=f"Факультет с таким {faculty_id=} не найден",
-                    )
+        async def operation(db):
+            student = await db.execute(select(Student).where(Student.id == student_id))
 
-            course_id = kwargs.get("course_id", None)
+            student = student.scalars().one_or_none()
 
-            if course_id:
-                course = await course_service.get_course(course_id=course_id)
+            if student is None:
+                return OperationStatus(status="error", message="Student not found")
 
-                if course is None:
-                    return OperationStatus(
-                        status="error", message=f"Курс с таким {course_id=} не найден"
-                    )
+            old_key = _grade_key(student)
 
             for key, value in kwargs.items():
                 if value:
                     setattr(student, key, value)
 
-            await db.commit()
+            await db.flush()
+            affected.extend((old_key, _grade_key(student)))
+
+            deltas = student_grade_deltas([old_key], sign=-1)
+            student_grade_deltas([_grade_key(student)], deltas=deltas)
+            await apply_grade_deltas(db, deltas)
 
             return OperationStatus(
-                status="success", message="Student updated successfully"
+                status="success",
+                message="Student updated successfully",
+                entity=student,
+            )
+
+        affected = []
+
+        try:
+            result = await self._execute_write(operation)
+        except StaleDataError:
+            return OperationStatus(status="conflict", message=UPDATE_CONFLICT_MESSAGE)
+        except OperationalError as e:
+            # SQLite: блокировку записи не дождались за busy_timeout
+            if "database is locked" not in str(e):
+                raise
+
+            return OperationStatus(status="conflict", message=DATABASE_BUSY_MESSAGE)
+
+        if result.status == "success":
+            await self._invalidate_aggregates(affected)
+            analytics_service.record_changes([student_id])
+
+        return result
+
+    async def get_average_students_grade_by_faculty(
+        self, faculty_name: Optional[str] = None, faculty_id: Optional[int] = None
+    ) -> Optional[float]:
+        if faculty_id is None and faculty_name is not None:
+            faculty_id = await faculty_service.name_ids.get_id(faculty_name)
+
+        if faculty_id is not None:
+            # O(1): по гистограмме оценок, без обхода students
+            statistics = await grade_statistics_service.get_statistics(
+                "faculty", faculty_id
             )
 
-    async def get_average_students_grade_by_faculty(self, faculty_name: str):
+            return statistics.average
+
         session = self._get_async_session()
+        query = (
+            select(func.avg(Student.grade))
+            .join(Faculty)
+            .filter(Faculty.name == faculty_name)
+        )
 
         async with session() as db:
-            avg_grade = await db.execute(
-                select(func.avg(Student.grade))
-                .join(Faculty)
-                .filter(Faculty.name == faculty_name)
-            )
+            avg_grade = (await db.execute(query)).scalars().one()
 
-            return avg_grade.scalars().one()
+            # PostgreSQL возвращает Decimal
+            return None if avg_grade is None else float(avg_grade)
 
     async def get_students_by_faculty(self, faculty_name: str):
         session = self._get_async_session()
+        faculty_id = await faculty_service.name_ids.get_id(faculty_name)
+
+        if faculty_id is not None:
+            query = select(Student).where(Student.faculty == faculty_id)
+        else:
+            # Факультет мог появиться в другом процессе: ищем по названию в БД
+            query = select(Student).join(Faculty).filter(Faculty.name == faculty_name)
 
         async with session() as db:
-            students = await db.execute(
-                select(Student).join(Faculty).filter(Faculty.name == faculty_name)
-            )
+            students = await db.execute(query)
 
             return students.scalars().all()
 
     async def get_students_below_grade_by_course(
-        self, course_name: str, max_grade: int = 30
+        self,
+        course_name: Optional[str] = None,
+        max_grade: int = 30,
+        course_id: Optional[int] = None,
     ):
         session = self._get_async_session()
+        query = select(Student).where(Student.grade < max_grade)
+
+        if course_id is None and course_name is not None:
+            course_id = await course_service.name_ids.get_id(course_name)
+
+        if course_id is not None:
+            query = query.where(Student.course == course_id).order_by(Student.id)
+        else:
+            query = query.join(Course).filter(Course.name == course_name)
 
         async with session() as db:
-            students = await db.execute(
-                select(Student)
-                .join(Course)
-                .filter(Course.name == course_name, Student.grade < max_grade)
-            )
+            students = await db.execute(query)
 
             return students.scalars().all()
 
+    @staticmethod
+    async def _invalidate_aggregates(rows: Iterable[Sequence[int]]) -> None:
+        # rows: (grade, faculty, course) затронутых студентов до и после записи
+        tags = set()
+
+        for _, faculty_id, course_id in rows:
+            tags.update((faculty_tag(faculty_id), course_tag(course_id)))
+
+        await cache_service.invalidate_tags(tags)
+
     async def _create_student_from_csv(
         self,
         last_name: str,
@@ -194,32 +539,40 @@ class StudentService(MainService):
         faculty_name: Optional[str] = None,
         course_name: Optional[str] = None,
     ):
-        session = self._get_async_session()
+        # Справочники в памяти: на строку - поиск в словаре, в БД идем только
+        # за новыми названиями
+        faculty_id = await faculty_service.name_ids.get_id(faculty_name)
+        course_id = await course_service.name_ids.get_id(course_name)
+        session = self._get_write_session()
 
         try:
             async with session() as db:
-                faculty = await faculty_service.get_faculty(faculty_name=faculty_name)
-
-                if faculty is None:
-                    faculty = await faculty_service.create_faculty(faculty_name)
+                if faculty_id is None:
+                    faculties, _ = await get_or_create_by_name(
+                        db, Faculty, [faculty_name]
+                    )
+                    faculty_id = faculties[faculty_name].id
 
-                course = await course_service.get_course(course_name=course_name)
+                if course_id is None:
+                    courses, _ = await get_or_create_by_name(db, Course, [course_name])
+                    course_id = courses[course_name].id
 
-                if course is None:
-                    course = await course_service.create_course(course_name)
+                student = Student(
+                    last_name=last_name,
+                    first_name=first_name,
+                    faculty=faculty_id,
+                    course=course_id,
+                    grade=grade,
+                )
+                db.add(student)
+                await apply_grade_deltas(
+                    db, student_grade_deltas([_grade_key(student)])
+                )
+                await db.commit()
 
-                if faculty and course:
-                    student = Student(
-                        last_name=last_name,
-                        first_name=first_name,
-                        faculty=faculty.id,
-                        course=course.id,
-                        grade=grade,
-                    )
-                    db.add(student)
-                    await db.commit()
+            _remember_dimensions({faculty_name: faculty_id}, {course_name: course_id})
 
-                return student
+            return student
         except Exception as e:
             await db.rollback()
 
@@ -227,5 +580,205 @@ class StudentService(MainService):
                 status="error", message=f"Ошибка при создании студента: {e}"
             )
 
+    async def _insert_students_chunk(
+        self,
+        rows: List[dict],
+        faculty_ids: Dict[str, int],
+        course_ids: Dict[str, int],
+        result: LoadResult,
+        job: Optional[Job] = None,
+    ) -> None:
+        session = self._get_write_session()
+        result.rows_total += len(rows)
+
+        # Новые факультеты/курсы попадают в общие словари только после commit
+        chunk_faculty_ids = dict(faculty_ids)
+        chunk_course_ids = dict(course_ids)
+        chunk_result = LoadResult()
+
+        try:
+            async with session() as db:
+                await self._upsert_dimensions(
+                    db,
+                    {row["faculty_name"] for row in rows},
+                    {row["course_name"] for row in rows},
+                    chunk_faculty_ids,
+                    chunk_course_ids,
+                    chunk_result,
+                )
+
+                students = [
+                    {
+                        "last_name": row["last_name"],
+                        "first_name": row["first_name"],
+                        "grade": row["grade"],
+                        "faculty": chunk_faculty_ids[row["faculty_name"]],
+                        "course": chunk_course_ids[row["course_name"]],
+                    }
+                    for row in rows
+                ]
+
+                if _supports_copy(db):
+                    await _copy_students(db, students)
+                else:
+                    await db.execute(insert(Student), students)
+
+                await apply_grade_deltas(
+                    db,
+                    student_grade_deltas(
+                        (student["grade"], student["faculty"], student["course"])
+                        for student in students
+                    ),
+                )
+                await db.commit()
+
+            faculty_ids.update(chunk_faculty_ids)
+            course_ids.update(chunk_course_ids)
+            _remember_dimensions(chunk_faculty_ids, chunk_course_ids)
+            result.faculties_created += chunk_result.faculties_created
+            result.courses_created += chunk_result.courses_created
+            result.rows_inserted += len(students)
+
+            if job is not None:
+                job.advance(processed=len(students))
+        except Exception as e:
+            await db.rollback()
+            # Id из справочника мог устареть (запись удалили в другом процессе)
+            faculty_service.name_ids.invalidate()
+            course_service.name_ids.invalidate()
+            result.rows_failed += len(rows)
+            message = f"Ошибка при загрузке пачки из {len(rows)} студентов: {e}"
+
+            print(f"error: {message}")
+
+            if job is not None:
+                job.advance(failed=len(rows))
+                job.add_error(message)
+
+    async def _upsert_dimensions(
+        self,
+        db,
+        faculty_names: Set[str],
+        course_names: Set[str],
+        faculty_ids: Dict[str, int],
+        course_ids: Dict[str, int],
+        result: LoadResult,
+    ) -> None:
+        faculty_ids.update(
+            await faculty_service.name_ids.get_ids(faculty_names - faculty_ids.keys())
+        )
+        course_ids.update(
+            await course_service.name_ids.get_ids(course_names - course_ids.keys())
+        )
+        result.faculties_created += await _upsert_names(
+            db, Faculty, faculty_names - faculty_ids.keys(), faculty_ids
+        )
+        result.courses_created += await _upsert_names(
+            db, Course, course_names - course_ids.keys(), course_ids
+        )
+
+
+async def _upsert_names(db, model, names: Set[str], name_ids: Dict[str, int]) -> int:
+    if not names:
+        return 0
+
+    entities, created = await get_or_create_by_name(db, model, names)
+    name_ids.update((name, entity.id) for name, entity in entities.items())
+
+    return created
+
+
+async def _existing_ids(db, model, ids: Set[int]) -> Set[int]:
+    ids = list(ids)
+    existing = set()
+
+    for start in range(0, len(ids), SELECT_CHUNK_SIZE):
+        end = start + SELECT_CHUNK_SIZE
+        found = await db.scalars(select(model.id).where(model.id.in_(ids[start:end])))
+        existing.update(found)
+
+    return existing
+
+
+def _remember_dimensions(
+    faculty_ids: Dict[str, int], course_ids: Dict[str, int]
+) -> None:
+    # После commit: созданные факультеты и курсы видны следующим загрузкам и API
+    faculty_service.name_ids.update(faculty_ids)
+    course_service.name_ids.update(course_ids)
+
+
+def _grade_key(student: Student) -> tuple:
+    return student.grade, student.faculty, student.course
+
+
+def _supports_copy(db) -> bool:
+    return db.get_bind().dialect.driver == "asyncpg"
+
+
+async def _copy_students(db, students: List[dict]) -> None:
+    # COPY в рамках текущей транзакции сессии, минуя построчные INSERT
+    connection = await db.connection()
+    # Адаптер asyncpg открывает транзакцию только на первом execute: без него
+    # COPY зафиксируется сам, вне транзакции пачки
+    await connection.exec_driver_sql("SELECT 1")
+    raw_connection = await connection.get_raw_connection()
+
+    await raw_connection.driver_connection.copy_records_to_table(
+        Student.__tablename__,
+        records=[
+            tuple(student[column] for column in STUDENT_COPY_COLUMNS)
+            for student in students
+        ],
+        columns=STUDENT_COPY_COLUMNS,
+    )
+
+
+def _parse_csv_row(row: dict) -> dict:
+    try:
+        grade = int(row["Оценка"])
+    except (ValueError, TypeError):
+        grade = 0
+
+    student = {
+        "last_name": row["Фамилия"],
+        "first_name": row["Имя"],
+        "faculty_name": row["Факультет"],
+        "course_name": row["Курс"],
+        "grade": grade,
+    }
+
+    # DictReader дополняет короткую строку значениями None
+    if None in student.values():
+        raise TypeError(f"В строке csv файла не хватает значений: {row}")
+
+    return student
+
+
+def _parse_csv_rows(
+    rows: Iterable[dict], result: LoadResult, job: Optional[Job]
+) -> Iterator[dict]:
+    for row in rows:
+        try:
+            yield _parse_csv_row(row)
+        except (KeyError, TypeError):
+            _skip_csv_row(row, result, job)
+
+
+def _skip_csv_row(row: dict, result: LoadResult, job: Optional[Job]) -> None:
+    result.rows_total += 1
+    result.rows_failed += 1
+
+    if job is not None:
+        job.advance(failed=1)
+        job.add_error(f"Некорректная строка csv файла: {row}")
+
+
+def _chunked(rows: Iterable[dict], chunk_size: int) -> Iterator[List[dict]]:
+    rows = iter(rows)
+
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
 
 student_service = StudentService()
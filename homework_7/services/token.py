@@ -1,9 +1,16 @@
+import time
+from collections import OrderedDict
 from http import HTTPStatus
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import jwt
 from fastapi import Cookie, HTTPException
 
+from homework_7.services.entities import Principal, TokenClaims
+from homework_7.services.principal import principal_service
+
+TOKEN_CACHE_SIZE = 10_000
+
 
 class TokenService:
     _jwt_secret = (
@@ -11,6 +18,12 @@ class TokenService:
     )
     jwt_alg = "HS256"
 
+    def __init__(self, cache_size: int = TOKEN_CACHE_SIZE):
+        # token -> claims до истечения exp: повторные запросы не проверяют
+        # подпись и не разбирают JSON
+        self._cache_size = cache_size
+        self._claims: OrderedDict[str, TokenClaims] = OrderedDict()
+
     def create_token(self, data: Dict[str, Any]):
         token = jwt.encode(data, key=self._jwt_secret, algorithm=self.jwt_alg)
 
@@ -21,11 +34,50 @@ class TokenService:
 
         return decode_data
 
-    async def get_auth_cookie(self, access_token: str = Cookie(None)):
-        if not access_token or not token_service.verify_token(access_token):
+    def get_claims(self, token: str) -> Optional[TokenClaims]:
+        claims = self._claims.get(token)
+
+        if claims is not None:
+            if claims.expires_at > time.time():
+                self._claims.move_to_end(token)
+                return claims
+
+            del self._claims[token]
+
+        try:
+            decoded = self.verify_token(token)
+        except jwt.InvalidTokenError:
+            return None
+
+        if "login" not in decoded or "exp" not in decoded:
+            return None
+
+        claims = TokenClaims(
+            login=decoded["login"],
+            token_type=decoded.get("type", "access"),
+            expires_at=float(decoded["exp"]),
+        )
+        self._claims[token] = claims
+
+        if len(self._claims) > self._cache_size:
+            self._claims.popitem(last=False)
+
+        return claims
+
+    async def get_auth_cookie(self, access_token: str = Cookie(None)) -> Principal:
+        claims = token_service.get_claims(access_token) if access_token else None
+        principal = None
+
+        if claims is not None and claims.token_type == "access":
+            # Удаленный пользователь теряет доступ, даже если токен еще действует
+            principal = await principal_service.get_principal(claims.login)
+
+        if principal is None:
             raise HTTPException(
                 status_code=HTTPStatus.UNAUTHORIZED, detail="Пользователь неавторизован"
             )
 
+        return principal
+
 
 token_service = TokenService()
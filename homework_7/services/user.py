@@ -1,11 +1,12 @@
 from typing import Optional
 
 from sqlalchemy import delete, select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 
+from homework_7.db.errors import is_unique_violation
 from homework_7.db.models.models import User
 from homework_7.services.entities import OperationStatus
-from homework_7.services.main_service import MainService
+from homework_7.services.main_service import UPDATE_CONFLICT_MESSAGE, MainService
 
 
 class UserService(MainService):
@@ -17,8 +18,6 @@ class UserService(MainService):
         email: str,
         password: str,
     ):
-        session = self._get_async_session()
-
         user = User(
             last_name=last_name,
             first_name=first_name,
@@ -27,21 +26,20 @@ class UserService(MainService):
             password=password,
         )
 
-        try:
-            async with session() as db:
-                db.add(user)
-                await db.commit()
+        async def operation(db):
+            db.add(user)
+            await db.flush()
 
             return user
+
+        try:
+            return await self._execute_write(operation)
         except Exception as e:
-            await db.rollback()
-            if isinstance(e, IntegrityError):
-                # SQLITE_CONSTRAINT_UNIQUE ERROR
-                if e.orig.sqlite_errorcode == 2067:
-                    return OperationStatus(
-                        status="error",
-                        message="Пользователь с таким логином уже создан",
-                    )
+            if is_unique_violation(e):
+                return OperationStatus(
+                    status="error",
+                    message="Пользователь с таким логином уже создан",
+                )
 
             return OperationStatus(
                 status="error", message=f"Ошибка при создании пользователя: {e}"
@@ -61,24 +59,20 @@ class UserService(MainService):
             return user.scalars().one_or_none()
 
     async def delete_user(self, user_id: int) -> OperationStatus:
-        session = self._get_async_session()
-
-        async with session() as db:
+        async def operation(db):
             result = await db.execute(delete(User).where(User.id == user_id))
 
-            await db.commit()
+            return result.rowcount
 
-            if result.rowcount > 0:
-                return OperationStatus(
-                    status="success", message="User deleted successfully"
-                )
-            else:
-                return OperationStatus(status="error", message="User not found")
+        if await self._execute_write(operation) > 0:
+            return OperationStatus(
+                status="success", message="User deleted successfully"
+            )
+        else:
+            return OperationStatus(status="error", message="User not found")
 
     async def update_user(self, user_id: int, **kwargs) -> OperationStatus:
-        session = self._get_async_session()
-
-        async with session() as db:
+        async def operation(db):
             user = await db.execute(select(User).where(User.id == user_id))
 
             user = user.scalars().one_or_none()
@@ -90,11 +84,18 @@ class UserService(MainService):
                 if value:
                     setattr(user, key, value)
 
-            await db.commit()
+            await db.flush()
 
             return OperationStatus(
-                status="success", message="User updated successfully"
+                status="success",
+                message="User updated successfully",
+                entity=user,
             )
 
+        try:
+            return await self._execute_write(operation)
+        except StaleDataError:
+            return OperationStatus(status="conflict", message=UPDATE_CONFLICT_MESSAGE)
+
 
 user_service = UserService()
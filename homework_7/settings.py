@@ -0,0 +1,61 @@
+import os
+
+# В реальном приложении значения задаются через переменные окружения
+
+
+def _get_bool_env(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+
+DB_URL = os.getenv("DB_URL", "sqlite+aiosqlite:///./student.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", -1))
+DB_POOL_PRE_PING = _get_bool_env("DB_POOL_PRE_PING", False)
+
+# Профиль производительности SQLite (WAL, pragma) и очередь записи
+DB_SQLITE_TUNING = _get_bool_env("DB_SQLITE_TUNING", False)
+DB_SQLITE_MMAP_SIZE = int(os.getenv("DB_SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+DB_SQLITE_CACHE_SIZE = int(os.getenv("DB_SQLITE_CACHE_SIZE", -64 * 1024))
+DB_SQLITE_BUSY_TIMEOUT = int(os.getenv("DB_SQLITE_BUSY_TIMEOUT", 5000))
+DB_WRITE_QUEUE = _get_bool_env("DB_WRITE_QUEUE", False)
+DB_WRITE_QUEUE_MAX_BATCH = int(os.getenv("DB_WRITE_QUEUE_MAX_BATCH", 100))
+DB_WRITE_QUEUE_MAX_DELAY = float(os.getenv("DB_WRITE_QUEUE_MAX_DELAY", 0.005))
+
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+
+# Локальный кеш процесса перед Redis (L1), инвалидация через pub/sub
+CACHE_LOCAL_ENABLED = _get_bool_env("CACHE_LOCAL_ENABLED", False)
+CACHE_LOCAL_MAX_ITEMS = int(os.getenv("CACHE_LOCAL_MAX_ITEMS", 10000))
+CACHE_LOCAL_MAX_BYTES = int(os.getenv("CACHE_LOCAL_MAX_BYTES", 32 * 1024 * 1024))
+CACHE_LOCAL_TTL = float(os.getenv("CACHE_LOCAL_TTL", 5))
+# Запись свежих данных в кеш после create/update вместо сброса ключа
+CACHE_WRITE_THROUGH = _get_bool_env("CACHE_WRITE_THROUGH", False)
+
+# Колоночный снимок students для аналитики: догрузка изменений не чаще
+# refresh_interval, полная перестройка раз в max_age секунд
+ANALYTICS_REFRESH_INTERVAL = float(os.getenv("ANALYTICS_REFRESH_INTERVAL", 1))
+ANALYTICS_SNAPSHOT_MAX_AGE = float(os.getenv("ANALYTICS_SNAPSHOT_MAX_AGE", 300))
+
+# Хеширование паролей вне цикла событий: thread/process пул, 0 воркеров -
+# синхронно в цикле событий
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+
+# Скользящее окно попыток входа в Redis: проверяется до поиска пользователя
+# и хеширования пароля
+LOGIN_RATE_LIMIT_PER_LOGIN = int(os.getenv("LOGIN_RATE_LIMIT_PER_LOGIN", 10))
+LOGIN_RATE_LIMIT_PER_IP = int(os.getenv("LOGIN_RATE_LIMIT_PER_IP", 100))
+LOGIN_RATE_LIMIT_WINDOW = float(os.getenv("LOGIN_RATE_LIMIT_WINDOW", 60))
+# Недоступный Redis не должен задерживать вход: короткий таймаут и пауза
+# перед следующей попыткой, пока лимит считается в памяти процесса
+RATE_LIMIT_REDIS_TIMEOUT = float(os.getenv("RATE_LIMIT_REDIS_TIMEOUT", 0.2))
+RATE_LIMIT_REDIS_RETRY_DELAY = float(os.getenv("RATE_LIMIT_REDIS_RETRY_DELAY", 5))
+
+# Пользователь из access-токена кешируется на короткое время
+AUTH_PRINCIPAL_CACHE_TTL = int(os.getenv("AUTH_PRINCIPAL_CACHE_TTL", 30))
+
+# Справочники name -> id факультетов и курсов в памяти процесса
+DIMENSION_CACHE_TTL = float(os.getenv("DIMENSION_CACHE_TTL", 60))
@@ -1,26 +1,301 @@
-from typing import Optional
+import asyncio
+import json
+import uuid
+from typing import Iterable, List, Optional, Tuple
 
 from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from homework_7 import settings
+from homework_7.storages.local_cache import LocalCacheStorage
 
 COMPONENT_NAME = "cache_storage"
+DELETE_MANY_CHUNK_SIZE = 1000
+INVALIDATION_CHANNEL = f"{COMPONENT_NAME}:invalidate"
+LISTENER_RETRY_DELAY = 1.0
+# Записывает значение, только если в кеше нет записи с более новой версией
+SET_IF_NEWER_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current then
+    local ok, entry = pcall(cjson.decode, current)
+    if ok and type(entry) == 'table' and tonumber(entry['version'])
+        and tonumber(entry['version']) > tonumber(ARGV[2]) then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+return 1
+"""
 
 
 class CacheStorage:
-    def __init__(self, host: str, port: int):
+    def __init__(
+        self, host: str, port: int, local_cache: Optional[LocalCacheStorage] = None
+    ):
         self.redis = Redis(host=host, port=port)
+        self.local_cache = local_cache
+        self.hits = 0
+        self.misses = 0
+        self._instance_id = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+        self._set_if_newer = self.redis.register_script(SET_IF_NEWER_SCRIPT)
 
     async def set(self, key: str, value: str, expire_time: int = 60) -> None:
-        await self.redis.set(self._redis_key(key), value, ex=expire_time)
+        if self.local_cache is None:
+            await self.redis.set(self._redis_key(key), value, ex=expire_time)
+            return
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(self._redis_key(key), value, ex=expire_time)
+            pipe.publish(INVALIDATION_CHANNEL, self._invalidation_message([key]))
+            await pipe.execute()
+
+        self.local_cache.set(key, value, expire_time)
+
+    async def set_if_newer(
+        self, key: str, value: str, version: int, expire_time: int = 60
+    ) -> bool:
+        # value - JSON-объект с полем version
+        keys = [self._redis_key(key)]
+        args = [value, version, expire_time]
+
+        if self.local_cache is None:
+            return bool(await self._set_if_newer(keys=keys, args=args))
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            await self._set_if_newer(keys=keys, args=args, client=pipe)
+            pipe.publish(INVALIDATION_CHANNEL, self._invalidation_message([key]))
+            stored, _ = await pipe.execute()
+
+        if stored:
+            self.local_cache.set(key, value, expire_time)
+        else:
+            self.local_cache.delete(key)
+
+        return bool(stored)
 
     async def get(self, key: str) -> Optional[str]:
-        return await self.redis.get(self._redis_key(key))
+        if self.local_cache is not None:
+            self._ensure_listener()
+            value = self.local_cache.get(key)
+
+            if value is not None:
+                return value
+
+        value = await self.redis.get(self._redis_key(key))
+
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        if self.local_cache is not None:
+            self.local_cache.set(key, value)
+
+        return value
+
+    async def get_many(self, keys: Iterable[str]) -> List[Optional[str]]:
+        keys = list(keys)
+        values: List[Optional[str]] = [None] * len(keys)
+        missing = []
+
+        if self.local_cache is not None:
+            self._ensure_listener()
+
+        for index, key in enumerate(keys):
+            if self.local_cache is not None:
+                values[index] = self.local_cache.get(key)
+
+            if values[index] is None:
+                missing.append(index)
+
+        if not missing:
+            return values
+
+        found = await self.redis.mget([self._redis_key(keys[i]) for i in missing])
+
+        for index, value in zip(missing, found):
+            if value is None:
+                self.misses += 1
+                continue
+
+            self.hits += 1
+            values[index] = value
+
+            if self.local_cache is not None:
+                self.local_cache.set(keys[index], value)
+
+        return values
+
+    async def set_many(
+        self, items: Iterable[Tuple[str, str, int, Optional[int]]]
+    ) -> None:
+        # items: (key, value, expire_time, version); записи с версией пишутся
+        # через set_if_newer и не перетирают более новые
+        items = list(items)
+
+        if not items:
+            return
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value, expire_time, version in items:
+                if version is None:
+                    pipe.set(self._redis_key(key), value, ex=expire_time)
+                else:
+                    await self._set_if_newer(
+                        keys=[self._redis_key(key)],
+                        args=[value, version, expire_time],
+                        client=pipe,
+                    )
+
+            if self.local_cache is not None:
+                pipe.publish(
+                    INVALIDATION_CHANNEL,
+                    self._invalidation_message([item[0] for item in items]),
+                )
+
+            results = await pipe.execute()
+
+        if self.local_cache is not None:
+            for (key, value, expire_time, version), stored in zip(items, results):
+                # SET возвращает True, скрипт - 1 или 0
+                if stored:
+                    self.local_cache.set(key, value, expire_time)
+                else:
+                    self.local_cache.delete(key)
 
     async def delete(self, key: str) -> None:
-        return await self.redis.delete(self._redis_key(key))
+        if self.local_cache is None:
+            return await self.redis.delete(self._redis_key(key))
+
+        self.local_cache.delete(key)
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.delete(self._redis_key(key))
+            pipe.publish(INVALIDATION_CHANNEL, self._invalidation_message([key]))
+            deleted, _ = await pipe.execute()
+
+        return deleted
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        keys = list(keys)
+
+        if not keys:
+            return 0
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for start in range(0, len(keys), DELETE_MANY_CHUNK_SIZE):
+                end = start + DELETE_MANY_CHUNK_SIZE
+                chunk = keys[start:end]
+                pipe.delete(*[self._redis_key(key) for key in chunk])
+
+                if self.local_cache is not None:
+                    pipe.publish(
+                        INVALIDATION_CHANNEL, self._invalidation_message(chunk)
+                    )
+
+            results = await pipe.execute()
+
+        if self.local_cache is not None:
+            for key in keys:
+                self.local_cache.delete(key)
+
+            # В ответах pipeline чередуются DEL и PUBLISH
+            results = results[::2]
+
+        return sum(results)
+
+    async def get_counter(self, key: str) -> int:
+        # Счетчики не попадают в локальный кеш, чтобы изменения были видны сразу
+        value = await self.redis.get(self._redis_key(key))
+
+        return int(value or 0)
+
+    async def get_counters(self, keys: Iterable[str]) -> List[int]:
+        values = await self.redis.mget([self._redis_key(key) for key in keys])
+
+        return [int(value or 0) for value in values]
+
+    async def incr(self, key: str) -> int:
+        return await self.redis.incr(self._redis_key(key))
+
+    async def incr_many(self, keys: Iterable[str]) -> List[int]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.incr(self._redis_key(key))
+
+            return await pipe.execute()
+
+    def get_stats(self) -> dict:
+        requests = self.hits + self.misses
+
+        return {
+            "local": None if self.local_cache is None else self.local_cache.as_dict(),
+            "redis": {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / requests, 4) if requests else 0.0,
+            },
+            "invalidation_listener": self._listener is not None
+            and not self._listener.done(),
+        }
+
+    def _ensure_listener(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        if (
+            self._listener is not None
+            and not self._listener.done()
+            and self._listener.get_loop() is loop
+        ):
+            return
+
+        self._listener = loop.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    # Пока подписки не было, инвалидации могли потеряться
+                    self.local_cache.clear()
+
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._on_invalidation(message["data"])
+            except (RedisError, OSError) as error:
+                print(f"Подписка на инвалидацию кеша прервана: {error}")
+                self.local_cache.clear()
+                await asyncio.sleep(LISTENER_RETRY_DELAY)
+
+    def _on_invalidation(self, data: bytes) -> None:
+        message = json.loads(data)
+
+        if message["source"] == self._instance_id:
+            return
+
+        for key in message["keys"]:
+            self.local_cache.delete(key)
+
+    def _invalidation_message(self, keys: List[str]) -> str:
+        return json.dumps({"source": self._instance_id, "keys": keys})
 
     @staticmethod
     def _redis_key(key):
         return f"{COMPONENT_NAME}:{key}"
 
 
-cache_storage = CacheStorage(host="localhost", port=6379)
+cache_storage = CacheStorage(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    local_cache=(
+        LocalCacheStorage(
+            max_items=settings.CACHE_LOCAL_MAX_ITEMS,
+            max_bytes=settings.CACHE_LOCAL_MAX_BYTES,
+            ttl=settings.CACHE_LOCAL_TTL,
+        )
+        if settings.CACHE_LOCAL_ENABLED
+        else None
+    ),
+)
@@ -0,0 +1,79 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class LocalCacheStorage:
+    def __init__(self, max_items: int, max_bytes: int, ttl: float):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size_bytes = 0
+        self._items: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        item = self._items.get(key)
+
+        if item is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = item
+
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._items.move_to_end(key)
+        self.hits += 1
+
+        return value
+
+    def set(self, key: str, value: str, expire_time: Optional[float] = None) -> None:
+        ttl = self.ttl if expire_time is None else min(expire_time, self.ttl)
+        size = len(value)
+
+        self._remove(key)
+
+        # Крупные значения в процессе не держим, они остаются только в Redis
+        if ttl <= 0 or size > self.max_bytes:
+            return
+
+        self._items[key] = (time.monotonic() + ttl, value)
+        self._size_bytes += size
+
+        while len(self._items) > self.max_items or self._size_bytes > self.max_bytes:
+            oldest_key = next(iter(self._items))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        self._remove(key)
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._size_bytes = 0
+
+    def as_dict(self):
+        requests = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / requests, 4) if requests else 0.0,
+            "evictions": self.evictions,
+            "items": len(self._items),
+            "size_bytes": self._size_bytes,
+            "max_items": self.max_items,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _remove(self, key: str) -> None:
+        item = self._items.pop(key, None)
+
+        if item is not None:
+            self._size_bytes -= len(item[1])
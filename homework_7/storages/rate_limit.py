@@ -0,0 +1,198 @@
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Sequence
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from homework_7 import settings
+
+COMPONENT_NAME = "rate_limit"
+LOCAL_MAX_KEYS = 10000
+# Команд в pipeline на один лимит
+PIPELINE_COMMANDS = 5
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    # Не больше limit попыток за последние window секунд
+    name: str
+    limit: int
+    window: float
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    # Лимит, который был превышен, и через сколько секунд освободится попытка
+    limit_name: Optional[str] = None
+    retry_after: float = 0.0
+
+
+class SlidingWindowRateLimiter:
+    # Скользящее окно в ZSET: попытка - элемент с временем в score. Если Redis
+    # недоступен, окно считается в памяти процесса
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        limits: Sequence[RateLimit],
+        prefix: str,
+        socket_timeout: float,
+        retry_delay: float,
+    ):
+        self.redis = Redis(
+            host=host,
+            port=port,
+            socket_connect_timeout=socket_timeout,
+            socket_timeout=socket_timeout,
+        )
+        self.limits = {limit.name: limit for limit in limits}
+        self.prefix = prefix
+        self.allowed = 0
+        self.rejected: Dict[str, int] = {limit.name: 0 for limit in limits}
+        self.fallbacks = 0
+        self._retry_delay = retry_delay
+        # До этого момента (time.monotonic) Redis не опрашивается
+        self._redis_retry_at = 0.0
+        self._local: OrderedDict[str, Deque[float]] = OrderedDict()
+
+    async def hit(self, identities: Dict[str, str]) -> RateLimitResult:
+        # identities: имя лимита -> идентификатор (логин, IP)
+        now = time.time()
+        keys = {name: self._key(name, value) for name, value in identities.items()}
+
+        windows = None
+
+        if time.monotonic() >= self._redis_retry_at:
+            try:
+                windows = await self._hit_redis(keys, now)
+            except (RedisError, OSError) as error:
+                print(f"Лимит попыток считается локально, Redis недоступен: {error}")
+                self._redis_retry_at = time.monotonic() + self._retry_delay
+
+        if windows is None:
+            self.fallbacks += 1
+            windows = self._hit_local(keys, now)
+
+        for name, (count, released_at) in windows.items():
+            limit = self.limits[name]
+
+            if count > limit.limit:
+                self.rejected[name] += 1
+
+                return RateLimitResult(
+                    allowed=False,
+                    limit_name=name,
+                    retry_after=max(released_at + limit.window - now, 0.0),
+                )
+
+        self.allowed += 1
+
+        return RateLimitResult(allowed=True)
+
+    async def reset(self, name: str, value: str) -> None:
+        key = self._key(name, value)
+        self._local.pop(key, None)
+
+        if time.monotonic() < self._redis_retry_at:
+            return
+
+        try:
+            await self.redis.delete(key)
+        except (RedisError, OSError) as error:
+            print(f"Не удалось сбросить лимит попыток {key}: {error}")
+
+    async def clear(self) -> None:
+        self._local.clear()
+        self._redis_retry_at = 0.0
+        keys = [key async for key in self.redis.scan_iter(f"{self.prefix}:*")]
+
+        if keys:
+            await self.redis.delete(*keys)
+
+    def as_dict(self):
+        return {
+            "limits": {
+                name: {"limit": limit.limit, "window": limit.window}
+                for name, limit in self.limits.items()
+            },
+            "allowed": self.allowed,
+            "rejected": dict(self.rejected),
+            "fallbacks": self.fallbacks,
+            "local_keys": len(self._local),
+        }
+
+    async def _hit_redis(self, keys: Dict[str, str], now: float) -> Dict[str, List]:
+        # Одна транзакция на все лимиты: чистка окна, попытка, размер и
+        # попытка, после истечения которой в окне освободится место. Отклоненные
+        # попытки тоже записываются, поэтому это (count - limit)-я, а не старейшая
+        member = f"{now}:{uuid.uuid4().hex}"
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for name, key in keys.items():
+                window = self.limits[name].window
+                pipe.zremrangebyscore(key, 0, now - window)
+                pipe.zadd(key, {member: now})
+                pipe.zcard(key)
+                limit = self.limits[name].limit
+                pipe.zrange(key, -limit, -limit, withscores=True)
+                pipe.expire(key, int(window) + 1)
+
+            results = await pipe.execute()
+
+        windows = {}
+
+        for index, name in enumerate(keys):
+            start = index * PIPELINE_COMMANDS
+            end = start + PIPELINE_COMMANDS
+            _, _, count, released, _ = results[start:end]
+            windows[name] = [count, released[0][1] if released else now]
+
+        return windows
+
+    def _hit_local(self, keys: Dict[str, str], now: float) -> Dict[str, List]:
+        windows = {}
+
+        for name, key in keys.items():
+            attempts = self._local.setdefault(key, deque())
+            self._local.move_to_end(key)
+
+            while attempts and attempts[0] <= now - self.limits[name].window:
+                attempts.popleft()
+
+            attempts.append(now)
+            limit = self.limits[name].limit
+            released_at = attempts[-limit] if len(attempts) >= limit else now
+            windows[name] = [len(attempts), released_at]
+
+        while len(self._local) > LOCAL_MAX_KEYS:
+            self._local.popitem(last=False)
+
+        return windows
+
+    def _key(self, name: str, value: str) -> str:
+        return f"{self.prefix}:{name}:{value}"
+
+
+login_rate_limiter = SlidingWindowRateLimiter(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    limits=[
+        RateLimit(
+            name="login",
+            limit=settings.LOGIN_RATE_LIMIT_PER_LOGIN,
+            window=settings.LOGIN_RATE_LIMIT_WINDOW,
+        ),
+        RateLimit(
+            name="ip",
+            limit=settings.LOGIN_RATE_LIMIT_PER_IP,
+            window=settings.LOGIN_RATE_LIMIT_WINDOW,
+        ),
+    ],
+    prefix=f"{COMPONENT_NAME}:auth_login",
+    socket_timeout=settings.RATE_LIMIT_REDIS_TIMEOUT,
+    retry_delay=settings.RATE_LIMIT_REDIS_RETRY_DELAY,
+)
@@ -4,8 +4,17 @@ import pytest_asyncio
 from fastapi.testclient import TestClient
 from sqlalchemy.ext.asyncio import create_async_engine
 
+from homework_7 import settings
+from homework_7.db.engine import get_engine
 from homework_7.db.models.models import Base
 from homework_7.main import app
+from homework_7.services.analytics import analytics_service
+from homework_7.services.cache import cache_service
+from homework_7.services.cache_keys import CACHE_NAMESPACES
+from homework_7.services.course import course_service
+from homework_7.services.faculty import faculty_service
+from homework_7.storages.cache import cache_storage
+from homework_7.storages.rate_limit import login_rate_limiter
 
 
 @pytest_asyncio.fixture(scope="function")
@@ -17,13 +26,27 @@ def event_loop():
 
 @pytest_asyncio.fixture(scope="function")
 async def setup_database():
-    BASE_URL = "sqlite+aiosqlite:///./student.db"
-    engine = create_async_engine(BASE_URL)
+    # DB_URL=postgresql+asyncpg://... запускает тесты на PostgreSQL
+    engine = create_async_engine(settings.DB_URL)
     async with engine.begin() as connection:
         await connection.run_sync(Base.metadata.create_all)
     yield
     async with engine.begin() as connection:
         await connection.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+    # Соединения приложения привязаны к циклу событий TestClient
+    await get_engine(settings.DB_URL).dispose(close=False)
+    cache_storage.redis.connection_pool.reset()
+    # Следующий тест создает записи с теми же id: кеш прошлого теста не читается
+    for namespace in CACHE_NAMESPACES.values():
+        await cache_service.invalidate_namespace(namespace)
+    cache_storage.redis.connection_pool.reset()
+    login_rate_limiter.redis.connection_pool.reset()
+    await login_rate_limiter.clear()
+    login_rate_limiter.redis.connection_pool.reset()
+    analytics_service.invalidate()
+    faculty_service.name_ids.invalidate()
+    course_service.name_ids.invalidate()
 
 
 @pytest_asyncio.fixture
@@ -0,0 +1,116 @@
+from http import HTTPStatus
+
+import pytest
+
+from homework_7.services.analytics import analytics_service
+
+
+def login_and_fill_db(app_client):
+    app_client.post(
+        "/api/v1/auth/register/",
+        json={
+            "last_name": "Фамилия",
+            "first_name": "Имя",
+            "login": "test_login1",
+            "email": "test@gmail.com",
+            "password": "test_pass1",
+        },
+    )
+    app_client.post(
+        "/api/v1/auth/login/",
+        json={
+            "login": "test_login1",
+            "password": "test_pass1",
+        },
+    )
+    app_client.post(
+        "/api/v1/backend/fill_db/",
+        params={"csv_file_path": "db/init_data/students.csv"},
+    )
+
+
+def get_all_students(app_client):
+    return app_client.get(
+        "/api/v1/students/get_students/", params={"limit": 1000}
+    ).json()["items"]
+
+
+@pytest.mark.asyncio()
+async def test_analytics_match_students(app_client):
+    login_and_fill_db(app_client)
+    students = get_all_students(app_client)
+    grades = sorted(student["grade"] for student in students)
+
+    percentiles = app_client.get(
+        "/api/v1/analytics/percentiles/", params={"q": [0, 100]}
+    ).json()
+    histogram = app_client.get(
+        "/api/v1/analytics/histogram/", params={"bins": 4}
+    ).json()
+    distribution = app_client.get("/api/v1/analytics/distribution/").json()["items"]
+    top = app_client.get("/api/v1/analytics/top_students/", params={"limit": 5})
+
+    assert percentiles == {
+        "count": len(grades),
+        "percentiles": {"0": grades[0], "100": grades[-1]},
+    }
+    assert sum(histogram["counts"]) == len(grades)
+    assert sum(group["count"] for group in distribution) == len(grades)
+    assert {(group["faculty_id"], group["course_id"]) for group in distribution} == {
+        (student["faculty"], student["course"]) for student in students
+    }
+    assert top.status_code == HTTPStatus.OK
+    assert [student["grade"] for student in top.json()] == grades[::-1][:5]
+
+
+@pytest.mark.asyncio()
+async def test_analytics_snapshot_refreshes_incrementally(app_client, monkeypatch):
+    monkeypatch.setattr(analytics_service, "_refresh_interval", 0)
+    login_and_fill_db(app_client)
+
+    snapshot = app_client.get("/api/v1/analytics/snapshot/").json()
+
+    assert snapshot["students"] == 215
+
+    app_client.post(
+        "/api/v1/students/create_student/",
+        json={"last_name": "Ли", "first_name": "Иван", "grade": 100},
+    )
+    app_client.delete("/api/v1/students/delete_student/1")
+    app_client.patch(
+        "/api/v1/students/update_student/2",
+        json={"last_name": "Ли", "first_name": "Петр", "grade": 0},
+    )
+
+    snapshot = app_client.get("/api/v1/analytics/snapshot/").json()
+    grades = sorted(student["grade"] for student in get_all_students(app_client))
+    percentiles = app_client.get(
+        "/api/v1/analytics/percentiles/", params={"q": [0, 100]}
+    ).json()
+
+    assert snapshot["students"] == 215
+    assert snapshot["watermark"] == 216
+    assert percentiles["percentiles"] == {"0": grades[0], "100": grades[-1]}
+
+
+@pytest.mark.asyncio()
+async def test_analytics_snapshot_keeps_changes_after_failed_refresh(
+    app_client, monkeypatch
+):
+    monkeypatch.setattr(analytics_service, "_refresh_interval", 0)
+    login_and_fill_db(app_client)
+    app_client.get("/api/v1/analytics/snapshot/")
+    app_client.delete("/api/v1/students/delete_student/1")
+
+    async def failed_load(*args, **kwargs):
+        raise ConnectionError("Нет соединения с базой")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(analytics_service, "_load", failed_load)
+
+        with pytest.raises(ConnectionError):
+            app_client.get("/api/v1/analytics/snapshot/")
+
+    snapshot = app_client.get("/api/v1/analytics/snapshot/").json()
+
+    assert snapshot["students"] == 214
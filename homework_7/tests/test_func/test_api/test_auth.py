@@ -1,8 +1,21 @@
+from datetime import UTC, datetime, timedelta
 from http import HTTPStatus
 
 import pytest
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 
+from homework_7 import settings
+from homework_7.services.cache import cache_service
 from homework_7.services.password import password_service
+from homework_7.services.token import token_service
+from homework_7.storages import rate_limit
+from homework_7.storages.cache import cache_storage
+from homework_7.storages.rate_limit import (
+    RateLimit,
+    SlidingWindowRateLimiter,
+    login_rate_limiter,
+)
 
 
 @pytest.mark.parametrize(
@@ -197,3 +210,268 @@ async def test_logout(
     assert response.status_code == expected_status
     assert result == expected_result
     assert bool(response.cookies.get("access_token")) == has_cookie
+
+
+@pytest.mark.parametrize(
+    "token_data, expected_status",
+    [
+        (
+            {"login": "test_login1", "exp_minutes": 10, "type": "access"},
+            HTTPStatus.OK,
+        ),
+        (
+            {"login": "test_login1", "exp_minutes": -10, "type": "access"},
+            HTTPStatus.UNAUTHORIZED,
+        ),
+        (
+            {"login": "test_login1", "exp_minutes": 10, "type": "refresh"},
+            HTTPStatus.UNAUTHORIZED,
+        ),
+        (None, HTTPStatus.UNAUTHORIZED),
+    ],
+    ids=[
+        "succeed auth: valid token",
+        "failed auth: expired token",
+        "failed auth: not an access token",
+        "failed auth: bad signature",
+    ],
+)
+@pytest.mark.asyncio()
+async def test_auth_cookie(app_client, token_data, expected_status):
+    app_client.post(
+        "/api/v1/auth/register/",
+        json={
+            "last_name": "Фамилия",
+            "first_name": "Имя",
+            "login": "test_login1",
+            "email": "test@gmail.com",
+            "password": "test_pass1",
+        },
+    )
+
+    if token_data is None:
+        token = token_service.create_token({"login": "test_login1"}) + "x"
+    else:
+        exp_minutes = token_data.pop("exp_minutes")
+        token_data["exp"] = datetime.now(UTC) + timedelta(minutes=exp_minutes)
+        token = token_service.create_token(token_data)
+
+    app_client.cookies.set("access_token", token)
+
+    for _ in range(2):
+        response = app_client.get("/api/v1/analytics/snapshot/")
+
+        assert response.status_code == expected_status
+
+    claims = token_service._claims.get(token)
+
+    if expected_status == HTTPStatus.OK:
+        # Повторный запрос обслужен из кэша разобранных токенов
+        assert claims.login == "test_login1"
+    else:
+        assert claims is None or claims.token_type != "access"
+
+
+@pytest.mark.parametrize(
+    "redis_available",
+    [True, False],
+    ids=[
+        "login rate limit in redis",
+        "login rate limit: local fallback",
+    ],
+)
+@pytest.mark.asyncio()
+async def test_login_rate_limit(app_client, monkeypatch, redis_available):
+    monkeypatch.setitem(
+        login_rate_limiter.limits, "login", RateLimit(name="login", limit=3, window=60)
+    )
+
+    if not redis_available:
+        monkeypatch.setattr(login_rate_limiter, "redis", Redis(port=1))
+
+    app_client.post(
+        "/api/v1/auth/register/",
+        json={
+            "last_name": "Фамилия",
+            "first_name": "Имя",
+            "login": "test_login1",
+            "email": "test@gmail.com",
+            "password": "test_pass1",
+        },
+    )
+    bad_credentials = {"login": "test_login1", "password": "wrong_pass"}
+
+    for _ in range(3):
+        response = app_client.post("/api/v1/auth/login/", json=bad_credentials)
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    completed = password_service.completed
+    response = app_client.post("/api/v1/auth/login/", json=bad_credentials)
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert int(response.headers["Retry-After"]) > 0
+    # Отклоненная попытка не доходит до pbkdf2
+    assert password_service.completed == completed
+
+    # Лимит по логину не мешает входу под другим логином с того же IP
+    response = app_client.post(
+        "/api/v1/auth/login/", json={"login": "test_login2", "password": "pass"}
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert login_rate_limiter.rejected["login"] >= 1
+    assert (login_rate_limiter.fallbacks > 0) != redis_available
+
+
+@pytest.mark.asyncio()
+async def test_auth_without_cache(app_client, monkeypatch):
+    app_client.post(
+        "/api/v1/auth/register/",
+        json={
+            "last_name": "Фамилия",
+            "first_name": "Имя",
+            "login": "test_login1",
+            "email": "test@gmail.com",
+            "password": "test_pass1",
+        },
+    )
+    app_client.post(
+        "/api/v1/auth/login/",
+        json={"login": "test_login1", "password": "test_pass1"},
+    )
+    # Redis недоступен: пользователь из токена и данные читаются из БД
+    monkeypatch.setattr(cache_storage, "redis", Redis(port=1))
+    monkeypatch.setattr(cache_storage, "local_cache", None)
+
+    response = app_client.get("/api/v1/students/get_students/")
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {"items": [], "next_cursor": None}
+
+    response = app_client.get("/api/v1/students/get_student/1")
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.parametrize(
+    "write_through",
+    [False, True],
+    ids=[
+        "register without cache: invalidate",
+        "register without cache: write-through",
+    ],
+)
+@pytest.mark.asyncio()
+async def test_register_without_cache(app_client, monkeypatch, write_through):
+    monkeypatch.setattr(cache_service, "_write_through", write_through)
+    monkeypatch.setattr(cache_storage, "redis", Redis(port=1))
+    monkeypatch.setattr(cache_storage, "local_cache", None)
+
+    # Пользователь уже создан: ошибка записи в кеш не превращается в 500
+    response = app_client.post(
+        "/api/v1/auth/register/",
+        json={
+            "last_name": "Фамилия",
+            "first_name": "Имя",
+            "login": "test_login1",
+            "email": "test@gmail.com",
+            "password": "test_pass1",
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+    response = app_client.post(
+        "/api/v1/auth/login/",
+        json={"login": "test_login1", "password": "test_pass1"},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def make_limiter(monkeypatch, clock: FakeClock) -> SlidingWindowRateLimiter:
+    monkeypatch.setattr(rate_limit, "time", clock)
+
+    return SlidingWindowRateLimiter(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        limits=[RateLimit(name="login", limit=2, window=10)],
+        prefix=f"{rate_limit.COMPONENT_NAME}:test",
+        socket_timeout=settings.RATE_LIMIT_REDIS_TIMEOUT,
+        retry_delay=5,
+    )
+
+
+@pytest.mark.parametrize(
+    "redis_available",
+    [True, False],
+    ids=[
+        "retry after in redis",
+        "retry after: local fallback",
+    ],
+)
+@pytest.mark.asyncio()
+async def test_rate_limit_retry_after(monkeypatch, redis_available):
+    clock = FakeClock(1000.0)
+    limiter = make_limiter(monkeypatch, clock)
+
+    if redis_available:
+        await limiter.clear()
+    else:
+        monkeypatch.setattr(limiter, "redis", Redis(port=1))
+
+    results = []
+
+    for now in (1000.0, 1004.0, 1006.0, 1007.0):
+        clock.now = now
+        results.append(await limiter.hit({"login": "test_login1"}))
+
+    if redis_available:
+        await limiter.clear()
+
+    await limiter.redis.aclose()
+
+    assert [result.allowed for result in results] == [True, True, False, False]
+    # Отклоненные попытки остаются в окне: место освобождает не старейшая
+    assert results[2].retry_after == 1004.0 + 10 - 1006.0
+    assert results[3].retry_after == 1006.0 + 10 - 1007.0
+    assert (limiter.fallbacks > 0) != redis_available
+
+
+@pytest.mark.asyncio()
+async def test_rate_limit_skips_redis_after_failure(monkeypatch):
+    clock = FakeClock(1000.0)
+    limiter = make_limiter(monkeypatch, clock)
+    calls = []
+
+    async def failed_hit_redis(keys, now):
+        calls.append(now)
+        raise RedisError("Redis недоступен")
+
+    monkeypatch.setattr(limiter, "_hit_redis", failed_hit_redis)
+
+    await limiter.hit({"login": "test_login1"})
+    clock.now += 1
+    await limiter.hit({"login": "test_login1"})
+
+    assert calls == [1000.0]
+    assert limiter.fallbacks == 2
+
+    clock.now += 5
+    result = await limiter.hit({"login": "test_login1"})
+
+    assert calls == [1000.0, 1006.0]
+    assert not result.allowed
+    assert result.retry_after == 1001.0 + 10 - 1006.0
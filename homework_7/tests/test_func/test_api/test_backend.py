@@ -0,0 +1,336 @@
+from http import HTTPStatus
+
+import pytest
+
+from homework_7 import settings
+from homework_7.db.engine import get_engine
+from homework_7.services.cache import cache_service
+from homework_7.services.course import course_service
+from homework_7.services.entities import JOB_ERROR_SAMPLE_SIZE
+from homework_7.services.faculty import faculty_service
+from homework_7.services.password import password_service
+from homework_7.services.student import student_service
+from homework_7.storages.cache import cache_storage
+from homework_7.storages.local_cache import LocalCacheStorage
+from homework_7.tests.utils import count_queries
+
+
+def login(app_client):
+    app_client.post(
+        "/api/v1/auth/register/",
+        json={
+            "last_name": "Фамилия",
+            "first_name": "Имя",
+            "login": "test_login1",
+            "email": "test@gmail.com",
+            "password": "test_pass1",
+        },
+    )
+    app_client.post(
+        "/api/v1/auth/login/",
+        json={
+            "login": "test_login1",
+            "password": "test_pass1",
+        },
+    )
+
+
+@pytest.mark.asyncio()
+async def test_fill_db_job(app_client):
+    login(app_client)
+
+    response = app_client.post(
+        "/api/v1/backend/fill_db/",
+        params={"csv_file_path": "db/init_data/students.csv", "chunk_size": 50},
+    )
+    result = response.json()
+
+    assert response.status_code == HTTPStatus.OK
+    assert result["result"] == "ok"
+
+    response = app_client.get(f"/api/v1/backend/jobs/{result['job_id']}")
+    job = response.json()
+
+    assert response.status_code == HTTPStatus.OK
+    assert job["status"] == "success"
+    assert job["total"] == 215
+    assert job["processed"] == 215
+    assert job["failed"] == 0
+    assert job["result"]["faculties_created"] == 5
+    assert job["result"]["courses_created"] == 6
+
+
+@pytest.mark.asyncio()
+async def test_fill_db_job_skips_invalid_rows(app_client, tmp_path):
+    login(app_client)
+    csv_file_path = tmp_path / "students.csv"
+    csv_file_path.write_text(
+        "Фамилия,Имя,Факультет,Курс,Оценка\n"
+        "Ли,Иван,АВТФ,Теор. Механика,52\n"
+        "Ким,Петр,ФПМИ,Мат. Анализ,28\n"
+        "Короткая,Строка\n",
+        encoding="utf-8",
+    )
+
+    response = app_client.post(
+        "/api/v1/backend/fill_db/", params={"csv_file_path": str(csv_file_path)}
+    )
+    job = app_client.get(f"/api/v1/backend/jobs/{response.json()['job_id']}").json()
+
+    assert job["status"] == "success"
+    assert job["total"] == 3
+    assert job["processed"] == 2
+    assert job["failed"] == 1
+    assert job["result"]["rows_inserted"] == 2
+    assert job["result"]["rows_failed"] == 1
+    assert job["result"]["faculties_created"] == 2
+    assert len(job["errors"]) == 1
+
+
+@pytest.mark.parametrize(
+    "content, expected_status, expected_result",
+    [
+        (
+            "Фамилия,Имя,Факультет,Курс,Оценка\n"
+            "Ли,Иван,АВТФ,Теор. Механика,52\n"
+            "Ким,Петр,ФПМИ,Мат. Анализ,28\n"
+            "Плохая строка\n",
+            HTTPStatus.OK,
+            {"rows_total": 3, "rows_inserted": 2, "rows_failed": 1},
+        ),
+        (
+            "Фамилия,Имя\nЛи,Иван\n",
+            HTTPStatus.BAD_REQUEST,
+            {
+                "detail": "В csv файле отсутствуют колонки: Факультет, Курс, Оценка",
+            },
+        ),
+    ],
+    ids=[
+        "succeed upload csv",
+        "failed upload csv: missing columns",
+    ],
+)
+@pytest.mark.asyncio()
+async def test_upload_csv(app_client, content, expected_status, expected_result):
+    login(app_client)
+
+    response = app_client.post(
+        "/api/v1/backend/upload_csv/",
+        params={"chunk_size": 1},
+        content=content.encode(),
+        headers={"Content-Type": "text/csv"},
+    )
+    result = response.json()
+
+    assert response.status_code == expected_status
+    assert {key: result[key] for key in expected_result} == expected_result
+
+
+@pytest.mark.asyncio()
+async def test_upload_csv_fails_after_partial_load(app_client):
+    login(app_client)
+
+    response = app_client.get("/api/v1/students/get_student/1")
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+    # Обрыв многобайтового символа обнаруживается только в конце потока,
+    # когда строки перед ним уже вставлены
+    content = (
+        "Фамилия,Имя,Факультет,Курс,Оценка\n"
+        "Ли,Иван,АВТФ,Теор. Механика,52\n"
+        + "Плохая строка\n" * (JOB_ERROR_SAMPLE_SIZE + 1)
+    ).encode() + "Ли".encode()[:1]
+
+    response = app_client.post(
+        "/api/v1/backend/upload_csv/",
+        params={"chunk_size": 1},
+        content=content,
+        headers={"Content-Type": "text/csv"},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json()["detail"].startswith("'utf-8' codec can't decode")
+
+    response = app_client.get("/api/v1/students/get_student/1")
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["last_name"] == "Ли"
+
+
+@pytest.mark.asyncio()
+async def test_get_job_not_found(app_client):
+    login(app_client)
+
+    response = app_client.get("/api/v1/backend/jobs/unknown")
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {"detail": "Job not found"}
+
+
+@pytest.mark.asyncio()
+async def test_local_cache_tier(app_client, monkeypatch):
+    local_cache = LocalCacheStorage(max_items=100, max_bytes=1024 * 1024, ttl=5)
+    monkeypatch.setattr(cache_storage, "local_cache", local_cache)
+    # Промах первого чтения проверяем и в режиме write-through
+    monkeypatch.setattr(cache_service, "_write_through", False)
+    login(app_client)
+
+    course_id = app_client.post(
+        "/api/v1/courses/create_course/", json={"name": "Тестовый курс"}
+    ).json()["id"]
+    hits, misses = local_cache.hits, local_cache.misses
+
+    for _ in range(3):
+        response = app_client.get(f"/api/v1/courses/get_course/{course_id}")
+        assert response.json()["name"] == "Тестовый курс"
+
+    # Курс: 1 промах и 2 попадания; пользователь из токена уже в кеше
+    assert local_cache.hits - hits == 2 + 3
+    assert local_cache.misses - misses == 1
+
+    stats = app_client.get("/api/v1/backend/cache_stats/").json()
+
+    assert stats["local"]["hits"] == local_cache.hits
+
+
+@pytest.mark.asyncio()
+async def test_cache_namespaces_do_not_collide(app_client):
+    login(app_client)
+
+    faculty_id = app_client.post(
+        "/api/v1/faculties/create_faculty/", json={"name": "Тестовый факультет"}
+    ).json()["id"]
+    user = app_client.get(f"/api/v1/users/get_user/{faculty_id}").json()
+    faculty = app_client.get(f"/api/v1/faculties/get_faculty/{faculty_id}").json()
+
+    assert user["login"] == "test_login1"
+    assert faculty == {"id": faculty_id, "name": "Тестовый факультет"}
+
+
+@pytest.mark.asyncio()
+async def test_remove_courses_rebuilds_grade_statistics_once(app_client):
+    login(app_client)
+    app_client.post(
+        "/api/v1/backend/fill_db/",
+        params={"csv_file_path": "db/init_data/students.csv"},
+    )
+
+    # Несуществующие id добавляют пачки удаления
+    with count_queries(get_engine(settings.DB_URL)) as queries:
+        response = app_client.post(
+            "/api/v1/backend/remove_data_from_db/",
+            params={"table_name": "courses"},
+            json={"item_ids": list(range(1, 2501))},
+        )
+
+    job = app_client.get(f"/api/v1/backend/jobs/{response.json()['job_id']}").json()
+    rebuilds = [
+        query
+        for query in queries
+        if query.lstrip().upper().startswith("DELETE FROM GRADE_STATISTICS")
+    ]
+
+    assert job["status"] == "success"
+    assert job["result"]["deleted"] == 6
+    assert len(rebuilds) == 1
+
+    response = app_client.post(
+        "/api/v1/backend/rebuild_grade_statistics/", params={"verify_only": True}
+    )
+
+    assert response.json()["mismatches"] == 0
+
+
+@pytest.mark.asyncio()
+async def test_remove_data_invalidates_cached_items(app_client):
+    login(app_client)
+    app_client.post(
+        "/api/v1/backend/fill_db/",
+        params={"csv_file_path": "db/init_data/students.csv"},
+    )
+
+    assert app_client.get("/api/v1/students/get_student/1").status_code == 200
+    assert app_client.get("/api/v1/students/get_student/2").status_code == 200
+
+    app_client.post(
+        "/api/v1/backend/remove_data_from_db/",
+        params={"table_name": "students"},
+        json={"item_ids": [1]},
+    )
+
+    assert app_client.get("/api/v1/students/get_student/1").status_code == 404
+
+    # Сбрасываются только ключи удаленных записей: студент 2 читается из кеша
+    with count_queries(get_engine(settings.DB_URL)) as queries:
+        response = app_client.get("/api/v1/students/get_student/2")
+
+    assert response.status_code == 200
+    assert not [query for query in queries if "FROM students" in query]
+
+
+@pytest.mark.asyncio()
+async def test_remove_students_invalidates_their_aggregates(app_client):
+    login(app_client)
+    app_client.post(
+        "/api/v1/backend/fill_db/",
+        params={"csv_file_path": "db/init_data/students.csv"},
+    )
+    student = app_client.get("/api/v1/students/get_student/1").json()
+    faculty_url = "/api/v1/students/average_grade_by_faculty/{}"
+    other_faculty_id = student["faculty"] % 5 + 1
+
+    app_client.get(faculty_url.format(student["faculty"]))
+    app_client.get(faculty_url.format(other_faculty_id))
+    app_client.post(
+        "/api/v1/backend/remove_data_from_db/",
+        params={"table_name": "students"},
+        json={"item_ids": [1]},
+    )
+
+    # Пересчитывается только агрегат факультета удаленного студента
+    with count_queries(get_engine(settings.DB_URL)) as queries:
+        app_client.get(faculty_url.format(student["faculty"]))
+        app_client.get(faculty_url.format(other_faculty_id))
+
+    assert len(queries) == 1
+
+
+@pytest.mark.asyncio()
+async def test_password_hashing_stats(app_client):
+    completed = password_service.completed
+    login(app_client)
+
+    response = app_client.get("/api/v1/backend/password_hashing_stats/")
+    result = response.json()
+
+    assert response.status_code == HTTPStatus.OK
+    # register хеширует пароль, login проверяет его - оба через пул
+    assert result["completed"] - completed == 2
+    assert result["queue_depth"] == 0
+    assert result["in_flight"] == 0
+
+
+@pytest.mark.asyncio()
+async def test_csv_loader_resolves_names_from_dimension_cache(setup_database):
+    loads = faculty_service.name_ids.loads
+
+    with count_queries(get_engine(settings.DB_URL)) as queries:
+        await student_service.load_from_csv()
+
+    # Справочники читаются целиком один раз, дальше - поиск в словаре
+    lookups = [query for query in queries if query.lstrip().startswith("SELECT")]
+
+    assert len(lookups) == 2
+    assert faculty_service.name_ids.loads - loads == 1
+    assert faculty_service.name_ids.as_dict()["size"] == 5
+
+    faculty_id = await faculty_service.name_ids.get_id("АВТФ")
+    result = await faculty_service.update_faculty(faculty_id, name="Новый факультет")
+
+    assert result.status == "success"
+    assert await faculty_service.name_ids.get_id("АВТФ") is None
+    assert await faculty_service.name_ids.get_id("Новый факультет") == faculty_id
+    assert len(await student_service.get_students_by_faculty("Новый факультет")) > 0
+    assert await course_service.name_ids.get_id("Неизвестный курс") is None
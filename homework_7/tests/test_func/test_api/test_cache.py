@@ -0,0 +1,83 @@
+import asyncio
+import json
+import time
+
+import pytest
+import pytest_asyncio
+
+from homework_7.services.cache import CacheService
+from homework_7.services.cache_keys import CacheNamespace
+from homework_7.storages.cache import cache_storage
+
+TEST_CACHE = CacheNamespace(name="test_cache", schema_version=1)
+
+
+@pytest_asyncio.fixture
+async def namespace(monkeypatch):
+    # Проверяем только логику сервиса: без локального уровня и его подписки
+    monkeypatch.setattr(cache_storage, "local_cache", None)
+    # Соединения Redis привязаны к циклу событий предыдущего теста
+    cache_storage.redis.connection_pool.reset()
+    # Новое поколение: записи прошлых запусков не читаются
+    await cache_storage.incr(TEST_CACHE.generation_key)
+    yield TEST_CACHE
+    cache_storage.redis.connection_pool.reset()
+
+
+class CountingLoader:
+    def __init__(self, value=None, delay: float = 0.0):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+
+        return self.value
+
+
+@pytest.mark.asyncio()
+async def test_concurrent_misses_run_loader_once(namespace):
+    cache = CacheService(cache_storage)
+    loader = CountingLoader({"id": 1}, delay=0.05)
+
+    values = await asyncio.gather(
+        *(cache.get_or_load(namespace, 1, loader) for _ in range(10))
+    )
+
+    assert values == [{"id": 1}] * 10
+    assert loader.calls == 1
+    assert await cache.get_or_load(namespace, 1, loader) == {"id": 1}
+    assert loader.calls == 1
+
+
+@pytest.mark.asyncio()
+async def test_missing_value_served_from_negative_cache(namespace):
+    cache = CacheService(cache_storage, ttl_jitter=0, negative_ttl=1)
+    loader = CountingLoader(None)
+
+    assert await cache.get_or_load(namespace, 1, loader) is None
+    assert await cache.get_or_load(namespace, 1, loader) is None
+    assert loader.calls == 1
+
+    await asyncio.sleep(1.1)
+
+    assert await cache.get_or_load(namespace, 1, loader) is None
+    assert loader.calls == 2
+
+
+@pytest.mark.asyncio()
+async def test_ttl_stays_within_jitter_bounds(namespace):
+    cache = CacheService(cache_storage, ttl=60, ttl_jitter=0.1)
+    generation = await cache_storage.get_counter(namespace.generation_key)
+    ttls = set()
+
+    for id in range(20):
+        await cache.get_or_load(namespace, id, CountingLoader({"id": id}))
+        entry = json.loads(await cache_storage.get(namespace.key(id, generation)))
+        ttls.add(round(entry["expiry"] - time.time()))
+
+    assert min(ttls) >= 54
+    assert max(ttls) <= 66
+    assert len(ttls) > 1
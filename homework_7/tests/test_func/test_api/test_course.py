@@ -1,7 +1,10 @@
+import asyncio
 from http import HTTPStatus
 
 import pytest
 
+from homework_7.services.course import course_service
+
 
 @pytest.mark.parametrize(
     "query_data, need_login, expected_status, expected_result",
@@ -173,3 +176,57 @@ async def test_update_course(
 
     assert response.status_code == expected_status
     assert result == expected_result
+
+
+@pytest.mark.asyncio()
+async def test_course_get_or_create_is_idempotent(setup_database):
+    names = ["Первый курс", "Второй курс"]
+
+    # Конкурентные вызовы с одними и теми же именами не падают на уникальности
+    results = await asyncio.gather(
+        course_service.get_or_create(names[0]),
+        course_service.upsert_many(names),
+        course_service.upsert_many(reversed(names)),
+        course_service.get_or_create(names[0]),
+    )
+    course_ids = await course_service.upsert_many(names)
+
+    assert {results[0].id, results[3].id} == {course_ids[names[0]]}
+    assert results[1] == results[2] == course_ids
+    assert len(set(course_ids.values())) == 2
+
+    duplicate = await course_service.create_course(names[1])
+
+    assert duplicate.status == "error"
+    assert duplicate.message == "Курс с таким названием уже создан"
+
+
+@pytest.mark.asyncio()
+async def test_create_course_duplicate(app_client):
+    app_client.post(
+        "/api/v1/auth/register/",
+        json={
+            "last_name": "Фамилия",
+            "first_name": "Имя",
+            "login": "test_login1",
+            "email": "test@gmail.com",
+            "password": "test_pass1",
+        },
+    )
+    app_client.post(
+        "/api/v1/auth/login/",
+        json={
+            "login": "test_login1",
+            "password": "test_pass1",
+        },
+    )
+
+    for _ in range(2):
+        response = app_client.post(
+            "/api/v1/courses/create_course/", json={"name": "Тестовое имя курса"}
+        )
+
+    assert response.json() == {
+        "status": "error",
+        "message": "Курс с таким названием уже создан",
+    }
@@ -0,0 +1,228 @@
+from http import HTTPStatus
+
+import pytest
+
+from homework_7 import settings
+from homework_7.db.engine import get_engine
+from homework_7.services.cache import cache_service
+from homework_7.tests.utils import count_queries
+
+
+@pytest.mark.parametrize(
+    "req_url, expected_count",
+    [
+        ("/api/v1/students/get_students/", 215),
+        ("/api/v1/courses/get_courses/", 6),
+        ("/api/v1/faculties/get_faculties/", 5),
+    ],
+    ids=[
+        "get students",
+        "get courses",
+        "get faculties",
+    ],
+)
+@pytest.mark.asyncio()
+async def test_list_endpoints_run_single_query(app_client, req_url, expected_count):
+    app_client.post(
+        "/api/v1/auth/register/",
+        json={
+            "last_name": "Фамилия",
+            "first_name": "Имя",
+            "login": "test_login1",
+            "email": "test@gmail.com",
+            "password": "test_pass1",
+        },
+    )
+    app_client.post(
+        "/api/v1/auth/login/",
+        json={
+            "login": "test_login1",
+            "password": "test_pass1",
+        },
+    )
+    app_client.post(
+        "/api/v1/backend/fill_db/",
+        params={"csv_file_path": "db/init_data/students.csv"},
+    )
+
+    with count_queries(get_engine(settings.DB_URL)) as queries:
+        response = app_client.get(req_url, params={"limit": 1000})
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json()["items"]) == expected_count
+    assert len(queries) == 1
+
+
+@pytest.mark.asyncio()
+async def test_get_students_by_ids_loads_misses_in_single_query(app_client):
+    app_client.post(
+        "/api/v1/auth/register/",
+        json={
+            "last_name": "Фамилия",
+            "first_name": "Имя",
+            "login": "test_login1",
+            "email": "test@gmail.com",
+            "password": "test_pass1",
+        },
+    )
+    app_client.post(
+        "/api/v1/auth/login/",
+        json={
+            "login": "test_login1",
+            "password": "test_pass1",
+        },
+    )
+    app_client.post(
+        "/api/v1/backend/fill_db/",
+        params={"csv_file_path": "db/init_data/students.csv"},
+    )
+    item_ids = list(range(215, 0, -1)) + [100000]
+
+    for max_queries in (1, 0):
+        with count_queries(get_engine(settings.DB_URL)) as queries:
+            response = app_client.post(
+                "/api/v1/students/get_students_by_ids/", json={"item_ids": item_ids}
+            )
+        result = response.json()
+
+        assert response.status_code == HTTPStatus.OK
+        assert len(queries) <= max_queries
+        assert [student["id"] for student in result["items"]] == item_ids[:-1]
+        assert result["missing_ids"] == [100000]
+
+
+@pytest.mark.asyncio()
+async def test_write_through_update_serves_read_from_cache(app_client, monkeypatch):
+    monkeypatch.setattr(cache_service, "_write_through", True)
+    app_client.post(
+        "/api/v1/auth/register/",
+        json={
+            "last_name": "Фамилия",
+            "first_name": "Имя",
+            "login": "test_login1",
+            "email": "test@gmail.com",
+            "password": "test_pass1",
+        },
+    )
+    app_client.post(
+        "/api/v1/auth/login/",
+        json={
+            "login": "test_login1",
+            "password": "test_pass1",
+        },
+    )
+    course_id = app_client.post(
+        "/api/v1/courses/create_course/", json={"name": "Старое название"}
+    ).json()["id"]
+    response = app_client.patch(
+        f"/api/v1/courses/update_course/{course_id}", json={"name": "Новое название"}
+    )
+
+    assert response.json() == {
+        "status": "success",
+        "message": "Course updated successfully",
+    }
+
+    with count_queries(get_engine(settings.DB_URL)) as queries:
+        response = app_client.get(f"/api/v1/courses/get_course/{course_id}")
+
+    assert response.json() == {"id": course_id, "name": "Новое название"}
+    assert queries == []
+
+
+@pytest.mark.asyncio()
+async def test_aggregates_invalidated_only_by_affected_tags(app_client):
+    app_client.post(
+        "/api/v1/auth/register/",
+        json={
+            "last_name": "Фамилия",
+            "first_name": "Имя",
+            "login": "test_login1",
+            "email": "test@gmail.com",
+            "password": "test_pass1",
+        },
+    )
+    app_client.post(
+        "/api/v1/auth/login/",
+        json={
+            "login": "test_login1",
+            "password": "test_pass1",
+        },
+    )
+    app_client.post(
+        "/api/v1/backend/fill_db/",
+        params={"csv_file_path": "db/init_data/students.csv"},
+    )
+    student = app_client.get("/api/v1/students/get_student/1").json()
+    faculty_url = "/api/v1/students/average_grade_by_faculty/{}"
+    other_faculty_id = student["faculty"] % 5 + 1
+
+    average_grade = app_client.get(faculty_url.format(student["faculty"])).json()
+    app_client.get(faculty_url.format(other_faculty_id))
+
+    with count_queries(get_engine(settings.DB_URL)) as queries:
+        assert app_client.get(faculty_url.format(student["faculty"])).json() == (
+            average_grade
+        )
+
+    assert queries == []
+
+    app_client.patch(
+        "/api/v1/students/update_student/1",
+        json={
+            "last_name": student["last_name"],
+            "first_name": student["first_name"],
+            "grade": 100 if student["grade"] != 100 else 1,
+        },
+    )
+
+    with count_queries(get_engine(settings.DB_URL)) as queries:
+        changed = app_client.get(faculty_url.format(student["faculty"])).json()
+        app_client.get(faculty_url.format(other_faculty_id))
+
+    assert changed["average_grade"] != average_grade["average_grade"]
+    assert len(queries) == 1
+
+
+@pytest.mark.asyncio()
+async def test_auth_principal_is_cached(app_client):
+    app_client.post(
+        "/api/v1/auth/register/",
+        json={
+            "last_name": "Фамилия",
+            "first_name": "Имя",
+            "login": "test_login1",
+            "email": "test@gmail.com",
+            "password": "test_pass1",
+        },
+    )
+    app_client.post(
+        "/api/v1/auth/login/",
+        json={
+            "login": "test_login1",
+            "password": "test_pass1",
+        },
+    )
+    app_client.get("/api/v1/backend/db_pool/")
+
+    # Пользователь из токена уже в кеше: авторизация не ходит в БД
+    with count_queries(get_engine(settings.DB_URL)) as queries:
+        response = app_client.get("/api/v1/backend/db_pool/")
+
+    assert response.status_code == HTTPStatus.OK
+    assert queries == []
+
+    response = app_client.get("/api/v1/users/get_user/1")
+
+    assert response.json()["login"] == "test_login1"
+
+    response = app_client.patch(
+        "/api/v1/users/update_user/1", json={"login": "test_login2"}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+    # Токен выдан на старый логин, пользователя с ним больше нет
+    response = app_client.get("/api/v1/backend/db_pool/")
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
@@ -0,0 +1,304 @@
+import csv
+import io
+import json
+from http import HTTPStatus
+
+import pytest
+
+from homework_7 import settings
+from homework_7.db.engine import get_engine
+from homework_7.schemes.student import MAX_CREATE_BATCH_SIZE
+from homework_7.services import student as student_module
+from homework_7.services.grade_statistics import grade_statistics_service
+from homework_7.services.student import student_service
+from homework_7.tests.utils import count_queries
+
+
+def login_and_fill_db(app_client):
+    app_client.post(
+        "/api/v1/auth/register/",
+        json={
+            "last_name": "Фамилия",
+            "first_name": "Имя",
+            "login": "test_login1",
+            "email": "test@gmail.com",
+            "password": "test_pass1",
+        },
+    )
+    app_client.post(
+        "/api/v1/auth/login/",
+        json={
+            "login": "test_login1",
+            "password": "test_pass1",
+        },
+    )
+    app_client.post(
+        "/api/v1/backend/fill_db/",
+        params={"csv_file_path": "db/init_data/students.csv"},
+    )
+
+
+@pytest.mark.asyncio()
+async def test_get_students_pagination(app_client):
+    login_and_fill_db(app_client)
+
+    ids = []
+    pages = 0
+    params = {"limit": 100}
+
+    while True:
+        response = app_client.get("/api/v1/students/get_students/", params=params)
+        result = response.json()
+
+        assert response.status_code == HTTPStatus.OK
+
+        ids.extend(student["id"] for student in result["items"])
+        pages += 1
+
+        if result["next_cursor"] is None:
+            break
+
+        params["after_id"] = result["next_cursor"]
+
+    assert pages == 3
+    assert ids == sorted(set(ids))
+    assert len(ids) == 215
+
+
+@pytest.mark.parametrize(
+    "params, check",
+    [
+        (
+            {"name_prefix": "Ли"},
+            lambda student: student["last_name"].startswith("Ли"),
+        ),
+        (
+            {"min_grade": 40, "max_grade": 60},
+            lambda student: 40 <= student["grade"] <= 60,
+        ),
+        (
+            {"faculty_id": 2, "course_id": 3},
+            lambda student: student["faculty"] == 2 and student["course"] == 3,
+        ),
+    ],
+    ids=[
+        "filter by name prefix",
+        "filter by grade range",
+        "filter by faculty and course",
+    ],
+)
+@pytest.mark.asyncio()
+async def test_get_students_filters(app_client, params, check):
+    login_and_fill_db(app_client)
+
+    response = app_client.get(
+        "/api/v1/students/get_students/", params={"limit": 1000, **params}
+    )
+    students = response.json()["items"]
+
+    assert response.status_code == HTTPStatus.OK
+    assert students
+    assert all(check(student) for student in students)
+
+
+@pytest.mark.asyncio()
+async def test_grade_statistics_follow_student_writes(app_client):
+    login_and_fill_db(app_client)
+
+    student_id = app_client.post(
+        "/api/v1/students/create_student/",
+        json={"last_name": "Ли", "first_name": "Иван", "grade": 77},
+    ).json()["id"]
+    app_client.patch(
+        f"/api/v1/students/update_student/{student_id}",
+        json={"last_name": "Ли", "first_name": "Иван", "grade": 12},
+    )
+    app_client.delete("/api/v1/students/delete_student/1")
+    app_client.post(
+        "/api/v1/backend/remove_data_from_db/",
+        params={"table_name": "students"},
+        json={"item_ids": [2, 3, 4]},
+    )
+
+    response = app_client.post(
+        "/api/v1/backend/rebuild_grade_statistics/", params={"verify_only": True}
+    )
+
+    assert response.json() == {"mismatches": 0, "sample": [], "rebuilt": False}
+
+    students = app_client.get(
+        "/api/v1/students/get_students/", params={"limit": 1000, "faculty_id": 1}
+    ).json()["items"]
+    grades = [student["grade"] for student in students]
+    statistics = app_client.get(
+        "/api/v1/students/grade_statistics/faculty/1", params={"max_grade": 30}
+    ).json()
+
+    assert statistics["count"] == len(grades)
+    assert statistics["total"] == sum(grades)
+    assert statistics["min_grade"] == min(grades)
+    assert statistics["max_grade"] == max(grades)
+    assert statistics["students_below_grade"] == len([g for g in grades if g < 30])
+
+
+@pytest.mark.asyncio()
+async def test_create_students_batch(app_client):
+    login_and_fill_db(app_client)
+
+    students = [
+        {"last_name": "Ли", "first_name": "Иван", "grade": 77, "faculty_id": 1},
+        {"last_name": "Ким", "first_name": "Петр", "grade": 12, "faculty_id": 999},
+        {"last_name": "Пак", "first_name": "Анна", "grade": 55, "course_id": 2},
+    ]
+
+    with count_queries(get_engine(settings.DB_URL)) as queries:
+        response = app_client.post(
+            "/api/v1/students/create_students/", json={"items": students}
+        )
+    result = response.json()
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert result["created"] == 2
+    assert result["failed"] == 1
+    assert [item["status"] for item in result["items"]] == [
+        "success",
+        "error",
+        "success",
+    ]
+    assert result["items"][1]["message"] == "Факультет с таким faculty_id=999 не найден"
+    # Факультеты и курсы проверяются одним запросом на таблицу, а не на студента
+    lookups = [query for query in queries if query.lstrip().startswith("SELECT")]
+
+    assert len(lookups) == 2
+
+    for item, student in zip(result["items"], students):
+        if item["status"] != "success":
+            continue
+
+        created = app_client.get(f"/api/v1/students/get_student/{item['id']}").json()
+
+        assert created["last_name"] == student["last_name"]
+        assert created["grade"] == student["grade"]
+
+    response = app_client.post(
+        "/api/v1/backend/rebuild_grade_statistics/", params={"verify_only": True}
+    )
+
+    assert response.json()["mismatches"] == 0
+
+
+@pytest.mark.asyncio()
+async def test_create_students_batch_too_large(app_client):
+    login_and_fill_db(app_client)
+    student = {"last_name": "Ли", "first_name": "Иван", "grade": 77}
+
+    response = app_client.post(
+        "/api/v1/students/create_students/",
+        json={"items": [student] * (MAX_CREATE_BATCH_SIZE + 1)},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert [error["type"] for error in response.json()["detail"]] == ["too_long"]
+
+
+def parse_ndjson(text):
+    return [json.loads(line) for line in text.splitlines()]
+
+
+def parse_csv(text):
+    return [
+        {
+            key: int(value) if value.lstrip("-").isdigit() else value or None
+            for key, value in row.items()
+        }
+        for row in csv.DictReader(io.StringIO(text))
+    ]
+
+
+@pytest.mark.parametrize(
+    "export_format, media_type, parse",
+    [
+        ("ndjson", "application/x-ndjson", parse_ndjson),
+        ("csv", "text/csv", parse_csv),
+    ],
+    ids=["export ndjson", "export csv"],
+)
+@pytest.mark.asyncio()
+async def test_export_students(app_client, export_format, media_type, parse):
+    login_and_fill_db(app_client)
+    students = app_client.get(
+        "/api/v1/students/get_students/", params={"limit": 1000}
+    ).json()["items"]
+
+    response = app_client.get(
+        "/api/v1/students/export/", params={"format": export_format}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"].startswith(media_type)
+    assert response.headers["content-disposition"] == (
+        f"attachment; filename=students.{export_format}"
+    )
+    assert len(students) == 215
+    assert parse(response.text) == students
+
+
+@pytest.mark.asyncio()
+async def test_export_students_csv_header(app_client):
+    login_and_fill_db(app_client)
+
+    response = app_client.get("/api/v1/students/export/", params={"format": "csv"})
+
+    assert response.text.splitlines()[0] == (
+        "id,last_name,first_name,grade,faculty,course"
+    )
+
+
+@pytest.mark.asyncio()
+async def test_export_students_unknown_format(app_client):
+    login_and_fill_db(app_client)
+
+    response = app_client.get("/api/v1/students/export/", params={"format": "xml"})
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {"detail": "Формат xml не поддерживается."}
+
+
+@pytest.mark.skipif(
+    not settings.DB_URL.startswith("postgresql"),
+    reason="COPY используется только с asyncpg: DB_URL=postgresql+asyncpg://...",
+)
+@pytest.mark.asyncio()
+async def test_bulk_load_copy_rolls_back_failed_chunk(
+    setup_database, tmp_path, monkeypatch
+):
+    # Факультеты и курсы созданы до пачек: COPY - первая команда в транзакции
+    csv_path = tmp_path / "students.csv"
+    csv_path.write_text(
+        "Фамилия,Имя,Факультет,Курс,Оценка\n"
+        + "".join(f"Ли,Иван,АВТФ,Курс {i % 3},{i}\n" for i in range(30)),
+        encoding="utf-8",
+    )
+    apply_grade_deltas = student_module.apply_grade_deltas
+    calls = []
+
+    async def fail_second_chunk(db, deltas):
+        calls.append(deltas)
+
+        if len(calls) == 2:
+            raise ValueError("Ошибка пачки")
+
+        await apply_grade_deltas(db, deltas)
+
+    monkeypatch.setattr(student_module, "apply_grade_deltas", fail_second_chunk)
+
+    result = await student_service.bulk_load_from_csv(str(csv_path), chunk_size=10)
+    students = await student_service.get_students(limit=100)
+
+    assert result.rows_inserted == 20
+    assert result.rows_failed == 10
+    assert [student.grade for student in students["items"]] == [
+        *range(10),
+        *range(20, 30),
+    ]
+    assert await grade_statistics_service.verify() == []
@@ -0,0 +1,205 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from redis.asyncio import Redis
+from sqlalchemy import select
+
+from homework_7 import settings
+from homework_7.db.engine import get_engine, get_session_factory
+from homework_7.db.models.models import Base, Faculty
+from homework_7.db.writer import WriteQueue
+from homework_7.services.student import StudentService
+from homework_7.storages.cache import cache_storage
+
+
+@pytest_asyncio.fixture
+async def sqlite_url(tmp_path, monkeypatch):
+    # Отдельная база: движок приложения создан без настроек SQLite
+    monkeypatch.setattr(settings, "DB_WRITE_QUEUE", True)
+    monkeypatch.setattr(settings, "DB_SQLITE_TUNING", True)
+    db_url = f"sqlite+aiosqlite:///{tmp_path / 'write_queue.db'}"
+    engine = get_engine(db_url)
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    yield db_url
+
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def make_queue(sqlite_url):
+    queues = []
+
+    def make(max_batch_size: int, max_delay: float) -> WriteQueue:
+        queues.append(
+            WriteQueue(get_session_factory(sqlite_url), max_batch_size, max_delay)
+        )
+
+        return queues[-1]
+
+    yield make
+
+    for queue in queues:
+        await queue.close()
+
+
+def create_faculty(name: str):
+    async def operation(db):
+        faculty = Faculty(name=name)
+        db.add(faculty)
+        await db.flush()
+
+        return faculty.id
+
+    return operation
+
+
+def create_faculty_and_fail(name: str):
+    async def operation(db):
+        db.add(Faculty(name=name))
+        await db.flush()
+
+        raise ValueError("Ошибка операции")
+
+    return operation
+
+
+async def get_faculty_names(db_url: str):
+    async with get_session_factory(db_url)() as db:
+        return (await db.scalars(select(Faculty.name).order_by(Faculty.id))).all()
+
+
+@pytest.mark.asyncio()
+async def test_sqlite_tuning_pragmas(sqlite_url):
+    async with get_engine(sqlite_url).connect() as connection:
+        pragmas = {
+            pragma: (await connection.exec_driver_sql(f"PRAGMA {pragma}")).scalar()
+            for pragma in (
+                "journal_mode",
+                "synchronous",
+                "mmap_size",
+                "cache_size",
+                "temp_store",
+                "busy_timeout",
+            )
+        }
+
+    assert pragmas == {
+        "journal_mode": "wal",
+        "synchronous": 1,
+        "mmap_size": settings.DB_SQLITE_MMAP_SIZE,
+        "cache_size": settings.DB_SQLITE_CACHE_SIZE,
+        "temp_store": 2,
+        "busy_timeout": settings.DB_SQLITE_BUSY_TIMEOUT,
+    }
+
+
+@pytest.mark.asyncio()
+async def test_write_queue_isolates_failed_operation(sqlite_url, make_queue):
+    queue = make_queue(max_batch_size=10, max_delay=0.05)
+
+    results = await asyncio.gather(
+        queue.submit(create_faculty("АВТФ")),
+        queue.submit(create_faculty_and_fail("ФПМИ")),
+        queue.submit(create_faculty("ФЛА")),
+        return_exceptions=True,
+    )
+
+    assert results[0] == 1
+    assert isinstance(results[1], ValueError)
+    assert results[2] == 2
+    assert queue.batches == 1
+    assert await get_faculty_names(sqlite_url) == ["АВТФ", "ФЛА"]
+
+
+@pytest.mark.asyncio()
+async def test_write_queue_splits_by_max_batch_size(sqlite_url, make_queue):
+    queue = make_queue(max_batch_size=3, max_delay=1)
+
+    results = await asyncio.gather(
+        *(queue.submit(create_faculty(f"Факультет {i}")) for i in range(7))
+    )
+
+    assert results == list(range(1, 8))
+    assert queue.as_dict() == {
+        "queued": 0,
+        "batches": 3,
+        "operations": 7,
+        "avg_batch_size": 2.33,
+    }
+
+
+@pytest.mark.asyncio()
+async def test_write_queue_waits_max_delay(sqlite_url, make_queue):
+    queue = make_queue(max_batch_size=100, max_delay=0.2)
+
+    async def submit_later(operation):
+        await asyncio.sleep(0.05)
+
+        return await queue.submit(operation)
+
+    results = await asyncio.gather(
+        queue.submit(create_faculty("АВТФ")),
+        submit_later(create_faculty("ФПМИ")),
+    )
+
+    assert results == [1, 2]
+    assert queue.batches == 1
+
+    assert await get_faculty_names(sqlite_url) == ["АВТФ", "ФПМИ"]
+
+
+def write_students_csv(path, count: int):
+    path.write_text(
+        "Фамилия,Имя,Факультет,Курс,Оценка\n"
+        + "".join(
+            f"Ли,Иван,Факультет {i % 5},Курс {i % 6},{i % 101}\n" for i in range(count)
+        ),
+        encoding="utf-8",
+    )
+
+    return str(path)
+
+
+@pytest.mark.asyncio()
+async def test_bulk_load_and_queued_updates_share_writer(
+    sqlite_url, setup_database, tmp_path, monkeypatch
+):
+    # Пачки загрузки и обновления через очередь пишут одновременно: никто не
+    # должен получить "database is locked"
+    service = StudentService(db_url=sqlite_url)
+    # Пул соединений Redis привязан к циклу событий предыдущих тестов
+    monkeypatch.setattr(
+        cache_storage,
+        "redis",
+        Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT),
+    )
+    monkeypatch.setattr(cache_storage, "local_cache", None)
+    await service.bulk_load_from_csv(write_students_csv(tmp_path / "small.csv", 90))
+
+    async def update_students(first_id: int):
+        results = []
+
+        for student_id in range(first_id, first_id + 30):
+            results.append(await service.update_student(student_id, grade=77))
+            await asyncio.sleep(0.001)
+
+        return results
+
+    load, *updates = await asyncio.gather(
+        service.bulk_load_from_csv(
+            write_students_csv(tmp_path / "large.csv", 20000), chunk_size=500
+        ),
+        *(update_students(first_id) for first_id in (1, 31, 61)),
+    )
+
+    await cache_storage.redis.aclose()
+
+    assert load.rows_inserted == 20000
+    assert load.rows_failed == 0
+    assert [result.status for results in updates for result in results] == [
+        "success"
+    ] * 90
@@ -0,0 +1,23 @@
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+TRANSACTION_STATEMENTS = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+
+@contextmanager
+def count_queries(engine: AsyncEngine) -> Iterator[List[str]]:
+    queries = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        if not statement.lstrip().upper().startswith(TRANSACTION_STATEMENTS):
+            queries.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    try:
+        yield queries
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)